@@ -0,0 +1,12 @@
+"""Synthetic-data benchmarks for the API.
+
+- ``bench.datagen``  deterministic users + multi-year workout history on top of
+  the Free Exercise DB catalog;
+- ``bench.runner``   drives every route through the Flask test client or a real
+  WSGI server at a given concurrency and reports p50/p95/p99, throughput and
+  peak RSS;
+- ``bench/baselines/*.json`` stored reports; ``--compare`` fails on
+  regressions beyond a threshold.
+
+Run from ``api/``: ``python -m bench --help``.
+"""
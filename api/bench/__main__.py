@@ -0,0 +1,131 @@
+"""Command line entry point: ``python -m bench`` (run from ``api/``).
+
+Examples::
+
+    # SQLite baseline: generate data into a throwaway database and benchmark in-process
+    python -m bench --users 5 --years 2 --save-baseline sqlite
+
+    # Same data set on Postgres, compared against the SQLite numbers
+    python -m bench --database-url postgresql://... --compare sqlite
+
+    # Through a real WSGI server at higher concurrency, reads only
+    python -m bench --wsgi --concurrency 16 --reads-only
+
+    # Bytes on the wire with compression (avg_bytes per route)
+    python -m bench --reads-only --accept-encoding "br, gzip"
+
+    # JSON encoding and compression cost per payload (see bench/encoding.py)
+    python -m bench.encoding
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def _baseline_path(name: str) -> str:
+    return name if name.endswith(".json") or os.sep in name else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Synthetic-data API benchmarks.")
+    parser.add_argument("--database-url", default=None,
+                        help="Database to generate into and run against (default: a throwaway SQLite file)")
+    parser.add_argument("--users", type=int, default=5, help="Bench users to generate (default 5)")
+    parser.add_argument("--years", type=float, default=2.0, help="Years of history per user (default 2)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--generate-only", action="store_true", help="Generate data and exit")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent workers (default 4)")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per route (default 200)")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per route and worker (default 5)")
+    parser.add_argument("--routes", default=None, help="Only routes whose name contains this text")
+    parser.add_argument("--reads-only", action="store_true", help="Skip routes that write")
+    parser.add_argument("--accept-encoding", default=None, metavar="CODINGS",
+                        help="Accept-Encoding for timed requests, e.g. 'br, gzip' (default: none, uncompressed)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--wsgi", action="store_true", help="Serve the app with a threaded WSGI server and use HTTP")
+    target.add_argument("--url", default=None,
+                        help="Benchmark an already running server (its database must hold the generated data)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--save-baseline", metavar="NAME", default=None, help="Store the report as bench/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", default=None, help="Compare against a stored baseline (name or path)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative regression in p95/throughput before failing (default 0.2)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    os.environ.setdefault("MEDIA_ROOT", os.path.join(workdir, "media"))
+    os.environ["BOOTSTRAP_MODE"] = "eager"
+    # Slow-request / over-budget warnings would drown the report
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    # Every worker is one user hammering each route on purpose
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from src.main import app
+    from bench import datagen, runner
+
+    end_date = datetime(2026, 1, 1)
+    with app.app_context():
+        summary = datagen.generate(users=args.users, years=args.years, seed=args.seed, end_date=end_date)
+        dialect = app.extensions["sqlalchemy"].engine.dialect.name
+    print(f"data: {summary['users_created']} users created, {summary['sets']} sets, "
+          f"{summary['catalog']} catalog exercises ({dialect})")
+    if args.generate_only:
+        return
+
+    server = None
+    if args.url:
+        driver = runner.HttpDriver(args.url)
+    elif args.wsgi:
+        server, base_url = runner.start_wsgi_server(app)
+        driver = runner.HttpDriver(base_url)
+    else:
+        driver = runner.TestClientDriver(app)
+
+    try:
+        report = runner.run(
+            driver,
+            usernames=[f"{datagen.USERNAME_PREFIX}{i}" for i in range(args.users)],
+            password=datagen.PASSWORD,
+            concurrency=args.concurrency,
+            requests=args.requests,
+            warmup=args.warmup,
+            route_filter=args.routes,
+            include_writes=not args.reads_only,
+            seed=args.seed,
+            end_date=end_date,
+            accept_encoding=args.accept_encoding,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+    report["meta"].update({"database": dialect, "users": args.users, "years": args.years, "seed": args.seed})
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+
+    for path in filter(None, [args.output, args.save_baseline and _baseline_path(args.save_baseline)]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"report written to {path}")
+
+    if args.compare:
+        with open(_baseline_path(args.compare), encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = runner.compare(report, baseline, args.threshold)
+        for key in ("driver", "concurrency", "requests_per_route", "accept_encoding", "users", "years", "seed"):
+            if baseline["meta"].get(key) != report["meta"].get(key):
+                print(f"warning: baseline {key}={baseline['meta'].get(key)!r}, this run {key}={report['meta'].get(key)!r}")
+        print(f"\ncompared with {args.compare} ({baseline['meta'].get('database')}, "
+              f"{baseline['meta'].get('driver')}): {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
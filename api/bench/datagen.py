@@ -0,0 +1,149 @@
+"""Deterministic synthetic training history.
+
+The same ``seed``/``users``/``years``/``end_date`` always produce the same
+rows, so runs against different databases or commits are comparable. Rows
+are written with multi-row Core inserts (a few statements per user) and
+personal records / rollups are rebuilt once at the end.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+
+from src.models.user import User, db
+from src.models.exercise import Exercise, WorkoutSession, WorkoutExercise, ExerciseSet
+from src.services import catalog, ordering, records, rollups
+
+USERNAME_PREFIX = "bench"
+PASSWORD = "bench-password"
+# Below this many exercises the Free Exercise DB is imported first
+MIN_CATALOG_SIZE = 100
+DATASET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "data", "free-exercise-db", "exercises.json"
+)
+
+
+def ensure_catalog() -> int:
+    """Make sure the catalog is realistically large; returns its size"""
+    count = Exercise.query.count()
+    if count < MIN_CATALOG_SIZE and os.path.exists(DATASET_PATH):
+        from src.scripts.import_free_exercise_db import import_exercises, iter_dataset
+        import_exercises(iter_dataset(DATASET_PATH, download=False))
+        catalog.invalidate()
+        count = Exercise.query.count()
+    return count
+
+
+def _user_program(rng: random.Random, exercise_ids: List[int]) -> Dict[int, float]:
+    """Exercises a user trains with their starting working weight"""
+    picks = rng.sample(exercise_ids, min(len(exercise_ids), rng.randint(12, 20)))
+    return {exercise_id: rng.choice([10, 15, 20, 30, 40, 50, 60, 80]) for exercise_id in picks}
+
+
+def _session_times(rng: random.Random, start: datetime, end: datetime) -> List[datetime]:
+    times = []
+    day = start
+    while day < end:
+        # 3-4 sessions a week on random days, at a plausible hour
+        for offset in sorted(rng.sample(range(7), rng.randint(3, 4))):
+            moment = day + timedelta(days=offset, hours=rng.randint(6, 20), minutes=rng.choice([0, 15, 30, 45]))
+            if moment < end:
+                times.append(moment)
+        day += timedelta(days=7)
+    return times
+
+
+def _generate_user(rng: random.Random, user_id: int, program: Dict[int, float], times: List[datetime]) -> int:
+    """Insert one user's history; returns the number of sets written"""
+    sessions = [
+        {
+            "user_id": user_id, "name": f"Workout {i + 1}", "start_time": moment,
+            "end_time": moment + timedelta(minutes=rng.randint(40, 90)), "notes": "",
+            "updated_at": moment,
+        }
+        for i, moment in enumerate(times)
+    ]
+    if not sessions:
+        return 0
+    db.session.execute(insert(WorkoutSession), sessions)
+    session_ids = db.session.execute(
+        select(WorkoutSession.id, WorkoutSession.start_time)
+        .where(WorkoutSession.user_id == user_id).order_by(WorkoutSession.start_time)
+    ).all()
+
+    exercise_ids = list(program)
+    plans = []  # (session_id, [(exercise_id, [(reps, weight, set_type)])])
+    workout_exercises = []
+    for index, (session_id, start_time) in enumerate(session_ids):
+        progress = 1 + 0.5 * index / max(len(session_ids), 1)  # slow linear overload
+        chosen = rng.sample(exercise_ids, min(len(exercise_ids), rng.randint(4, 6)))
+        keys = ordering.keys_between(None, None, len(chosen))
+        for order, (exercise_id, key) in enumerate(zip(chosen, keys), start=1):
+            workout_exercises.append({
+                "session_id": session_id, "exercise_id": exercise_id, "order_in_workout": order,
+                "sort_key": key, "updated_at": start_time,
+            })
+            base = program[exercise_id] * progress
+            sets = [(10, round(base * 0.5, 1), "warmup")] if rng.random() < 0.3 else []
+            sets += [
+                (rng.randint(5, 12), round(base * rng.uniform(0.9, 1.05) / 2.5) * 2.5, "normal")
+                for _ in range(rng.randint(3, 5))
+            ]
+            plans.append(sets)
+    db.session.execute(insert(WorkoutExercise), workout_exercises)
+    we_ids = db.session.execute(
+        select(WorkoutExercise.id)
+        .join(WorkoutSession, WorkoutExercise.session_id == WorkoutSession.id)
+        .where(WorkoutSession.user_id == user_id)
+        .order_by(WorkoutSession.start_time, WorkoutExercise.sort_key)
+    ).scalars().all()
+
+    set_rows = []
+    for we_id, sets, parent in zip(we_ids, plans, workout_exercises):
+        keys = ordering.keys_between(None, None, len(sets))
+        for number, ((reps, weight, set_type), key) in enumerate(zip(sets, keys), start=1):
+            set_rows.append({
+                "workout_exercise_id": we_id, "set_number": number, "sort_key": key, "reps": reps,
+                "weight": weight, "duration": None, "distance": None, "rest_time": rng.choice([60, 90, 120, 180]),
+                "set_type": set_type, "notes": "", "updated_at": parent["updated_at"],
+            })
+    db.session.execute(insert(ExerciseSet), set_rows)
+    return len(set_rows)
+
+
+def generate(users: int = 5, years: float = 2.0, seed: int = 42, end_date: datetime = datetime(2026, 1, 1)) -> dict:
+    """Create ``users`` bench users with ``years`` of history ending at ``end_date``.
+
+    Existing bench users are reused only if their history is absent, so
+    re-running on the same database is a no-op.
+    """
+    rng = random.Random(seed)
+    catalog_size = ensure_catalog()
+    exercise_ids = [exercise_id for (exercise_id,) in db.session.query(Exercise.id).order_by(Exercise.id)]
+    start = end_date - timedelta(days=int(365 * years))
+
+    password_template = User(username="template")
+    password_template.set_password(PASSWORD)
+
+    created, total_sets = [], 0
+    for index in range(users):
+        user_rng = random.Random(rng.random())
+        username = f"{USERNAME_PREFIX}{index}"
+        user = User.query.filter_by(username=username).first()
+        if user is not None and WorkoutSession.query.filter_by(user_id=user.id).first() is not None:
+            continue
+        if user is None:
+            user = User(username=username, email=f"{username}@example.com", password_hash=password_template.password_hash)
+            db.session.add(user)
+            db.session.flush()
+        program = _user_program(user_rng, exercise_ids)
+        total_sets += _generate_user(user_rng, user.id, program, _session_times(user_rng, start, end_date))
+        created.append(user.id)
+
+    for user_id in created:
+        records.rebuild_all(user_id=user_id)
+        rollups.rebuild_all(user_id=user_id)
+    db.session.commit()
+    return {"catalog": catalog_size, "users_created": len(created), "sets": total_sets}
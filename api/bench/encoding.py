@@ -0,0 +1,124 @@
+"""JSON encoding and compression cost per payload: ``python -m bench.encoding``.
+
+Builds the largest real response bodies from generated data (the catalog,
+a user's full history, its summary view and the full sync state) and
+reports, for each one:
+
+- CPU milliseconds per encode with the stdlib provider and with orjson
+  (``src/json_provider.py``), and the encoded size;
+- for each coding ``src/compression.py`` can produce: CPU milliseconds per
+  compression and the bytes on the wire.
+
+Times are ``time.process_time`` (CPU, not wall clock) averaged over
+``--repeat`` runs, so they are comparable across busy and idle machines.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+
+def _cpu_ms(fn: Callable[[], object], repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return round((time.process_time() - start) / repeat * 1000, 3)
+
+
+def build_payloads(user_id: int) -> Dict[str, object]:
+    from src.models.user import db
+    from src.serializers.workouts import serialize_workouts
+    from src.services import catalog, history, sync
+
+    workouts = db.session.execute(history.page_statement(user_id, None, None)).scalars().all()
+    count_rows = db.session.execute(history.counts_statement([w.id for w in workouts])).all()
+    return {
+        "catalog": catalog.get_snapshot().rows,
+        "history (full)": serialize_workouts(workouts),
+        "history (summary)": history.summaries(workouts, count_rows),
+        "sync (reset)": sync.changes_since(user_id, None),
+    }
+
+
+def measure(app, payloads: Dict[str, object], repeat: int) -> dict:
+    from flask.json.provider import DefaultJSONProvider
+    from src import compression, json_provider
+
+    providers = {"stdlib": DefaultJSONProvider(app)}
+    if json_provider.orjson is not None:
+        providers["orjson"] = json_provider.OrjsonProvider(app)
+        providers["orjson"].sort_keys = False
+        providers["orjson"].ensure_ascii = False
+    codings = {"gzip": ("gzip", False), "gzip (static)": ("gzip", True)}
+    if compression.brotli is not None:
+        codings.update({"br": ("br", False), "br (static)": ("br", True)})
+
+    report = {}
+    for name, payload in payloads.items():
+        result = {"encode": {}, "compress": {}}
+        body = b""
+        for provider_name, provider in providers.items():
+            body = json_provider.encode_item(provider, payload)
+            result["encode"][provider_name] = {
+                "cpu_ms": _cpu_ms(lambda: json_provider.encode_item(provider, payload), repeat),
+                "bytes": len(body),
+            }
+        # Compress what the app actually sends (the last, preferred provider's body)
+        for coding_name, (coding, static) in codings.items():
+            compressed = compression.compress_bytes(body, coding, static=static)
+            result["compress"][coding_name] = {
+                "cpu_ms": _cpu_ms(lambda: compression.compress_bytes(body, coding, static=static), repeat),
+                "bytes": len(compressed),
+                "ratio": round(len(compressed) / len(body), 3),
+            }
+        report[name] = result
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.encoding", description="JSON encoding/compression cost.")
+    parser.add_argument("--database-url", default=None,
+                        help="Database to generate into (default: a throwaway SQLite file)")
+    parser.add_argument("--years", type=float, default=2.0, help="Years of history for the bench user (default 2)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs averaged per measurement (default 20)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    os.environ.setdefault("MEDIA_ROOT", os.path.join(workdir, "media"))
+    os.environ["BOOTSTRAP_MODE"] = "eager"
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from src.main import app
+    from src.models.user import User
+    from bench import datagen
+
+    with app.app_context():
+        datagen.generate(users=1, years=args.years, seed=args.seed, end_date=datetime(2026, 1, 1))
+        user = User.query.filter_by(username=f"{datagen.USERNAME_PREFIX}0").one()
+        with app.test_request_context():
+            payloads = build_payloads(user.id)
+        report = measure(app, payloads, args.repeat)
+
+    for name, result in report.items():
+        print(name)
+        for provider_name, row in result["encode"].items():
+            print(f"  encode {provider_name:14} {row['cpu_ms']:9.2f} ms  {row['bytes']:>10,} bytes")
+        for coding_name, row in result["compress"].items():
+            print(f"  {coding_name:21} {row['cpu_ms']:9.2f} ms  {row['bytes']:>10,} bytes  ({row['ratio']:.1%})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"years": args.years, "seed": args.seed, "repeat": args.repeat}, "payloads": report},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
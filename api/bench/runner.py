@@ -0,0 +1,344 @@
+"""Drive every API route at a given concurrency and report latency percentiles.
+
+Each ``Route`` builds one timed request from a per-worker ``Context``; any
+setup it needs (a fresh workout to delete, a set to reorder) goes through
+``ctx.call`` and is not timed. Two drivers issue the requests:
+
+- ``TestClientDriver``: the Flask test client in-process (one client per
+  worker thread), which isolates app + database cost from the network;
+- ``HttpDriver``: plain HTTP against ``--wsgi`` (a threaded werkzeug server
+  started here) or any ``--url``, which adds serialization and socket cost.
+
+Reports are JSON; ``compare`` flags routes whose p95 or throughput moved by
+more than the threshold against a stored baseline.
+"""
+import json
+import math
+import platform
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 2x2 RGB image Pillow can decode, so uploads include thumbnailing
+PNG_2PX = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000002000000020802000000fdd49a73"
+    "000000164944415478da633c2117c5c0c0c0c4c0c0c0c0c000000f980144e09588110000000049454e44ae426082"
+)
+
+RequestSpec = Tuple[str, str, dict]  # method, path, kwargs (headers/json/data)
+
+
+class TestClientDriver:
+    """In-process requests through Flask's test client"""
+    name = "test-client"
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, headers=None, json=None, data=None) -> Tuple[int, bytes]:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers, json=json, data=data)
+        return response.status_code, response.get_data()
+
+
+class HttpDriver:
+    """Real HTTP requests (urllib, a new connection per request)"""
+    name = "http"
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, headers=None, json=None, data=None) -> Tuple[int, bytes]:
+        headers = dict(headers or {})
+        if json is not None:
+            data = _json_bytes(json)
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def _json_bytes(value) -> bytes:
+    return json.dumps(value).encode()
+
+
+def start_wsgi_server(app):
+    """Serve ``app`` on a random local port in a daemon thread; returns (server, base_url)"""
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class Context:
+    """Per-worker state: one bench user, its token and lazily created fixtures"""
+
+    def __init__(self, driver, username: str, password: str, seed: int, end_date: datetime):
+        self.driver = driver
+        self.rng = random.Random(seed)
+        self.end_date = end_date
+        self.counter = 0
+        status, body = driver.request("POST", "/api/login", json={"username": username, "password": password})
+        if status != 200:
+            raise RuntimeError(f"login as {username} failed ({status}); generate data first")
+        self.username, self.password = username, password
+        self.auth = {"Authorization": f"Bearer {json.loads(body)['access_token']}"}
+        self.user_id = self.call("GET", "/api/me", headers=self.auth)["id"]
+        records = self.call("GET", f"/api/users/{self.user_id}/personal-records", headers=self.auth)
+        self.exercise_ids = sorted({record["exercise_id"] for record in records}) or [1]
+        self._live_workout = None
+        self._live_exercise = None
+
+    def call(self, method: str, path: str, **kwargs):
+        """Untimed setup request; returns parsed JSON and raises on errors"""
+        status, body = self.driver.request(method, path, **kwargs)
+        if status >= 400:
+            raise RuntimeError(f"setup {method} {path} failed ({status}): {body[:200]!r}")
+        return json.loads(body) if body else None
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}-{threading.get_ident()}-{self.counter}-{self.rng.randrange(1 << 30)}"
+
+    def exercise_id(self) -> int:
+        return self.rng.choice(self.exercise_ids)
+
+    def live_workout(self) -> int:
+        if self._live_workout is None:
+            self._live_workout = self.call("POST", "/api/workouts", headers=self.auth, json={"name": "Bench live"})["id"]
+        return self._live_workout
+
+    def live_exercise(self) -> int:
+        """A workout exercise with a handful of sets, for set writes"""
+        if self._live_exercise is None:
+            self._live_exercise = self.call(
+                "POST", f"/api/workouts/{self.live_workout()}/exercises", headers=self.auth,
+                json={"exercise_id": self.exercise_id()},
+            )["id"]
+        return self._live_exercise
+
+    def new_set(self) -> int:
+        return self.call("POST", f"/api/workout-exercises/{self.live_exercise()}/sets", headers=self.auth,
+                         json={"reps": 5, "weight": 60})["id"]
+
+    def finished_workout(self) -> dict:
+        start = self.end_date - timedelta(days=self.rng.randint(0, 365), hours=self.rng.randint(0, 12))
+        return {
+            "name": "Bench",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "exercises": [
+                {"exercise_id": self.exercise_id(), "sets": [
+                    {"reps": self.rng.randint(5, 12), "weight": 2.5 * self.rng.randint(8, 40)} for _ in range(4)
+                ]}
+                for _ in range(5)
+            ],
+        }
+
+    def analytics_range(self) -> str:
+        return f"from={(self.end_date - timedelta(days=365)).date()}&to={self.end_date.date()}"
+
+
+@dataclass
+class Route:
+    name: str
+    build: Callable[[Context], RequestSpec]
+    writes: bool = False
+
+
+def _get(path_fn, auth=True):
+    return lambda ctx: ("GET", path_fn(ctx), {"headers": ctx.auth} if auth else {})
+
+
+def _delete_workout_exercise(ctx):
+    we = ctx.call("POST", f"/api/workouts/{ctx.live_workout()}/exercises", headers=ctx.auth,
+                  json={"exercise_id": ctx.exercise_id()})
+    return "DELETE", f"/api/workout-exercises/{we['id']}", {"headers": ctx.auth}
+
+
+def _media_path(ctx):
+    url = ctx.call("PUT", "/api/me/profile-picture", headers=ctx.auth, data=PNG_2PX)["profile_picture"]
+    return url[url.index("/api/"):]
+
+
+ROUTES: List[Route] = [
+    # auth + media
+    Route("POST /api/login", lambda ctx: ("POST", "/api/login", {"json": {"username": ctx.username, "password": ctx.password}})),
+    Route("POST /api/register", lambda ctx: ("POST", "/api/register", {"json": {
+        "username": ctx.unique("bench-reg"), "password": "secret", "email": f"{ctx.unique('r')}@example.com"}}), writes=True),
+    Route("GET /api/me", _get(lambda ctx: "/api/me")),
+    Route("PUT /api/me", lambda ctx: ("PUT", "/api/me", {"headers": ctx.auth, "json": {"email": f"{ctx.username}@example.com"}}), writes=True),
+    Route("PUT /api/me/profile-picture", lambda ctx: ("PUT", "/api/me/profile-picture", {"headers": ctx.auth, "data": PNG_2PX}), writes=True),
+    Route("GET /api/media/<key>", lambda ctx: ("GET", _media_path(ctx), {})),
+    Route("DELETE /api/me/profile-picture", lambda ctx: ("DELETE", "/api/me/profile-picture", {"headers": ctx.auth}), writes=True),
+    # catalog
+    Route("GET /api/exercises", _get(lambda ctx: "/api/exercises", auth=False)),
+    Route("GET /api/exercises?muscle_group", _get(lambda ctx: "/api/exercises?muscle_group=Chest", auth=False)),
+    Route("GET /api/exercises/facets", _get(lambda ctx: "/api/exercises/facets", auth=False)),
+    Route("GET /api/exercises/suggest", _get(lambda ctx: f"/api/exercises/suggest?q={ctx.rng.choice(['ben', 'squ', 'cur', 'pre', 'row'])}", auth=False)),
+    Route("GET /api/exercises/<id>", _get(lambda ctx: f"/api/exercises/{ctx.exercise_id()}", auth=False)),
+    Route("GET /api/muscle-groups", _get(lambda ctx: "/api/muscle-groups", auth=False)),
+    Route("GET /api/equipment", _get(lambda ctx: "/api/equipment", auth=False)),
+    Route("POST /api/exercises", lambda ctx: ("POST", "/api/exercises", {"headers": ctx.auth, "json": {
+        "name": ctx.unique("Bench Curl"), "muscle_group": "Arms"}}), writes=True),
+    Route("GET /api/exercises/<id>/progress", _get(lambda ctx: f"/api/exercises/{ctx.exercise_id()}/progress")),
+    # history reads
+    Route("GET /api/users/<id>/workouts", _get(lambda ctx: f"/api/users/{ctx.user_id}/workouts?limit=20")),
+    Route("GET /api/users/<id>/workouts?view=summary", _get(lambda ctx: f"/api/users/{ctx.user_id}/workouts?limit=50&view=summary")),
+    Route("GET /api/users/<id>/workouts (all)", _get(lambda ctx: f"/api/users/{ctx.user_id}/workouts")),
+    Route("GET /api/users/<id>/personal-records", _get(lambda ctx: f"/api/users/{ctx.user_id}/personal-records")),
+    Route("GET /api/workouts/active", _get(lambda ctx: "/api/workouts/active")),
+    Route("GET /api/sync", _get(lambda ctx: "/api/sync")),
+    Route("GET /api/analytics/volume", _get(lambda ctx: f"/api/analytics/volume?{ctx.analytics_range()}")),
+    Route("GET /api/analytics/summary", _get(lambda ctx: f"/api/analytics/summary?{ctx.analytics_range()}")),
+    # workout writes
+    Route("POST /api/workouts:bulk", lambda ctx: ("POST", "/api/workouts:bulk", {"headers": ctx.auth, "json": ctx.finished_workout()}), writes=True),
+    Route("POST /api/workouts", lambda ctx: ("POST", "/api/workouts", {"headers": ctx.auth, "json": {"name": "Bench"}}), writes=True),
+    Route("PATCH /api/workouts/<id>", lambda ctx: ("PATCH", f"/api/workouts/{ctx.live_workout()}", {"headers": ctx.auth, "json": {"notes": ctx.unique("n")}}), writes=True),
+    Route("POST /api/workouts/<id>/exercises", lambda ctx: ("POST", f"/api/workouts/{ctx.live_workout()}/exercises", {"headers": ctx.auth, "json": {"exercise_id": ctx.exercise_id()}}), writes=True),
+    Route("DELETE /api/workout-exercises/<id>", _delete_workout_exercise, writes=True),
+    Route("PATCH /api/workout-exercises/<id>/reorder", lambda ctx: ("PATCH", f"/api/workout-exercises/{ctx.live_exercise()}/reorder", {"headers": ctx.auth, "json": {"after_id": None}}), writes=True),
+    Route("POST /api/workout-exercises/<id>/sets", lambda ctx: ("POST", f"/api/workout-exercises/{ctx.live_exercise()}/sets", {"headers": ctx.auth, "json": {"reps": 8, "weight": 50}}), writes=True),
+    Route("POST /api/workout-exercises/<id>/sets:batch", lambda ctx: ("POST", f"/api/workout-exercises/{ctx.live_exercise()}/sets:batch", {"headers": ctx.auth, "json": {"sets": [{"reps": 8, "weight": 50}, {"reps": 6, "weight": 55}]}}), writes=True),
+    Route("PATCH /api/sets/<id>", lambda ctx: ("PATCH", f"/api/sets/{ctx.new_set()}", {"headers": ctx.auth, "json": {"reps": 7}}), writes=True),
+    Route("PATCH /api/sets/<id>/reorder", lambda ctx: ("PATCH", f"/api/sets/{ctx.new_set()}/reorder", {"headers": ctx.auth, "json": {"after_id": None}}), writes=True),
+    Route("DELETE /api/sets/<id>", lambda ctx: ("DELETE", f"/api/sets/{ctx.new_set()}", {"headers": ctx.auth}), writes=True),
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def _with_encoding(kwargs: dict, accept_encoding: Optional[str]) -> dict:
+    if accept_encoding:
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "Accept-Encoding": accept_encoding}
+    return kwargs
+
+
+def run_route(route: Route, contexts: List[Context], requests: int, warmup: int,
+              accept_encoding: Optional[str] = None) -> dict:
+    """Issue ``requests`` timed requests for one route spread over one worker per context.
+
+    With ``accept_encoding`` the timed requests ask for a compressed response
+    and ``avg_bytes`` is the size on the wire.
+    """
+    for ctx in contexts:
+        for _ in range(warmup):
+            method, path, kwargs = route.build(ctx)
+            ctx.driver.request(method, path, **_with_encoding(kwargs, accept_encoding))
+
+    per_worker = [requests // len(contexts) + (1 if i < requests % len(contexts) else 0) for i in range(len(contexts))]
+
+    def worker(ctx: Context, count: int):
+        latencies, errors, size = [], 0, 0
+        for _ in range(count):
+            method, path, kwargs = route.build(ctx)
+            kwargs = _with_encoding(kwargs, accept_encoding)
+            start = time.perf_counter()
+            status, body = ctx.driver.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            size += len(body)
+            if status >= 400:
+                errors += 1
+        return latencies, errors, size
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(contexts)) as pool:
+        results = list(pool.map(worker, contexts, per_worker))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for worker_latencies, _, _ in results for latency in worker_latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": sum(errors for _, errors, _ in results),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "rps": round(count / wall, 1) if wall else 0.0,
+        "avg_bytes": round(sum(size for _, _, size in results) / count) if count else 0,
+    }
+
+
+def run(driver, usernames: List[str], password: str, concurrency: int = 4, requests: int = 200,
+        warmup: int = 5, route_filter: Optional[str] = None, include_writes: bool = True,
+        seed: int = 42, end_date: datetime = datetime(2026, 1, 1), accept_encoding: Optional[str] = None,
+        log=print) -> dict:
+    """Benchmark every matching route; returns the report dict"""
+    contexts = [
+        Context(driver, usernames[i % len(usernames)], password, seed + i, end_date)
+        for i in range(concurrency)
+    ]
+    routes = [
+        route for route in ROUTES
+        if (include_writes or not route.writes) and (not route_filter or route_filter in route.name)
+    ]
+    results: Dict[str, dict] = {}
+    for route in routes:
+        results[route.name] = run_route(route, contexts, requests, warmup, accept_encoding)
+        result = results[route.name]
+        log(f"{route.name:52} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  "
+            f"p99 {result['p99_ms']:8.2f} ms  {result['rps']:8.1f} req/s  errors {result['errors']}")
+    return {
+        "meta": {
+            "driver": driver.name,
+            "concurrency": concurrency,
+            "requests_per_route": requests,
+            "accept_encoding": accept_encoding,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "routes": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Regressions of ``report`` against ``baseline``: p95 up or throughput down by more than ``threshold``"""
+    regressions = []
+    for name, current in report["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if previous is None:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
@@ -0,0 +1,335 @@
+"""Optional ASGI serving mode: async database access for hot read routes.
+
+Run from ``api/`` after ``pip install -r requirements-async.txt``::
+
+    uvicorn src.asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+These GET routes are served on the event loop with an ``AsyncSession``, so
+a request waiting on the database (remote Neon round trips) holds no
+thread:
+
+- the catalog (``/api/exercises``, facets, suggest, ``/api/exercises/<id>``,
+  ``/api/muscle-groups``, ``/api/equipment``),
+- history (``/api/users/<id>/workouts``) and ``/api/workouts/active``,
+- ``/api/me``.
+
+They use the same models, statements (``services/history.py``), serializers,
+JSON provider and compression as the Flask views, and the catalog routes run
+the Flask views themselves once the snapshot is fresh, so responses are
+identical (long histories are not streamed here, only compressed).
+Every other request (all writes, ``/metrics``, static files) is passed to
+the Flask app on a thread pool, unchanged.
+
+The async engine is derived from the Flask database URL (``asyncpg`` for
+Postgres, ``aiosqlite`` for SQLite) with the same ``DB_PROFILE`` settings;
+``ASYNC_DATABASE_URL`` overrides it. Async reads always use that engine,
+not ``DATABASE_REPLICA_URLS``.
+
+Run with lifespan events enabled (uvicorn's default ``--lifespan auto``;
+not ``--lifespan off``). The lifespan bootstraps a lazy database and
+disposes the async engine at shutdown: pooled aiosqlite connections each
+own a non-daemon thread that would otherwise keep the process from exiting.
+"""
+import contextlib
+import os
+import time
+import uuid
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from starlette.routing import Match, Route
+    from a2wsgi import WSGIMiddleware
+except ImportError as e:  # pragma: no cover - optional dependency
+    raise ImportError('Async mode needs the packages in api/requirements-async.txt') from e
+
+import jwt
+from werkzeug.exceptions import NotFound
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src import bootstrap, compression, engine_profiles, instrumentation, rate_limit
+from src.main import _database_url, app as flask_app
+from src.models.user import User
+from src.models.exercise import Exercise
+from src.services import catalog, fieldsets, history
+from src.serializers.workouts import assemble_workout, serialize_workouts_async
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'postgresql+psycopg2': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+# libpq query parameters asyncpg does not understand
+LIBPQ_ONLY_PARAMS = ('sslmode', 'channel_binding')
+
+
+def async_database_url(url):
+    """The async-driver form of a sync SQLAlchemy URL"""
+    scheme, rest = url.split('://', 1)
+    scheme = ASYNC_DRIVERS.get(scheme, scheme)
+    if scheme == 'postgresql+asyncpg':
+        parts = urlsplit(f'{scheme}://{rest}')
+        query = parse_qsl(parts.query)
+        params = [(key, value) for key, value in query if key not in LIBPQ_ONLY_PARAMS]
+        sslmode = dict(query).get('sslmode')
+        if sslmode and sslmode != 'disable':
+            params.append(('ssl', sslmode))
+        return urlunsplit(parts._replace(query=urlencode(params)))
+    return f'{scheme}://{rest}'
+
+
+def create_engine_for(url):
+    """Async engine with the DB_PROFILE settings of the sync one"""
+    profile = engine_profiles.resolve(url)
+    options = profile.engine_options()
+    if url.startswith('postgresql+asyncpg'):
+        connect_args = {}
+        if 'options' in options.pop('connect_args', {}):
+            connect_args['server_settings'] = {'statement_timeout': str(profile.statement_timeout_ms)}
+        if profile.pgbouncer:
+            # Transaction pooling: no named prepared statements that outlive a transaction
+            connect_args.update(statement_cache_size=0, prepared_statement_name_func=lambda: f'__asyncpg_{uuid.uuid4()}__')
+        options['connect_args'] = connect_args
+    engine = create_async_engine(url, **options)
+    engine_profiles.install(engine.sync_engine, profile)
+    return engine
+
+
+engine = create_engine_for(os.environ.get('ASYNC_DATABASE_URL') or async_database_url(flask_app.config['SQLALCHEMY_DATABASE_URI']))
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+class AuthError(Exception):
+    def __init__(self, status, message):
+        self.status, self.message = status, message
+
+
+def _identity(request):
+    """JWT identity, validated like flask_jwt_extended (same secret, algorithm and messages)"""
+    header = request.headers.get('Authorization')
+    if not header:
+        raise AuthError(401, 'Authorization token required: Missing Authorization Header')
+    scheme, _, token = header.partition(' ')
+    if scheme != 'Bearer' or not token:
+        raise AuthError(401, "Authorization token required: Missing 'Bearer' type in 'Authorization' header."
+                             " Expected 'Authorization: Bearer <JWT>'")
+    try:
+        claims = jwt.decode(
+            token, flask_app.config['JWT_SECRET_KEY'],
+            algorithms=[flask_app.config.get('JWT_ALGORITHM', 'HS256')], options={'verify_aud': False},
+        )
+    except jwt.PyJWTError as e:
+        raise AuthError(422, f'Invalid token: {e}')
+    if claims.get('type', 'access') != 'access':
+        raise AuthError(422, 'Invalid token: Only non-refresh tokens are allowed')
+    return claims.get(flask_app.config.get('JWT_IDENTITY_CLAIM', 'sub'))
+
+
+def _from_flask(response):
+    """Starlette response carrying a Flask response's status, headers and body"""
+    headers = [(key, value) for key, value in response.headers.items() if key.lower() != 'content-length']
+    return Response(response.get_data(), status_code=response.status_code, headers=dict(headers))
+
+
+def _json(payload, status=200, headers=None):
+    response = flask_app.json.response(payload)
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def _flask_context(request):
+    """Request context mirroring the ASGI request (url_for, request.args/headers in shared code)"""
+    return flask_app.test_request_context(
+        request.url.path, base_url=f'{request.url.scheme}://{request.url.netloc}',
+        query_string=request.url.query, headers=list(request.headers.items()),
+    )
+
+
+def route(path, flask_rule):
+    """Register an async GET handler returning a Flask response; metrics are labelled with the Flask rule"""
+    flask_endpoint = next(
+        rule.endpoint for rule in flask_app.url_map.iter_rules() if rule.rule == flask_rule and 'GET' in rule.methods
+    )
+
+    def decorator(handler):
+        async def endpoint(request):
+            start = time.perf_counter()
+            try:
+                retry_after = _rate_limited(request, flask_endpoint)
+                if retry_after:
+                    with flask_app.app_context():
+                        response = rate_limit.too_many_requests(retry_after)
+                else:
+                    response = await handler(request)
+            except AuthError as e:
+                response = _json({'message': e.message}, e.status)
+            response = _from_flask(compression.compress_response(response, request.headers.get('accept-encoding')))
+            instrumentation.REQUESTS.inc((request.method, flask_rule, str(response.status_code)))
+            instrumentation.LATENCY.observe((request.method, flask_rule), time.perf_counter() - start)
+            instrumentation.RESPONSE_SIZE.observe((flask_rule,), len(response.body))
+            return response
+        ROUTES.append(Route(path, endpoint, methods=['GET']))
+        return handler
+    return decorator
+
+
+def _rate_limited(request, flask_endpoint):
+    """Seconds to wait if this client is over its limit (the concurrency cap is Flask-only)"""
+    if not rate_limit.ENABLED:
+        return 0
+    with flask_app.app_context():
+        key = rate_limit.client_key(
+            request.headers.get('authorization'), request.client.host if request.client else None,
+            request.headers.get('x-forwarded-for'),
+        )
+    return rate_limit.check(flask_endpoint, key)
+
+
+ROUTES = []
+
+CATALOG_VIEWS = {
+    '/api/exercises': 'exercise.get_exercises',
+    '/api/exercises/facets': 'exercise.get_exercise_facets',
+    '/api/exercises/suggest': 'exercise.suggest_exercises',
+    '/api/muscle-groups': 'exercise.get_muscle_groups',
+    '/api/equipment': 'exercise.get_equipment',
+}
+
+
+def _catalog_route(path, endpoint):
+    @route(path, path)
+    async def catalog_view(request):
+        with _flask_context(request):
+            if catalog.peek_snapshot() is None:
+                async with Session() as session:
+                    await catalog.get_snapshot_async(session)
+            # The snapshot is fresh, so the Flask view answers from memory
+            return flask_app.make_response(flask_app.view_functions[endpoint]())
+
+
+for _path, _endpoint in CATALOG_VIEWS.items():
+    _catalog_route(_path, _endpoint)
+
+
+async def _body(request, session, type_, data, fieldset):
+    """fieldsets.body on the async session"""
+    exercises = None
+    if fieldset.include == fieldsets.SIDELOAD:
+        with _flask_context(request):
+            snapshot = catalog.peek_snapshot() or await catalog.get_snapshot_async(session)
+        exercises, missing = fieldsets.side_loaded(snapshot, fieldsets.exercise_ids(type_, data))
+        if missing:
+            result = await session.execute(fieldsets.missing_statement(missing))
+            exercises.update((exercise.id, exercise.to_dict()) for exercise in result.scalars())
+    return fieldsets.document(fieldsets.shape(type_, data, fieldset), fieldset, exercises)
+
+
+@route('/api/exercises/{exercise_id:int}', '/api/exercises/<int:exercise_id>')
+async def get_exercise(request):
+    exercise_id = request.path_params['exercise_id']
+    try:
+        fieldset = fieldsets.parse(request.query_params, 'exercise')
+    except ValueError as e:
+        return _json({'message': str(e)}, 400)
+    with _flask_context(request):
+        async with Session() as session:
+            snapshot = catalog.peek_snapshot() or await catalog.get_snapshot_async(session)
+            row = snapshot.by_id.get(exercise_id)
+            if row is None:
+                # Not in this worker's snapshot yet (e.g. created elsewhere moments ago)
+                exercise = await session.get(Exercise, exercise_id)
+                if exercise is None:
+                    return NotFound().get_response()
+                row = exercise.to_dict()
+    return _json(fieldsets.shape('exercise', row, fieldset))
+
+
+@route('/api/me', '/api/me')
+async def get_current_user(request):
+    user_id = int(_identity(request))
+    async with Session() as session:
+        user = await session.get(User, user_id)
+    if user is None:
+        return NotFound().get_response()
+    with _flask_context(request):
+        return _json(user.to_dict())
+
+
+@route('/api/users/{user_id:int}/workouts', '/api/users/<int:user_id>/workouts')
+async def get_user_workouts(request):
+    user_id = request.path_params['user_id']
+    if int(_identity(request)) != user_id:
+        return _json({'message': 'Access denied'}, 403)
+    try:
+        view, limit, before = history.parse_params(request.query_params)
+        fieldset = fieldsets.parse(request.query_params, 'workout')
+    except ValueError as e:
+        return _json({'message': str(e)}, 400)
+
+    async with Session() as session:
+        workouts = (await session.execute(history.page_statement(user_id, limit, before))).scalars().all()
+        workouts, next_cursor = history.split_page(workouts, limit)
+        if view == 'summary':
+            count_rows = (await session.execute(history.counts_statement([w.id for w in workouts]))).all() if workouts else []
+            payload = history.summaries(workouts, count_rows)
+        elif not fieldset.wants('workout', 'exercises'):
+            payload = [assemble_workout(workout, [], {}, {}) for workout in workouts]
+        else:
+            payload = await serialize_workouts_async(session, workouts, fieldset.embed_exercise)
+        payload = await _body(request, session, 'workout', payload, fieldset)
+    return _json(payload, headers={'X-Next-Cursor': next_cursor} if next_cursor else None)
+
+
+@route('/api/workouts/active', '/api/workouts/active')
+async def get_active_workout(request):
+    user_id = int(_identity(request))
+    try:
+        fieldset = fieldsets.parse(request.query_params, 'workout')
+    except ValueError as e:
+        return _json({'message': str(e)}, 400)
+    async with Session() as session:
+        workout = (await session.execute(history.active_statement(user_id))).scalars().first()
+        if workout is None:
+            return flask_app.response_class(status=204)
+        payload = (await serialize_workouts_async(session, [workout], fieldset.embed_exercise))[0]
+        payload = await _body(request, session, 'workout', payload, fieldset)
+    return _json(payload)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    mode = (os.environ.get('BOOTSTRAP_MODE') or bootstrap.default_mode(_database_url())).lower()
+    if mode == 'lazy':
+        # Async routes bypass Flask's before_request hook
+        await run_in_threadpool(bootstrap.ensure_bootstrapped, flask_app)
+    yield
+    await engine.dispose()
+
+
+async_app = Starlette(
+    routes=ROUTES,
+    middleware=[Middleware(
+        CORSMiddleware, allow_origins=['*'], allow_headers=['Content-Type', 'Authorization'],
+        expose_headers=['X-Next-Cursor'], allow_methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS'],
+    )],
+    lifespan=lifespan,
+)
+wsgi_app = WSGIMiddleware(flask_app)
+
+
+async def app(scope, receive, send):
+    """GETs matching an async route go to Starlette, everything else to Flask"""
+    if scope['type'] == 'lifespan':
+        return await async_app(scope, receive, send)
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+        for candidate in ROUTES:
+            if candidate.matches(scope)[0] == Match.FULL:
+                return await async_app(scope, receive, send)
+    return await wsgi_app(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('src.asgi:app', host='0.0.0.0', port=5000)
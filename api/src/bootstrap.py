@@ -0,0 +1,177 @@
+"""One-time database bootstrap: schema, migrations and seed data.
+
+This used to run at import time of ``src.main`` on every cold start and in
+every worker. It now runs:
+
+- explicitly via ``python src/scripts/bootstrap.py`` (or ``flask --app
+  src.main bootstrap``) as a deploy step;
+- automatically according to ``BOOTSTRAP_MODE``:
+    ``eager`` - at app creation (default for local SQLite, keeps
+                ``python index.py`` zero-config),
+    ``lazy``  - on the first request, and only if the schema version in the
+                database is behind the code (default for Postgres; one cheap
+                query per process),
+    ``off``   - never.
+
+Concurrent workers are serialized with a database advisory lock on Postgres
+(a file lock next to the SQLite database otherwise), and every step is
+idempotent, so losing the race simply finds the work already done.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from src.models.user import db
+
+# Arbitrary application-wide key for pg_advisory_lock
+ADVISORY_LOCK_KEY = 0x6D67675F  # "mgg_"
+
+_state_lock = threading.Lock()
+_bootstrapped = False
+
+
+def default_mode(database_url):
+    return 'lazy' if database_url else 'eager'
+
+
+@contextmanager
+def advisory_lock(engine):
+    """Hold a cross-process lock for the duration of the block"""
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                conn.commit()
+        return
+
+    database = engine.url.database
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None  # Windows dev: a single local process, nothing to coordinate
+    if fcntl is None or not database or database == ':memory:':
+        yield
+        return
+    with open(f'{database}.bootstrap.lock', 'w') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def schema_is_current(engine):
+    """True if every known migration is recorded as applied (single query)"""
+    from src.migrations import runner as migrations
+    latest = max((module.VERSION for module in migrations.discover()), default=0)
+    try:
+        with engine.connect() as conn:
+            current = conn.execute(text('SELECT max(version) FROM schema_migrations')).scalar()
+    except Exception:
+        return False
+    return (current or 0) >= latest
+
+
+def _seed_local_dev():
+    """Default user and a handful of exercises for local SQLite development"""
+    from src.models.user import User
+    from src.models.exercise import Exercise
+
+    if not User.query.filter_by(username='melanie').first():
+        user = User(username='melanie', email='melanie@example.com')
+        user.set_password('1234')
+        db.session.add(user)
+        db.session.commit()
+        print("Created default user: melanie/1234")
+
+    # Seed basic exercises if database is empty
+    if Exercise.query.count() == 0:
+        basic_exercises = [
+            {'name': 'Push-ups', 'muscle_group': 'Chest', 'equipment': 'Bodyweight', 'difficulty': 'Beginner'},
+            {'name': 'Squats', 'muscle_group': 'Legs', 'equipment': 'Bodyweight', 'difficulty': 'Beginner'},
+            {'name': 'Bench Press', 'muscle_group': 'Chest', 'equipment': 'Barbell', 'difficulty': 'Intermediate'},
+            {'name': 'Deadlift', 'muscle_group': 'Back', 'equipment': 'Barbell', 'difficulty': 'Advanced'},
+            {'name': 'Pull-ups', 'muscle_group': 'Back', 'equipment': 'Bodyweight', 'difficulty': 'Intermediate'},
+            {'name': 'Overhead Press', 'muscle_group': 'Shoulders', 'equipment': 'Barbell', 'difficulty': 'Intermediate'},
+            {'name': 'Bicep Curls', 'muscle_group': 'Arms', 'equipment': 'Dumbbell', 'difficulty': 'Beginner'},
+            {'name': 'Tricep Dips', 'muscle_group': 'Arms', 'equipment': 'Bodyweight', 'difficulty': 'Beginner'},
+            {'name': 'Lunges', 'muscle_group': 'Legs', 'equipment': 'Bodyweight', 'difficulty': 'Beginner'},
+            {'name': 'Planks', 'muscle_group': 'Core', 'equipment': 'Bodyweight', 'difficulty': 'Beginner'}
+        ]
+
+        for ex_data in basic_exercises:
+            exercise = Exercise(
+                name=ex_data['name'],
+                muscle_group=ex_data['muscle_group'],
+                equipment=ex_data['equipment'],
+                difficulty=ex_data['difficulty'],
+                instructions='{"allowed_fields": ["reps", "weight"]}',
+                is_custom=False
+            )
+            db.session.add(exercise)
+
+        db.session.commit()
+        print(f"Seeded {len(basic_exercises)} basic exercises (SQLite dev)")
+
+
+def _auto_seed_free_exercise_db():
+    """Production-safe: import the full Free Exercise DB once if the catalog is empty"""
+    from src.models.exercise import Exercise
+
+    count = Exercise.query.count()
+    if count > 0:
+        print(f"Skipping auto-seed: database already has {count} exercises.")
+        return
+    try:
+        from src.scripts.import_free_exercise_db import iter_dataset, import_exercises
+        local_path = os.path.join(os.path.dirname(__file__), 'data', 'free-exercise-db', 'exercises.json')
+        summary = import_exercises(iter_dataset(local_path, download=False))
+        print(
+            f"Auto-seeded Free Exercise DB into Postgres -> inserted: {summary['inserted']}, "
+            f"skipped: {summary['skipped_dupe']}, updated_difficulty: {summary['updated_difficulty']}"
+        )
+    except Exception as e:
+        db.session.rollback()
+        print(f"Auto-seed failed: {e}")
+
+
+def run(app):
+    """Create tables, apply migrations and seed; safe to call from many processes"""
+    global _bootstrapped
+    # Import all models so create_all sees every table
+    import src.models.exercise  # noqa: F401
+    import src.models.media  # noqa: F401
+    from src.migrations import runner as migrations
+
+    with app.app_context():
+        with advisory_lock(db.engine):
+            db.create_all()
+            # Bring existing databases up to date (create_all never alters existing tables)
+            migrations.upgrade(db.engine)
+
+            using_postgres = db.engine.dialect.name == 'postgresql'
+            if not using_postgres:
+                _seed_local_dev()
+            auto_seed = os.environ.get('AUTO_SEED_IF_EMPTY', '').lower() in ('1', 'true', 'yes')
+            if using_postgres and auto_seed:
+                _auto_seed_free_exercise_db()
+    _bootstrapped = True
+
+
+def ensure_bootstrapped(app):
+    """Lazy mode: bootstrap once per process if the database schema is behind the code"""
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _state_lock:
+        if _bootstrapped:
+            return
+        if schema_is_current(db.engine):
+            _bootstrapped = True
+            return
+        run(app)
@@ -0,0 +1,115 @@
+"""Negotiated response compression.
+
+``init_app`` compresses JSON and text responses of at least
+``COMPRESS_MIN_BYTES`` (default 1024) with the best coding the client
+accepts: Brotli when the optional ``brotli`` package is installed, else
+gzip. Smaller bodies are sent as is - the coding overhead and CPU outweigh
+the saved bytes. Streamed responses are compressed chunk by chunk.
+
+Responses that already carry a ``Content-Encoding`` (the pre-compressed
+catalog bodies, see ``src/services/catalog.py``) or ``Cache-Control:
+no-transform`` are left alone. ``COMPRESS_LEVEL`` (gzip, default 6) and
+``BROTLI_QUALITY`` (default 4) trade CPU for size on dynamic responses;
+cached bodies that are compressed once use the maximum settings.
+"""
+import gzip
+import os
+import zlib
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used instead
+    brotli = None
+
+MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES') or 1024)
+GZIP_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY') or 4)
+# For bodies compressed once and served many times
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+CODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript')
+
+
+def negotiate(accept_encoding):
+    """The coding to use for an Accept-Encoding header value, or None for identity"""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(CODINGS)
+
+
+def compress_bytes(body, coding, static=False):
+    if coding == 'br':
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL if static else GZIP_LEVEL, mtime=0)
+
+
+def _compressor(coding):
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def _compress_stream(chunks, coding):
+    process, finish = _compressor(coding)
+    try:
+        for chunk in chunks:
+            compressed = process(chunk)
+            if compressed:
+                yield compressed
+        yield finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _add_vary(response):
+    vary = response.vary
+    if 'accept-encoding' not in vary:
+        vary.add('Accept-Encoding')
+
+
+def compress_response(response, accept_encoding):
+    """Compress ``response`` in place if it qualifies; returns it"""
+    if (
+        response.status_code < 200 or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or 'no-transform' in (response.headers.get('Cache-Control') or '')
+    ):
+        return response
+    _add_vary(response)
+    if not response.is_streamed and (response.content_length or 0) < MIN_BYTES:
+        return response
+    coding = negotiate(accept_encoding)
+    if coding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, coding)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress_bytes(response.get_data(), coding))
+    response.headers['Content-Encoding'] = coding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{coding}', weak)
+    return response
+
+
+def init_app(app):
+    # Registered after instrumentation, so the recorded response size is
+    # the compressed one (after_request handlers run in reverse order)
+    @app.after_request
+    def _compress(response):
+        if request.method == 'HEAD':
+            return response
+        return compress_response(response, request.headers.get('Accept-Encoding'))
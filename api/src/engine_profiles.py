@@ -0,0 +1,149 @@
+"""Deployment-aware SQLAlchemy engine settings.
+
+``DB_PROFILE`` picks one of:
+
+- ``sqlite``     - local development file. WAL journal (readers no longer block
+                   the writer), ``synchronous=NORMAL``, a memory map and a busy
+                   timeout so concurrent writes wait instead of failing.
+- ``serverless`` - Vercel/Lambda functions talking to Neon. ``NullPool``: a
+                   frozen or recycled function instance must not hold pooled
+                   connections, and Neon's pooler (pgbouncer) already does the
+                   pooling. Behind pgbouncer (a ``-pooler`` host or
+                   ``DB_POOLER=pgbouncer``) startup options are rejected, so the
+                   statement timeout is set per transaction instead.
+- ``server``     - long-running multi-worker processes (Docker, gunicorn). A
+                   bounded ``QueuePool`` per worker with pre-ping and recycling
+                   so connections dropped by the server or a NAT are replaced.
+
+The default is ``sqlite`` for SQLite URLs, ``serverless`` when running on
+Vercel/Lambda and ``server`` otherwise. Individual settings can be overridden
+with ``DB_POOL_SIZE``, ``DB_MAX_OVERFLOW``, ``DB_POOL_TIMEOUT``,
+``DB_POOL_RECYCLE``, ``DB_PRE_PING``, ``DB_STATEMENT_TIMEOUT_MS`` (0 disables)
+and ``SQLITE_MMAP_SIZE``.
+"""
+import os
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+
+PROFILES = ('sqlite', 'serverless', 'server')
+
+
+@dataclass
+class EngineProfile:
+    name: str
+    pool: str = 'queue'  # queue, null
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 10
+    pool_recycle: int = 1800
+    pre_ping: bool = True
+    statement_timeout_ms: int = 15000
+    pgbouncer: bool = False
+    sqlite_pragmas: dict = field(default_factory=dict)
+
+    def engine_options(self):
+        """Keyword arguments for ``create_engine`` (SQLALCHEMY_ENGINE_OPTIONS)"""
+        if self.name == 'sqlite':
+            # Wait up to 15s for the write lock (sqlite3's own default is 5s)
+            return {'connect_args': {'timeout': 15}}
+        options = {'pool_pre_ping': self.pre_ping}
+        if self.pool == 'null':
+            options['poolclass'] = NullPool
+        else:
+            options.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+            )
+        if self.statement_timeout_ms and not self.pgbouncer:
+            options['connect_args'] = {'options': f'-c statement_timeout={self.statement_timeout_ms}'}
+        return options
+
+    def describe(self):
+        """Effective settings, for the startup log"""
+        if self.name == 'sqlite':
+            return {'profile': self.name, **self.sqlite_pragmas}
+        settings = {'profile': self.name, 'pool': self.pool, 'pre_ping': self.pre_ping,
+                    'statement_timeout_ms': self.statement_timeout_ms, 'pgbouncer': self.pgbouncer}
+        if self.pool != 'null':
+            settings.update(pool_size=self.pool_size, max_overflow=self.max_overflow,
+                            pool_timeout=self.pool_timeout, pool_recycle=self.pool_recycle)
+        return settings
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def default_profile(database_url):
+    if database_url.startswith('sqlite'):
+        return 'sqlite'
+    if os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        return 'serverless'
+    return 'server'
+
+
+def resolve(database_url):
+    """The EngineProfile for this URL and environment"""
+    name = (os.environ.get('DB_PROFILE') or default_profile(database_url)).lower()
+    if name not in PROFILES:
+        raise ValueError(f'Unknown DB_PROFILE {name!r}; expected one of {", ".join(PROFILES)}')
+    if name == 'sqlite':
+        return EngineProfile(name, sqlite_pragmas={
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+            'busy_timeout': 15000,
+            'temp_store': 'MEMORY',
+        })
+
+    pooler = (os.environ.get('DB_POOLER') or '').lower()
+    pgbouncer = pooler == 'pgbouncer' or (not pooler and '-pooler.' in database_url)
+    if name == 'serverless':
+        profile = EngineProfile(name, pool='null', pre_ping=False, pgbouncer=pgbouncer,
+                                statement_timeout_ms=10000)
+    else:
+        profile = EngineProfile(name, pgbouncer=pgbouncer)
+    profile.pool_size = _env_int('DB_POOL_SIZE', profile.pool_size)
+    profile.max_overflow = _env_int('DB_MAX_OVERFLOW', profile.max_overflow)
+    profile.pool_timeout = _env_int('DB_POOL_TIMEOUT', profile.pool_timeout)
+    profile.pool_recycle = _env_int('DB_POOL_RECYCLE', profile.pool_recycle)
+    profile.pre_ping = _env_bool('DB_PRE_PING', profile.pre_ping)
+    profile.statement_timeout_ms = _env_int('DB_STATEMENT_TIMEOUT_MS', profile.statement_timeout_ms)
+    return profile
+
+
+def install(engine, profile):
+    """Register the connection-level hooks a profile needs on ``engine``"""
+    if profile.name == 'sqlite':
+        in_memory = engine.url.database in (None, '', ':memory:')
+
+        @event.listens_for(engine, 'connect')
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in profile.sqlite_pragmas.items():
+                if pragma == 'journal_mode' and in_memory:
+                    continue
+                cursor.execute(f'PRAGMA {pragma}={value}')
+            cursor.close()
+        return
+
+    if profile.pgbouncer and profile.statement_timeout_ms:
+        # Transaction pooling hands each transaction a different server
+        # connection, so a session-level SET would leak to other clients
+        @event.listens_for(engine, 'begin')
+        def _statement_timeout(conn):
+            cursor = conn.connection.cursor()
+            cursor.execute(f'SET LOCAL statement_timeout = {int(profile.statement_timeout_ms)}')
+            cursor.close()
@@ -0,0 +1,272 @@
+"""Request metrics, SQL accounting and structured logging.
+
+``init_app`` hooks Flask's request signals and SQLAlchemy's cursor events to
+record, per endpoint (the URL rule, so cardinality stays bounded):
+
+- request latency and response size histograms, request counts by status;
+- SQL statements and time spent in the database per request.
+
+They are exposed in Prometheus text format at ``/metrics`` (optionally
+protected by ``METRICS_TOKEN``). Metrics live in process memory, so each
+worker/serverless instance reports its own series; scrape per instance or
+aggregate downstream.
+
+Requests slower than ``SLOW_REQUEST_MS`` are logged at WARNING with their
+slowest statements, as are requests exceeding their ``src.query_budget``
+budget. Everything else logs through ``logging`` as one JSON
+object per line; ``LOG_LEVEL`` defaults to WARNING, so debug output is off
+unless asked for.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src import query_budget
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS') or 500)
+# Statements kept per request for the slow-request log
+SLOW_LOG_STATEMENTS = 5
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra={...}`` keys become fields"""
+    _reserved = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._reserved})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """Attach a JSON stderr handler to the ``src`` logger (idempotent)"""
+    root = logging.getLogger('src')
+    if any(getattr(handler, '_mgg', False) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    handler._mgg = True
+    root.addHandler(handler)
+    root.setLevel((os.environ.get('LOG_LEVEL') or 'WARNING').upper())
+    root.propagate = False
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, label_values)} {_number(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, label_values, amount=1):
+        self.inc(label_values, -amount)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _labels(self.labels + ('le',), label_values + (_number(bound),))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _labels(self.labels + ('le',), label_values + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {series[-1]}')
+                lines.append(f'{self.name}_sum{_labels(self.labels, label_values)} {_number(series[-2])}')
+                lines.append(f'{self.name}_count{_labels(self.labels, label_values)} {series[-1]}')
+        return lines
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, tuple(labels))
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, labels=()):
+        metric = Gauge(name, help_text, tuple(labels))
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, tuple(labels), buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+REQUESTS = registry.counter('http_requests_total', 'HTTP requests by endpoint and status', ('method', 'endpoint', 'status'))
+LATENCY = registry.histogram('http_request_duration_seconds', 'Request latency', ('method', 'endpoint'))
+RESPONSE_SIZE = registry.histogram('http_response_size_bytes', 'Response body size', ('endpoint',), SIZE_BUCKETS)
+DB_QUERIES = registry.histogram('db_queries_per_request', 'SQL statements per request', ('endpoint',), QUERY_COUNT_BUCKETS)
+DB_TIME = registry.histogram('db_time_per_request_seconds', 'Time spent in SQL per request', ('endpoint',))
+SLOW_REQUESTS = registry.counter('http_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS', ('endpoint',))
+OVER_BUDGET = registry.counter('db_query_budget_exceeded_total', 'Requests over their query budget', ('endpoint',))
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if conn.get_execution_options().get('skip_accounting'):
+        return
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if conn.get_execution_options().get('skip_accounting'):
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not has_request_context():
+        return
+    stats = g.get('_sql_stats')
+    if stats is None:
+        return
+    stats['count'] += 1
+    stats['time'] += elapsed
+    slowest = stats['slowest']
+    if len(slowest) < SLOW_LOG_STATEMENTS or elapsed > slowest[0][0]:
+        bisect.insort(slowest, (elapsed, statement))
+        del slowest[:-SLOW_LOG_STATEMENTS]
+
+
+def current_sql_stats():
+    """(statements, seconds) executed so far in this request, or None outside one"""
+    stats = g.get('_sql_stats') if has_request_context() else None
+    return (stats['count'], stats['time']) if stats else None
+
+
+def init_app(app):
+    configure_logging()
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+        g._sql_stats = {'count': 0, 'time': 0.0, 'slowest': []}
+
+    @app.after_request
+    def _record(response):
+        start = g.pop('_request_start', None)
+        stats = g.pop('_sql_stats', None)
+        if start is None or stats is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = _endpoint()
+        REQUESTS.inc((request.method, endpoint, str(response.status_code)))
+        LATENCY.observe((request.method, endpoint), elapsed)
+        if not response.is_streamed and response.content_length is not None:
+            RESPONSE_SIZE.observe((endpoint,), response.content_length)
+        DB_QUERIES.observe((endpoint,), stats['count'])
+        DB_TIME.observe((endpoint,), stats['time'])
+
+        budget = query_budget.budget_for(request.method, request.endpoint or '')
+        if budget is not None and stats['count'] > budget:
+            OVER_BUDGET.inc((endpoint,))
+            logger.warning('query budget exceeded', extra={
+                'method': request.method, 'endpoint': endpoint, 'sql_count': stats['count'], 'budget': budget,
+            })
+
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            SLOW_REQUESTS.inc((endpoint,))
+            logger.warning('slow request', extra={
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+                'sql_count': stats['count'],
+                'sql_ms': round(stats['time'] * 1000, 1),
+                'slowest_sql': [
+                    {'ms': round(seconds * 1000, 2), 'sql': ' '.join(statement.split())[:500]}
+                    for seconds, statement in reversed(stats['slowest'])
+                ],
+            })
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        token = os.environ.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return {'message': 'Unauthorized'}, 401
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,106 @@
+"""JSON encoding for responses.
+
+``init_app`` installs ``OrjsonProvider`` as ``app.json`` when ``orjson`` is
+installed (``JSON_PROVIDER=default`` keeps Flask's stdlib provider). Every
+``jsonify``, ``app.json.dumps`` (catalog snapshot bodies) and the async path
+in ``src/asgi.py`` go through ``app.json``, so they switch together.
+
+Output differs from the stdlib provider only in ways clients don't see:
+object keys keep their insertion order instead of being sorted and non-ASCII
+text is sent as UTF-8 instead of ``\\uXXXX`` escapes. Types orjson doesn't
+handle natively (dates, ``Decimal``, dataclasses, ``Markup``) fall back to
+Flask's ``default`` so they serialize exactly as before.
+
+``json_array_response`` streams a large list batch by batch, so the full
+body (and, with a loader that works per batch, the full object tree) never
+sits in memory at once.
+"""
+import os
+
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib provider is used instead
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """``DefaultJSONProvider`` with orjson doing the encoding and decoding"""
+
+    def _options(self, pretty=False):
+        # Datetimes/dataclasses go through ``default`` to keep Flask's formats
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj, pretty=False):
+        return orjson.dumps(obj, default=self.default, option=self._options(pretty))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {'indent', 'separators'}:
+            # Arguments only the json module understands
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, pretty=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, pretty) + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Install the configured JSON provider on ``app``; returns its name"""
+    name = (os.environ.get('JSON_PROVIDER') or ('orjson' if orjson is not None else 'default')).lower()
+    if name not in ('orjson', 'default'):
+        raise ValueError(f"Unknown JSON_PROVIDER {name!r}; expected 'orjson' or 'default'")
+    if name == 'orjson':
+        if orjson is None:
+            raise ImportError('JSON_PROVIDER=orjson needs the orjson package')
+        app.json = OrjsonProvider(app)
+        # Sorting costs time on every response and only the catalog ETag
+        # depends on key order, which is stable either way
+        app.json.sort_keys = False
+        app.json.ensure_ascii = False
+    return name
+
+
+def encode_item(provider, item):
+    """Compact JSON bytes for one value"""
+    if isinstance(provider, OrjsonProvider):
+        return provider.dumps_bytes(item)
+    return provider.dumps(item, separators=(',', ':')).encode('utf-8')
+
+
+def json_array_response(batches, headers=None):
+    """Stream a JSON array from an iterable of lists.
+
+    The body is byte-for-byte what ``jsonify`` would produce for the
+    concatenated lists (compact form). Batches are produced lazily inside the
+    request context, so they may query the database.
+    """
+    provider = current_app.json
+
+    def generate():
+        first = True
+        yield b'['
+        for batch in batches:
+            if not batch:
+                continue
+            chunk = b','.join(encode_item(provider, item) for item in batch)
+            yield chunk if first else b',' + chunk
+            first = False
+        yield b']\n'
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=provider.mimetype)
+    response.headers.update(headers or {})
+    return response
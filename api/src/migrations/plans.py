@@ -0,0 +1,85 @@
+"""Query-plan checks for the hot queries the indexes in v0001 are meant to serve.
+
+Use ``assert_uses_index`` in tests (``tests/test_query_plans.py``), or run
+``python -m src.scripts.migrate --check-plans`` against a real database. On Postgres, sequential scans are
+disabled for the duration of the EXPLAIN so that tiny dev/test tables still
+reveal whether a usable index exists.
+"""
+from sqlalchemy import text
+
+# name -> (SQL, params, index expected in the plan)
+HOT_QUERIES = {
+    'workout_history_page': (
+        'SELECT * FROM workout_session WHERE user_id = :uid '
+        'AND (start_time < :ts OR (start_time = :ts AND id < :id)) '
+        'ORDER BY start_time DESC, id DESC LIMIT 20',
+        {'uid': 1, 'ts': '2024-01-01 00:00:00', 'id': 1},
+        'ix_workout_session_user_start',
+    ),
+    'active_workout': (
+        'SELECT * FROM workout_session WHERE user_id = :uid AND end_time IS NULL '
+        'ORDER BY start_time DESC LIMIT 1',
+        {'uid': 1},
+        'ix_workout_session_active',
+    ),
+    'workout_exercises_for_sessions': (
+        'SELECT * FROM workout_exercise WHERE session_id IN (:a, :b) ORDER BY sort_key, id',
+        {'a': 1, 'b': 2},
+        'ix_workout_exercise_session',
+    ),
+    'sets_for_workout_exercise': (
+        'SELECT max(sort_key), count(*) FROM exercise_set WHERE workout_exercise_id = :we',
+        {'we': 1},
+        'ix_exercise_set_workout_exercise',
+    ),
+    'exercise_by_name': (
+        'SELECT * FROM exercise WHERE name = :name',
+        {'name': 'Bench Press'},
+        'ix_exercise_name',
+    ),
+    'personal_records_for_exercise': (
+        'SELECT * FROM personal_record WHERE user_id = :uid AND exercise_id = :eid',
+        {'uid': 1, 'eid': 1},
+        'ix_personal_record_user_exercise',
+    ),
+}
+
+
+def explain(conn, sql, params=None):
+    """Return the query plan as a list of text lines for SQLite or Postgres.
+
+    ``sql`` is SQL text or a SQLAlchemy statement (its bound values are
+    rendered inline, so the plan is that of the statement the app runs).
+    """
+    if not isinstance(sql, str):
+        sql = str(sql.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params or {}).fetchall()
+        return [row[-1] for row in rows]
+    if dialect == 'postgresql':
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        rows = conn.execute(text(f'EXPLAIN {sql}'), params or {}).fetchall()
+        return [row[0] for row in rows]
+    raise ValueError(f'Query plans not supported for dialect {dialect}')
+
+
+def uses_index(plan, index_name):
+    return any(index_name in line for line in plan)
+
+
+def assert_uses_index(conn, sql, index_name, params=None):
+    """Fail with the plan in the message if ``sql`` does not use ``index_name``"""
+    plan = explain(conn, sql, params)
+    assert uses_index(plan, index_name), f'Expected {index_name} in plan:\n' + '\n'.join(plan)
+    return plan
+
+
+def check_hot_queries(engine):
+    """Explain every hot query; returns {name: (ok, plan_lines)}"""
+    results = {}
+    for name, (sql, params, index_name) in HOT_QUERIES.items():
+        with engine.begin() as conn:
+            plan = explain(conn, sql, params)
+        results[name] = (uses_index(plan, index_name), plan)
+    return results
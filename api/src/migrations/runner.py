@@ -0,0 +1,95 @@
+"""Minimal versioned schema migrations.
+
+``db.create_all()`` only creates missing tables; it never adds indexes or
+columns to tables that already exist, so long-lived Postgres deployments
+could not pick up schema changes. Migrations live in
+``src/migrations/versions/vNNNN_<slug>.py`` and define:
+
+    VERSION = 1                      # unique, increasing
+    DESCRIPTION = "..."
+    def upgrade(conn, log): ...      # conn is a SQLAlchemy Connection,
+                                     # log(message) reports progress
+
+Applied versions are recorded in ``schema_migrations``. Each migration runs
+in its own transaction. Migrations must be idempotent against a database
+freshly created by ``db.create_all()`` (models declare the same indexes and
+columns), which the helpers below make straightforward. Data backfills
+keep their SQL in the migration module rather than calling services, whose
+behaviour moves on with the models.
+"""
+import importlib
+import os
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+VERSIONS_PACKAGE = 'src.migrations.versions'
+VERSIONS_PATH = os.path.join(os.path.dirname(__file__), 'versions')
+
+
+def discover():
+    """Return migration modules sorted by VERSION"""
+    modules = []
+    for info in pkgutil.iter_modules([VERSIONS_PATH]):
+        if not info.name.startswith('v'):
+            continue
+        modules.append(importlib.import_module(f'{VERSIONS_PACKAGE}.{info.name}'))
+    modules.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in modules]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'Duplicate migration versions: {versions}')
+    return modules
+
+
+def _ensure_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200), '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def pending(engine):
+    applied = applied_versions(engine)
+    return [module for module in discover() if module.VERSION not in applied]
+
+
+def upgrade(engine, log=print):
+    """Apply all pending migrations; returns the list of versions applied"""
+    done = []
+    for module in pending(engine):
+        with engine.begin() as conn:
+            module.upgrade(conn, log)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': module.VERSION, 'd': module.DESCRIPTION[:200], 't': datetime.utcnow()}
+            )
+        log(f"Applied migration {module.VERSION:04d}: {module.DESCRIPTION}")
+        done.append(module.VERSION)
+    return done
+
+
+# Helpers for idempotent migrations
+
+def column_exists(conn, table, column):
+    return any(col['name'] == column for col in inspect(conn).get_columns(table))
+
+
+def index_exists(conn, table, index):
+    return any(ix['name'] == index for ix in inspect(conn).get_indexes(table))
+
+
+def create_index(conn, name, table, columns, where=None):
+    """CREATE INDEX IF NOT EXISTS, optionally partial (SQLite and Postgres both support WHERE)"""
+    sql = f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+    if where:
+        sql += f' WHERE {where}'
+    conn.execute(text(sql))
@@ -0,0 +1,22 @@
+"""Indexes for the hot read paths.
+
+- workout history keyset paging: workout_session (user_id, start_time, id)
+- /workouts/active: partial index on workout_session (user_id, start_time) WHERE end_time IS NULL
+- batch serializer / ownership joins: workout_exercise (session_id), exercise_set (workout_exercise_id, set_number)
+- importer name lookups: exercise (name)
+- personal records: personal_record (user_id, exercise_id)
+"""
+from src.migrations.runner import create_index
+
+VERSION = 1
+DESCRIPTION = 'Add indexes for history, active workout, workout tree, importer and PR lookups'
+
+
+def upgrade(conn, log):
+    create_index(conn, 'ix_workout_session_user_start', 'workout_session', ['user_id', 'start_time', 'id'])
+    create_index(conn, 'ix_workout_session_active', 'workout_session', ['user_id', 'start_time'],
+                 where='end_time IS NULL')
+    create_index(conn, 'ix_workout_exercise_session', 'workout_exercise', ['session_id'])
+    create_index(conn, 'ix_exercise_set_workout_exercise', 'exercise_set', ['workout_exercise_id', 'set_number'])
+    create_index(conn, 'ix_exercise_name', 'exercise', ['name'])
+    create_index(conn, 'ix_personal_record_user_exercise', 'personal_record', ['user_id', 'exercise_id'])
@@ -0,0 +1,75 @@
+"""Track which set holds each personal record, one row per (user, exercise, type).
+
+Existing rows carry no holder and may hold duplicates, so they are rebuilt
+from the logged sets before the unique index is created; afterwards the
+records are maintained incrementally (``src/services/records.py``).
+
+The backfill is frozen here as plain SQL plus the record rules as they
+were at this version, so later changes to the models or to the records
+service cannot change what this migration does.
+"""
+from sqlalchemy import text
+
+from src.migrations.runner import column_exists
+
+VERSION = 2
+DESCRIPTION = 'Add personal_record.exercise_set_id and unique (user_id, exercise_id, record_type), backfill records'
+
+# Ordered by (workout start, set id): on equal values the first set seen keeps the record
+SET_ROWS = text(
+    'SELECT exercise_set.id, exercise_set.reps, exercise_set.weight, exercise_set.set_type, '
+    'workout_session.id, workout_session.start_time, workout_session.user_id, workout_exercise.exercise_id '
+    'FROM exercise_set '
+    'JOIN workout_exercise ON exercise_set.workout_exercise_id = workout_exercise.id '
+    'JOIN workout_session ON workout_exercise.session_id = workout_session.id '
+    'ORDER BY workout_session.start_time, exercise_set.id'
+)
+INSERT_RECORD = text(
+    'INSERT INTO personal_record '
+    '(user_id, exercise_id, record_type, value, achieved_date, workout_session_id, exercise_set_id) '
+    'VALUES (:user_id, :exercise_id, :record_type, :value, :achieved_date, :workout_session_id, :exercise_set_id)'
+)
+
+
+def _metrics(reps, weight, set_type):
+    """Record-type -> value for one set; warm-ups never count"""
+    if set_type == 'warmup':
+        return {}
+    metrics = {}
+    if weight and weight > 0:
+        metrics['max_weight'] = float(weight)
+    if reps and reps > 0:
+        metrics['max_reps'] = float(reps)
+    if weight and weight > 0 and reps and reps > 0:
+        metrics['max_volume'] = float(weight) * reps
+        # Epley; a single rep is its own 1RM
+        metrics['estimated_1rm'] = float(weight) if reps == 1 else float(weight) * (1 + reps / 30.0)
+    return metrics
+
+
+def _backfill(conn):
+    best = {}  # (user_id, exercise_id, record_type) -> record row
+    for set_id, reps, weight, set_type, session_id, start_time, user_id, exercise_id in (
+            conn.execution_options(yield_per=5000).execute(SET_ROWS)):
+        for record_type, value in _metrics(reps, weight, set_type).items():
+            key = (user_id, exercise_id, record_type)
+            if key not in best or value > best[key]['value']:
+                best[key] = {
+                    'user_id': user_id, 'exercise_id': exercise_id, 'record_type': record_type,
+                    'value': value, 'achieved_date': start_time, 'workout_session_id': session_id,
+                    'exercise_set_id': set_id,
+                }
+    conn.execute(text('DELETE FROM personal_record'))
+    if best:
+        conn.execute(INSERT_RECORD, list(best.values()))
+    return len(best)
+
+
+def upgrade(conn, log):
+    if not column_exists(conn, 'personal_record', 'exercise_set_id'):
+        conn.execute(text('ALTER TABLE personal_record ADD COLUMN exercise_set_id INTEGER'))
+    log(f'  backfilled {_backfill(conn)} personal records')
+    conn.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_personal_record_user_exercise_type '
+        'ON personal_record (user_id, exercise_id, record_type)'
+    ))
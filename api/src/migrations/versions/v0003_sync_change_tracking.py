@@ -0,0 +1,30 @@
+"""Per-row updated_at columns and tombstones for the delta sync feed."""
+from sqlalchemy import text
+
+from src.migrations.runner import column_exists, create_index
+from src.models.exercise import SyncTombstone
+
+VERSION = 3
+DESCRIPTION = 'Add updated_at change tracking and sync_tombstone for /api/sync'
+
+# table -> expression used to backfill updated_at on existing rows
+TRACKED_TABLES = {
+    'exercise': 'CURRENT_TIMESTAMP',
+    'workout_session': 'COALESCE(end_time, start_time)',
+    'workout_exercise': 'CURRENT_TIMESTAMP',
+    'exercise_set': 'CURRENT_TIMESTAMP',
+}
+
+
+def upgrade(conn, log):
+    for table, backfill in TRACKED_TABLES.items():
+        if not column_exists(conn, table, 'updated_at'):
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP'))
+        conn.execute(text(f'UPDATE {table} SET updated_at = {backfill} WHERE updated_at IS NULL'))
+
+    create_index(conn, 'ix_exercise_created_by_updated', 'exercise', ['created_by', 'updated_at'])
+    create_index(conn, 'ix_workout_session_user_updated', 'workout_session', ['user_id', 'updated_at'])
+    create_index(conn, 'ix_workout_exercise_updated', 'workout_exercise', ['updated_at'])
+    create_index(conn, 'ix_exercise_set_updated', 'exercise_set', ['updated_at'])
+
+    SyncTombstone.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,12 @@
+"""Daily/weekly training rollups behind /api/analytics."""
+from src.models.exercise import TrainingRollup
+from src.services import rollups
+
+VERSION = 5
+DESCRIPTION = 'Add training_rollup and backfill it from logged sets'
+
+
+def upgrade(conn, log):
+    TrainingRollup.__table__.create(conn, checkfirst=True)
+    written = rollups.rebuild_all(conn=conn)
+    log(f'  backfilled {written} rollup rows')
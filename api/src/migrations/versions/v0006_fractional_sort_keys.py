@@ -0,0 +1,40 @@
+"""Fractional sort keys for workout exercises and sets (O(1) reorder, no renumbering)."""
+from sqlalchemy import text
+
+from src.migrations.runner import column_exists, create_index
+from src.services.ordering import keys_between
+
+VERSION = 6
+DESCRIPTION = 'Add sort_key to workout_exercise and exercise_set and backfill from current order'
+
+# table -> (parent column, legacy ordinal column)
+ORDERED_TABLES = {
+    'workout_exercise': ('session_id', 'order_in_workout'),
+    'exercise_set': ('workout_exercise_id', 'set_number'),
+}
+
+
+def upgrade(conn, log):
+    for table, (parent, ordinal) in ORDERED_TABLES.items():
+        if not column_exists(conn, table, 'sort_key'):
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN sort_key VARCHAR(64)'))
+
+        rows = conn.execute(text(
+            f'SELECT id, {parent} FROM {table} WHERE sort_key IS NULL ORDER BY {parent}, {ordinal}, id'
+        )).all()
+        updates, children, current = [], [], None
+        for row_id, parent_id in rows + [(None, object())]:
+            if parent_id != current:
+                updates.extend(
+                    {'id': child, 'key': key} for child, key in zip(children, keys_between(None, None, len(children)))
+                )
+                children, current = [], parent_id
+            children.append(row_id)
+        if updates:
+            conn.execute(text(f'UPDATE {table} SET sort_key = :key WHERE id = :id'), updates)
+
+    # Sibling lookups now order by sort_key; replace the (parent, ordinal) indexes
+    conn.execute(text('DROP INDEX IF EXISTS ix_workout_exercise_session'))
+    create_index(conn, 'ix_workout_exercise_session', 'workout_exercise', ['session_id', 'sort_key'])
+    conn.execute(text('DROP INDEX IF EXISTS ix_exercise_set_workout_exercise'))
+    create_index(conn, 'ix_exercise_set_workout_exercise', 'exercise_set', ['workout_exercise_id', 'sort_key'])
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from src.models.user import db
 
 class Exercise(db.Model):
@@ -10,6 +12,13 @@ class Exercise(db.Model):
     instructions = db.Column(db.Text)
     is_custom = db.Column(db.Boolean, default=False)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Keep in sync with src/migrations/versions (existing databases get indexes there)
+    __table_args__ = (
+        db.Index('ix_exercise_name', 'name'),
+        db.Index('ix_exercise_created_by_updated', 'created_by', 'updated_at'),
+    )
     
     def __repr__(self):
         return f'<Exercise {self.name}>'
@@ -34,10 +43,19 @@ class WorkoutSession(db.Model):
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime)
     notes = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_workout_session_user_start', 'user_id', 'start_time', 'id'),
+        db.Index('ix_workout_session_active', 'user_id', 'start_time',
+                 sqlite_where=db.text('end_time IS NULL'), postgresql_where=db.text('end_time IS NULL')),
+        db.Index('ix_workout_session_user_updated', 'user_id', 'updated_at'),
+    )
     
     # Relationships
     user = db.relationship('User', backref='workout_sessions')
-    exercises = db.relationship('WorkoutExercise', backref='session', cascade='all, delete-orphan')
+    exercises = db.relationship('WorkoutExercise', backref='session', cascade='all, delete-orphan',
+                                order_by='[WorkoutExercise.sort_key, WorkoutExercise.id]')
     
     def __repr__(self):
         return f'<WorkoutSession {self.id} - {self.name}>'
@@ -50,36 +68,62 @@ class WorkoutSession(db.Model):
             'start_time': self.start_time.isoformat() if self.start_time else None,
             'end_time': self.end_time.isoformat() if self.end_time else None,
             'notes': self.notes,
-            'exercises': [exercise.to_dict() for exercise in self.exercises]
+            'exercises': [
+                exercise.to_dict(order_in_workout=position)
+                for position, exercise in enumerate(self.exercises, start=1)
+            ]
+        }
+
+    def to_summary_dict(self, exercise_count=0, set_count=0):
+        """Session header without nested exercises/sets (history list view)"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'notes': self.notes,
+            'exercise_count': exercise_count,
+            'set_count': set_count
         }
 
 class WorkoutExercise(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('workout_session.id'), nullable=False)
     exercise_id = db.Column(db.Integer, db.ForeignKey('exercise.id'), nullable=False)
-    order_in_workout = db.Column(db.Integer, nullable=False)
+    order_in_workout = db.Column(db.Integer, nullable=False)  # position when added; responses use the rank
+    sort_key = db.Column(db.String(64))  # fractional ordering key, see services/ordering.py
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_workout_exercise_session', 'session_id', 'sort_key'),
+        db.Index('ix_workout_exercise_updated', 'updated_at'),
+    )
     
     # Relationships
     exercise = db.relationship('Exercise')
-    sets = db.relationship('ExerciseSet', backref='workout_exercise', cascade='all, delete-orphan')
+    sets = db.relationship('ExerciseSet', backref='workout_exercise', cascade='all, delete-orphan',
+                           order_by='[ExerciseSet.sort_key, ExerciseSet.id]')
     
     def __repr__(self):
         return f'<WorkoutExercise {self.exercise.name}>'
     
-    def to_dict(self):
+    def to_dict(self, order_in_workout=None):
         return {
             'id': self.id,
             'session_id': self.session_id,
             'exercise_id': self.exercise_id,
             'exercise': self.exercise.to_dict() if self.exercise else None,
-            'order_in_workout': self.order_in_workout,
-            'sets': [set_obj.to_dict() for set_obj in self.sets]
+            'order_in_workout': order_in_workout or self.order_in_workout,
+            'sort_key': self.sort_key,
+            'sets': [set_obj.to_dict(set_number=number) for number, set_obj in enumerate(self.sets, start=1)]
         }
 
 class ExerciseSet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     workout_exercise_id = db.Column(db.Integer, db.ForeignKey('workout_exercise.id'), nullable=False)
-    set_number = db.Column(db.Integer, nullable=False)
+    set_number = db.Column(db.Integer, nullable=False)  # number when logged; responses use the rank
+    sort_key = db.Column(db.String(64))  # fractional ordering key, see services/ordering.py
     reps = db.Column(db.Integer)
     weight = db.Column(db.Float)
     duration = db.Column(db.Integer)  # in seconds, for time-based exercises
@@ -87,15 +131,22 @@ class ExerciseSet(db.Model):
     rest_time = db.Column(db.Integer)  # in seconds
     set_type = db.Column(db.String(20), default='normal')  # normal, warmup, dropset, superset
     notes = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_exercise_set_workout_exercise', 'workout_exercise_id', 'sort_key'),
+        db.Index('ix_exercise_set_updated', 'updated_at'),
+    )
     
     def __repr__(self):
         return f'<ExerciseSet {self.set_number}>'
     
-    def to_dict(self):
+    def to_dict(self, set_number=None):
         return {
             'id': self.id,
             'workout_exercise_id': self.workout_exercise_id,
-            'set_number': self.set_number,
+            'set_number': set_number or self.set_number,
+            'sort_key': self.sort_key,
             'reps': self.reps,
             'weight': self.weight,
             'duration': self.duration,
@@ -109,10 +160,18 @@ class PersonalRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     exercise_id = db.Column(db.Integer, db.ForeignKey('exercise.id'), nullable=False)
-    record_type = db.Column(db.String(20), nullable=False)  # max_weight, max_reps, max_volume
+    record_type = db.Column(db.String(20), nullable=False)  # max_weight, max_reps, max_volume, estimated_1rm
     value = db.Column(db.Float, nullable=False)
     achieved_date = db.Column(db.DateTime, nullable=False)
     workout_session_id = db.Column(db.Integer, db.ForeignKey('workout_session.id'))
+    # Set currently holding the record; deliberately not a FK so deleting the
+    # set can be followed by a recompute of this row in the same flush
+    exercise_set_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_personal_record_user_exercise', 'user_id', 'exercise_id'),
+        db.Index('uq_personal_record_user_exercise_type', 'user_id', 'exercise_id', 'record_type', unique=True),
+    )
     
     # Relationships
     user = db.relationship('User', backref='personal_records')
@@ -121,15 +180,74 @@ class PersonalRecord(db.Model):
     def __repr__(self):
         return f'<PersonalRecord {self.exercise.name} - {self.record_type}: {self.value}>'
     
-    def to_dict(self):
-        return {
+    def to_dict(self, embed_exercise=True):
+        row = {
             'id': self.id,
             'user_id': self.user_id,
             'exercise_id': self.exercise_id,
-            'exercise': self.exercise.to_dict() if self.exercise else None,
-            'record_type': self.record_type,
-            'value': self.value,
-            'achieved_date': self.achieved_date.isoformat() if self.achieved_date else None,
-            'workout_session_id': self.workout_session_id
         }
+        if embed_exercise:
+            row['exercise'] = self.exercise.to_dict() if self.exercise else None
+        row.update(
+            record_type=self.record_type,
+            value=self.value,
+            achieved_date=self.achieved_date.isoformat() if self.achieved_date else None,
+            workout_session_id=self.workout_session_id,
+            exercise_set_id=self.exercise_set_id,
+        )
+        return row
+
+class SyncTombstone(db.Model):
+    """Record of a deleted row so offline clients can drop it on their next sync"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    entity_type = db.Column(db.String(30), nullable=False)  # workout_session, workout_exercise, exercise_set, exercise
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_sync_tombstone_user_deleted', 'user_id', 'deleted_at'),
+    )
+
+    def __repr__(self):
+        return f'<SyncTombstone {self.entity_type} {self.entity_id}>'
+
+class TrainingRollup(db.Model):
+    """Pre-aggregated training totals for one user and period bucket.
+
+    ``scope`` is 'exercise' (exercise_id and muscle_group set), 'muscle_group'
+    (muscle_group set) or 'total'. Maintained by services/rollups.py.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # day, week
+    period_start = db.Column(db.Date, nullable=False)  # weeks start on Monday (UTC)
+    scope = db.Column(db.String(20), nullable=False)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercise.id'), nullable=True)
+    muscle_group = db.Column(db.String(50), nullable=True)
+    volume = db.Column(db.Float, nullable=False, default=0)  # sum of weight x reps, working sets
+    tonnage = db.Column(db.Float, nullable=False, default=0)  # sum of weight x reps, all sets incl. warm-ups
+    sets = db.Column(db.Integer, nullable=False, default=0)  # working sets
+    reps = db.Column(db.Integer, nullable=False, default=0)  # working reps
+    session_count = db.Column(db.Integer, nullable=False, default=0)
 
+    __table_args__ = (
+        db.Index('ix_training_rollup_user_period', 'user_id', 'period', 'scope', 'period_start'),
+    )
+
+    def __repr__(self):
+        return f'<TrainingRollup {self.user_id} {self.period} {self.period_start} {self.scope}>'
+
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'period_start': self.period_start.isoformat(),
+            'scope': self.scope,
+            'exercise_id': self.exercise_id,
+            'muscle_group': self.muscle_group,
+            'volume': self.volume,
+            'tonnage': self.tonnage,
+            'sets': self.sets,
+            'reps': self.reps,
+            'session_count': self.session_count
+        }
@@ -0,0 +1,11 @@
+from src.models.user import db
+
+class MediaBlob(db.Model):
+    """Content-addressed binary object for the 'database' media backend"""
+    key = db.Column(db.String(100), primary_key=True)
+    content_type = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f'<MediaBlob {self.key}>'
@@ -1,35 +1,45 @@
 from flask_sqlalchemy import SQLAlchemy
-import bcrypt
 
-db = SQLAlchemy()
+from src.replicas import RoutingSession
+from src.services import passwords
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=True)
     password_hash = db.Column(db.String(128), nullable=False)
-    profile_picture = db.Column(db.Text, nullable=True)  # Store base64/data URL
+    profile_picture = db.Column(db.Text, nullable=True)  # Media key of the avatar (see services/media.py)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
     def __repr__(self):
         return f'<User {self.username}>'
 
     def set_password(self, password):
-        """Hash and set the user's password"""
-        password_bytes = password.encode('utf-8')
-        self.password_hash = bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode('utf-8')
+        """Hash and set the user's password (BCRYPT_ROUNDS, off-thread; may raise HashingBusy)"""
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        """Check if provided password matches stored hash"""
-        password_bytes = password.encode('utf-8')
-        hash_bytes = self.password_hash.encode('utf-8')
-        return bcrypt.checkpw(password_bytes, hash_bytes)
+        """Check if provided password matches stored hash (may raise HashingBusy)"""
+        return passwords.verify_password(password, self.password_hash)
+
+    def profile_picture_url(self):
+        """Absolute URL of the avatar inside a request, else the /api path"""
+        key = self.profile_picture
+        # Legacy inline data URLs are moved to the media store by migration 4
+        if not key or key.startswith('data:'):
+            return None
+        from flask import has_request_context, url_for
+        if has_request_context():
+            return url_for('media.get_media', key=key, _external=True)
+        return f'/api/media/{key}'
 
     def to_dict(self):
         return {
             'id': self.id,
             'username': self.username,
             'email': self.email,
-            'profile_picture': self.profile_picture,
+            'profile_picture': self.profile_picture_url(),
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -0,0 +1,123 @@
+"""SQL statement budgets per route, to catch N+1 regressions before deploy.
+
+``query_budget(n)`` counts statements issued on the app's engine and raises
+``QueryBudgetExceeded`` (listing them) when more than ``n`` ran. It works as a
+context manager or decorator around Flask test-client calls::
+
+    with query_budget(3):
+        client.get('/api/users/1/workouts?limit=20', headers=auth)
+
+``route_budget`` looks the budget up in ``ROUTE_BUDGETS`` by method and
+endpoint, so callers only state which route they hit. Budgets are measured
+against the scenario in ``src/scripts/check_query_budgets.py`` (several
+workouts, exercises and sets per parent, cold catalog snapshot), so a
+per-row lazy load anywhere in a serializer pushes a route over its budget.
+The same table drives a runtime warning in ``src.instrumentation`` when a
+live request exceeds its budget.
+"""
+from contextlib import ContextDecorator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# (method, endpoint) -> max SQL statements per request
+ROUTE_BUDGETS = {
+    # auth
+    ('POST', 'auth.login'): 1,
+    ('POST', 'auth.register'): 4,
+    ('GET', 'auth.get_current_user'): 1,
+    ('PUT', 'auth.update_current_user'): 6,
+    # user, original + two thumbnails, update, refresh
+    ('PUT', 'media.upload_profile_picture'): 6,
+    ('POST', 'media.upload_profile_picture'): 6,
+    ('DELETE', 'media.delete_profile_picture'): 3,
+    ('GET', 'media.get_media'): 1,
+    # catalog (measured with a cold snapshot)
+    ('GET', 'exercise.get_exercises'): 1,
+    ('POST', 'exercise.create_exercise'): 2,
+    ('GET', 'exercise.get_exercise'): 2,
+    ('GET', 'exercise.get_exercise_facets'): 1,
+    ('GET', 'exercise.suggest_exercises'): 1,
+    ('GET', 'exercise.get_muscle_groups'): 1,
+    ('GET', 'exercise.get_equipment'): 1,
+    ('GET', 'exercise.get_exercise_progress'): 2,
+    # workouts. Bulk: personal_record rows for first-time exercises are inserted
+    # one per statement on SQLite (RETURNING must map ids back to objects)
+    ('GET', 'user.get_user_workouts'): 4,
+    ('POST', 'user.create_workout'): 3,
+    ('POST', 'user.create_workout_bulk'): 24,
+    ('PUT', 'user.update_workout'): 6,
+    ('PATCH', 'user.update_workout'): 6,
+    ('GET', 'user.get_active_workout'): 4,
+    ('POST', 'user.add_exercise_to_workout'): 6,
+    ('DELETE', 'user.delete_workout_exercise'): 9,
+    ('PATCH', 'user.reorder_workout_exercise'): 5,
+    ('POST', 'user.add_set_to_exercise'): 9,
+    ('POST', 'user.add_sets_to_exercise'): 9,
+    ('PUT', 'user.update_set'): 10,  # + the set's display number
+    ('PATCH', 'user.update_set'): 10,
+    ('DELETE', 'user.delete_set'): 9,
+    ('PATCH', 'user.reorder_set'): 5,
+    ('GET', 'user.get_personal_records'): 1,
+    # feeds
+    ('GET', 'sync.get_changes'): 4,
+    ('GET', 'analytics.get_volume_series'): 1,
+    ('GET', 'analytics.get_volume_summary'): 1,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Fail when more than ``max_queries`` statements run inside the block.
+
+    Counts on every engine unless ``engine`` is given, so no app context is
+    needed and reads routed to other engines are counted too.
+    """
+
+    def __init__(self, max_queries, label=None, engine=None):
+        self.max_queries = max_queries
+        self.label = label
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.get_execution_options().get('skip_accounting'):
+            return
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        self._target = self.engine if self.engine is not None else Engine
+        event.listen(self._target, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self._target, 'before_cursor_execute', self._record)
+        if exc_type is None and self.count > self.max_queries:
+            listing = '\n'.join(f'  {i}. {" ".join(sql.split())[:200]}' for i, sql in enumerate(self.statements, 1))
+            raise QueryBudgetExceeded(
+                f'{self.label or "block"} ran {self.count} SQL statements (budget {self.max_queries}):\n{listing}'
+            )
+        return False
+
+
+def budget_for(method, endpoint):
+    """Declared budget for a route, or None if it has none"""
+    return ROUTE_BUDGETS.get((method.upper(), endpoint))
+
+
+def route_budget(app, method, path):
+    """``query_budget`` for whichever route ``method path`` resolves to"""
+    adapter = app.url_map.bind('localhost')
+    endpoint, _ = adapter.match(path.split('?', 1)[0], method=method.upper())
+    budget = budget_for(method, endpoint)
+    if budget is None:
+        raise KeyError(f'No query budget declared for {method.upper()} {endpoint}')
+    return query_budget(budget, label=f'{method.upper()} {endpoint}')
@@ -0,0 +1,314 @@
+"""Per-client rate limiting and a global concurrency cap.
+
+Rate limits are token buckets keyed by client: the JWT identity when the
+request carries a valid access token, else the client IP (the
+``TRUSTED_PROXY_HOPS``-th address from the right of ``X-Forwarded-For``
+behind proxies). ``TRUSTED_PROXY_HOPS`` defaults per deployment: 1 on
+Vercel/Lambda (the ``serverless`` engine profile) and on Render, 0
+elsewhere. With 0 every client behind a proxy shares the proxy's address,
+so an ignored ``X-Forwarded-For`` is logged once as a warning.
+
+Routes in ``ROUTE_LIMITS`` get a bucket of their own; every other route
+shares the ``DEFAULT_LIMIT`` bucket. Login is also limited per IP and
+submitted username (``ACCOUNT_LIMITS``): guessing one account's password is
+throttled tightly, while the per-IP bucket stays large enough for everyone
+behind one NAT logging in again after a deploy. Over the limit the request
+is answered ``429`` with ``Retry-After``.
+``RATE_LIMIT_MULTIPLIER`` scales every limit, ``RATE_LIMIT_ENABLED=0`` turns
+limiting off.
+
+Buckets live in process memory, so each worker limits on its own. At most
+``MEMORY_BUCKETS`` are kept; past that the least recently used are dropped
+in batches (a dropped bucket starts full again). Set
+``RATE_LIMIT_REDIS_URL`` (needs the ``redis`` package; any server speaking
+the Redis protocol with Lua scripting works) to share them between workers
+and instances. If that server is unreachable the in-process buckets are used
+until it answers again.
+
+``MAX_CONCURRENT_REQUESTS`` caps requests in progress per process. A
+request that finds no free slot within ``ADMISSION_WAIT_SECONDS`` gets
+``503`` with ``Retry-After`` instead of queueing for a database connection
+until the pool times out. It defaults to the connection pool size (pool +
+overflow) for the ``server`` engine profile and is off otherwise.
+
+Metrics: ``rate_limited_total{endpoint}``, ``admission_rejected_total`` and
+``http_requests_in_flight``.
+"""
+import hashlib
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from flask import g, jsonify, request
+from flask_jwt_extended import decode_token
+
+from src.instrumentation import registry
+
+try:
+    import redis
+except ImportError:  # optional; in-process buckets only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float   # tokens added per second
+    burst: float  # bucket size
+
+
+DEFAULT_LIMIT = Limit(10, 50)
+# endpoint -> Limit; each gets its own bucket per client
+ROUTE_LIMITS = {
+    # Anonymous, so keyed by IP: sized for a gym's NAT re-authenticating at once
+    'auth.login': Limit(1, 60),
+    'auth.register': Limit(0.1, 20),
+    # Polled or typed-ahead by the SPA
+    'user.get_active_workout': Limit(1, 10),
+    'exercise.get_exercises': Limit(2, 20),
+    'exercise.suggest_exercises': Limit(5, 20),
+    # Heaviest reads
+    'user.get_user_workouts': Limit(2, 20),
+    'sync.get_changes': Limit(1, 10),
+    'analytics.get_volume_series': Limit(2, 20),
+    'analytics.get_volume_summary': Limit(2, 20),
+}
+# endpoint -> Limit per IP and submitted username, on top of ROUTE_LIMITS (password guessing)
+ACCOUNT_LIMITS = {
+    'auth.login': Limit(0.2, 10),
+}
+# Never limited: scrapes, static files and CORS preflights
+EXEMPT_ENDPOINTS = ('metrics', 'serve', 'static')
+
+ENABLED = (os.environ.get('RATE_LIMIT_ENABLED') or '1').strip().lower() not in ('0', 'false', 'no', 'off')
+MULTIPLIER = float(os.environ.get('RATE_LIMIT_MULTIPLIER') or 1)
+# Unset: per deployment, see default_proxy_hops
+TRUSTED_PROXY_HOPS = os.environ.get('TRUSTED_PROXY_HOPS')
+ADMISSION_WAIT_SECONDS = float(os.environ.get('ADMISSION_WAIT_SECONDS') or 0.25)
+# Memory buckets kept; past that the MEMORY_EVICT_BATCH least recently used are dropped at once
+MEMORY_BUCKETS = 10000
+MEMORY_EVICT_BATCH = 1000
+# Seconds between attempts to use an unreachable shared backend
+REDIS_RETRY_SECONDS = 5
+
+RATE_LIMITED = registry.counter('rate_limited_total', 'Requests refused by the per-client rate limit', ('endpoint',))
+ADMISSION_REJECTED = registry.counter('admission_rejected_total', 'Requests shed by the concurrency cap')
+IN_FLIGHT = registry.gauge('http_requests_in_flight', 'Requests holding a concurrency slot')
+
+
+class MemoryBackend:
+    """Token buckets in this process"""
+
+    def __init__(self):
+        self._buckets = {}  # key -> [tokens, monotonic timestamp], least recently used first
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            # Re-inserted below, which keeps the dict in least recently used order
+            tokens, updated = self._buckets.pop(key, None) or (limit.burst, now)
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                self._buckets[key] = [tokens - 1, now]
+                retry_after = 0.0
+            else:
+                self._buckets[key] = [tokens, now]
+                retry_after = (1 - tokens) / limit.rate
+            if len(self._buckets) > MEMORY_BUCKETS:
+                self._evict()
+        return retry_after
+
+    def _evict(self):
+        # One batch per MEMORY_EVICT_BATCH new keys: amortized O(1) per take even
+        # while a spike keeps every bucket busy
+        for key in list(itertools.islice(self._buckets, MEMORY_EVICT_BATCH)):
+            del self._buckets[key]
+
+
+# KEYS[1] bucket; ARGV rate, burst. Server time, so all clients agree on it.
+TOKEN_BUCKET_LUA = '''
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(retry_after)
+'''
+
+
+class RedisBackend:
+    """Token buckets shared through a Redis-protocol server, falling back to memory when it is down"""
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self._script = self._client.register_script(TOKEN_BUCKET_LUA)
+        self._fallback = MemoryBackend()
+        self._down_until = 0.0
+
+    def take(self, key, limit):
+        if time.monotonic() >= self._down_until:
+            try:
+                return float(self._script(keys=[f'ratelimit:{key}'], args=[limit.rate, limit.burst]))
+            except redis.RedisError as e:
+                logger.warning('rate limit backend unavailable', extra={'error': e.__class__.__name__})
+                self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self._fallback.take(key, limit)
+
+
+def _create_backend():
+    url = os.environ.get('RATE_LIMIT_REDIS_URL')
+    if not url:
+        return MemoryBackend()
+    if redis is None:
+        raise ImportError('RATE_LIMIT_REDIS_URL needs the redis package')
+    return RedisBackend(url)
+
+
+_backend = None
+# Set by init_app from TRUSTED_PROXY_HOPS or the deployment
+_proxy_hops = 0
+_forwarded_for_warned = False
+
+
+def _scaled(limit):
+    return Limit(limit.rate * MULTIPLIER, limit.burst * MULTIPLIER)
+
+
+def limit_for(endpoint):
+    """(bucket name, Limit) for an endpoint"""
+    limit = ROUTE_LIMITS.get(endpoint)
+    if limit is None:
+        return 'default', _scaled(DEFAULT_LIMIT)
+    return endpoint, _scaled(limit)
+
+
+def client_key(authorization, remote_addr, forwarded_for=None):
+    """``user:<identity>`` for a valid access token, else ``ip:<address>``"""
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme == 'Bearer' and token:
+        try:
+            identity = decode_token(token).get('sub')
+        except Exception:  # invalid/expired tokens are limited by address
+            identity = None
+        if identity is not None:
+            return f'user:{identity}'
+    if forwarded_for:
+        hops = [address.strip() for address in forwarded_for.split(',') if address.strip()]
+        if hops and _proxy_hops:
+            remote_addr = hops[-min(_proxy_hops, len(hops))]
+        elif hops:
+            _warn_forwarded_for_ignored()
+    return f'ip:{remote_addr}'
+
+
+def _warn_forwarded_for_ignored():
+    global _forwarded_for_warned
+    if not _forwarded_for_warned:
+        _forwarded_for_warned = True
+        logger.warning('X-Forwarded-For ignored: TRUSTED_PROXY_HOPS is 0, so clients behind a proxy '
+                       'share one rate limit bucket; set it to the number of proxies in front of the app')
+
+
+def _take(endpoint, bucket, limit):
+    global _backend
+    if _backend is None:
+        _backend = _create_backend()
+    retry_after = _backend.take(bucket, limit)
+    if retry_after:
+        RATE_LIMITED.inc((endpoint,))
+    return retry_after
+
+
+def check(endpoint, key):
+    """Spend a token for ``key`` on ``endpoint``; returns 0 if allowed, else seconds to wait"""
+    bucket, limit = limit_for(endpoint)
+    return _take(endpoint, f'{bucket}:{key}', limit)
+
+
+def check_account(endpoint, key, username):
+    """Like ``check``, for the ``ACCOUNT_LIMITS`` bucket of ``key`` and ``username``"""
+    limit = ACCOUNT_LIMITS.get(endpoint)
+    if limit is None:
+        return 0
+    # Hashed: the username is chosen by the client, so keep keys short and uniform
+    account = hashlib.blake2b(username.encode('utf-8'), digest_size=8).hexdigest()
+    return _take(endpoint, f'{endpoint}:{key}:account:{account}', _scaled(limit))
+
+
+def _submitted_username():
+    data = request.get_json(silent=True)
+    username = data.get('username') if isinstance(data, dict) else None
+    return username.strip() if isinstance(username, str) else ''
+
+
+def too_many_requests(retry_after, status=429, message='Too many requests, slow down'):
+    response = jsonify({'message': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def default_max_concurrent(profile):
+    """Concurrency cap matching the connection pool (``server`` profile only)"""
+    if profile.name == 'server' and profile.pool == 'queue':
+        return profile.pool_size + profile.max_overflow
+    return 0
+
+
+def default_proxy_hops(profile):
+    """Proxies in front of the app: Vercel/Lambda (``serverless`` profile) and Render add one"""
+    if profile.name == 'serverless' or os.environ.get('RENDER'):
+        return 1
+    return 0
+
+
+def init_app(app, profile):
+    """Install the rate limit and the concurrency cap (``profile``: the app's EngineProfile)"""
+    global _proxy_hops
+    _proxy_hops = int(TRUSTED_PROXY_HOPS) if TRUSTED_PROXY_HOPS not in (None, '') else default_proxy_hops(profile)
+    max_concurrent = int(os.environ.get('MAX_CONCURRENT_REQUESTS') or default_max_concurrent(profile))
+    slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+
+    @app.before_request
+    def _admit():
+        if request.method == 'OPTIONS' or request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        if ENABLED:
+            key = client_key(request.headers.get('Authorization'), request.remote_addr,
+                             request.headers.get('X-Forwarded-For'))
+            retry_after = check(request.endpoint or '', key)
+            if not retry_after and request.endpoint in ACCOUNT_LIMITS:
+                retry_after = check_account(request.endpoint, key, _submitted_username())
+            if retry_after:
+                return too_many_requests(retry_after)
+        if slots is not None:
+            if not slots.acquire(timeout=ADMISSION_WAIT_SECONDS):
+                ADMISSION_REJECTED.inc(())
+                return too_many_requests(1, 503, 'Server busy, please retry shortly')
+            g._admission_slot = True
+            IN_FLIGHT.inc(())
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        if g.pop('_admission_slot', False):
+            IN_FLIGHT.dec(())
+            slots.release()
@@ -0,0 +1,202 @@
+"""Read-replica routing with read-your-writes.
+
+Set ``DATABASE_REPLICA_URLS`` (comma separated) to spread read traffic over
+one or more replicas. Blueprints opt in with ``route_reads(bp)``; their GET
+requests are then served by a healthy replica (round-robin), except:
+
+- anything that writes: ORM flushes and Core INSERT/UPDATE/DELETE always go
+  to the primary, and the rest of that request stays there;
+- reads by a client that wrote within the last ``REPLICA_STICKY_SECONDS`` (so
+  a client that logs a set - or registers - and immediately reloads sees the
+  change). The marker travels with the client, so it holds across workers
+  and instances: every successful write response carries the write time in
+  the ``mgg_last_write`` cookie (sent back automatically by a same-origin
+  SPA) and the ``X-Last-Write`` header (for clients on another origin to
+  echo back). Keep the window well above the tolerated lag.
+
+Each replica's lag is checked at most every ``REPLICA_CHECK_SECONDS`` when it
+is about to be used; replicas lagging more than ``REPLICA_MAX_LAG_SECONDS``,
+or failing the check or a query with a connection error, are skipped until a
+later check succeeds. With no healthy replica everything uses the primary.
+"""
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.sql.dml import UpdateBase
+
+from src import engine_profiles
+from src.instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS') or 3)
+STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS') or 10)
+CHECK_SECONDS = float(os.environ.get('REPLICA_CHECK_SECONDS') or 5)
+# Where a client carries the time (epoch seconds) of its last write
+STICKY_COOKIE = 'mgg_last_write'
+STICKY_HEADER = 'X-Last-Write'
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+# (an idle primary would otherwise look like a lagging replica)
+POSTGRES_LAG_SQL = text(
+    'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+ROUTED_READS = registry.counter(
+    'db_read_routing_total', 'Read-eligible requests by the database they were served from', ('target',)
+)
+
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag = None
+        self.checked_at = None
+        self._check_lock = threading.Lock()
+
+    def mark_down(self, reason):
+        if self.healthy:
+            logger.warning('replica disabled', extra={'replica': self.name, 'reason': reason})
+        self.healthy = False
+
+    def check(self):
+        """Measure replication lag and update ``healthy``"""
+        try:
+            with self.engine.connect() as conn:
+                # Not part of the request's SQL count or query budget
+                conn.execution_options(skip_accounting=True)
+                if self.engine.dialect.name == 'postgresql':
+                    lag = float(conn.execute(POSTGRES_LAG_SQL).scalar() or 0)
+                else:
+                    conn.execute(text('SELECT 1'))
+                    lag = 0.0
+        except Exception as e:
+            self.lag = None
+            self.mark_down(f'health check failed: {e.__class__.__name__}')
+        else:
+            self.lag = lag
+            if lag > MAX_LAG_SECONDS:
+                self.mark_down(f'lag {lag:.1f}s > {MAX_LAG_SECONDS:g}s')
+            elif not self.healthy:
+                logger.warning('replica restored', extra={'replica': self.name, 'lag_seconds': lag})
+                self.healthy = True
+        self.checked_at = time.monotonic()
+
+    def usable(self):
+        """Healthy as of a check no older than CHECK_SECONDS (one thread re-checks)"""
+        if self.checked_at is None or time.monotonic() - self.checked_at >= CHECK_SECONDS:
+            if self._check_lock.acquire(blocking=self.checked_at is None):
+                try:
+                    self.check()
+                finally:
+                    self._check_lock.release()
+        return self.healthy
+
+
+_replicas = []
+_round_robin = itertools.count()
+
+
+def _normalize(url):
+    return url.replace('postgres://', 'postgresql://', 1) if url.startswith('postgres://') else url
+
+
+def init_app(app):
+    """Create replica engines from DATABASE_REPLICA_URLS and track writers"""
+    urls = [_normalize(url.strip()) for url in (os.environ.get('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+    for index, url in enumerate(urls):
+        profile = engine_profiles.resolve(url)
+        engine = create_engine(url, **profile.engine_options())
+        engine_profiles.install(engine, profile)
+        replica = Replica(f'replica{index}', engine)
+        event.listen(engine, 'handle_error', _on_error(replica))
+        _replicas.append(replica)
+        logger.info('read replica', extra={
+            'replica': replica.name, 'database': engine.url.render_as_string(hide_password=True)[:80]
+        })
+
+    @app.after_request
+    def _remember_writer(response):
+        if _replicas and request.method not in READ_METHODS and response.status_code < 400:
+            mark_sticky(response)
+        return response
+
+
+def _on_error(replica):
+    def handle_error(context):
+        if context.is_disconnect or context.connection is None:
+            replica.mark_down(f'connection error: {context.original_exception.__class__.__name__}')
+    return handle_error
+
+
+def route_reads(*blueprints):
+    """Let GET requests of these blueprints read from replicas"""
+    def _allow_replica():
+        if request.method in READ_METHODS:
+            g._replica_reads = True
+
+    for blueprint in blueprints:
+        blueprint.before_request(_allow_replica)
+
+
+def mark_sticky(response):
+    """Have the client's reads use the primary for the next STICKY_SECONDS"""
+    written = f'{time.time():.3f}'
+    response.set_cookie(STICKY_COOKIE, written, max_age=math.ceil(STICKY_SECONDS), path='/',
+                        secure=request.is_secure, httponly=True, samesite='Lax')
+    response.headers[STICKY_HEADER] = written
+
+
+def is_sticky(last_write):
+    """True if a client-supplied last-write time is within the sticky window.
+
+    Times in the future count only within the window too, so a forged or
+    skewed value cannot pin a client to the primary for long.
+    """
+    try:
+        written = float(last_write)
+    except (TypeError, ValueError):
+        return False
+    return abs(time.time() - written) < STICKY_SECONDS
+
+
+def _choose():
+    """Engine for this request's reads (None = primary), decided once per request"""
+    if '_read_engine' in g:
+        return g._read_engine
+    engine = None
+    if not is_sticky(request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE)):
+        healthy = [replica for replica in _replicas if replica.usable()]
+        if healthy:
+            engine = healthy[next(_round_robin) % len(healthy)].engine
+    g._read_engine = engine
+    ROUTED_READS.inc(('replica' if engine is not None else 'primary',))
+    return engine
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that binds reads to a replica when allowed"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _replicas and has_request_context() and g.get('_replica_reads'):
+            if self._flushing or isinstance(clause, UpdateBase):
+                # Writes (and everything after them in this request) use the primary
+                g._replica_reads = False
+                g._read_engine = None
+            else:
+                engine = _choose()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.services import rollups
+
+analytics_bp = Blueprint('analytics', __name__)
+
+DEFAULT_RANGE_DAYS = 12 * 7
+
+def _range_args():
+    """(from, to) dates from the query string; defaults to the last 12 weeks"""
+    end = rollups.parse_date(request.args.get('to'), datetime.utcnow().date())
+    start = rollups.parse_date(request.args.get('from'), end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    return start, end
+
+@analytics_bp.route('/analytics/volume', methods=['GET'])
+@jwt_required()
+def get_volume_series():
+    """Per-day or per-week training volume for the current user.
+
+    Query: period=day|week, scope=total|muscle_group|exercise, from, to (ISO dates),
+    optional exercise_id / muscle_group filters.
+    """
+    user_id = int(get_jwt_identity())
+    period = request.args.get('period', 'week')
+    scope = request.args.get('scope', 'total')
+    if period not in rollups.PERIODS:
+        return jsonify({'message': f'period must be one of {list(rollups.PERIODS)}'}), 400
+    if scope not in rollups.SCOPES:
+        return jsonify({'message': f'scope must be one of {list(rollups.SCOPES)}'}), 400
+    try:
+        start, end = _range_args()
+    except ValueError:
+        return jsonify({'message': 'from/to must be ISO dates (YYYY-MM-DD)'}), 400
+    if period == 'week':
+        start = rollups.week_start(start)
+
+    rows = rollups.series(
+        user_id, period, scope, start, end,
+        exercise_id=request.args.get('exercise_id', type=int),
+        muscle_group=request.args.get('muscle_group')
+    )
+    return jsonify({
+        'period': period,
+        'scope': scope,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'points': [row.to_dict() for row in rows]
+    })
+
+@analytics_bp.route('/analytics/summary', methods=['GET'])
+@jwt_required()
+def get_volume_summary():
+    """Totals over a date range grouped by scope (default muscle_group)"""
+    user_id = int(get_jwt_identity())
+    scope = request.args.get('scope', 'muscle_group')
+    if scope not in rollups.SCOPES:
+        return jsonify({'message': f'scope must be one of {list(rollups.SCOPES)}'}), 400
+    try:
+        start, end = _range_args()
+    except ValueError:
+        return jsonify({'message': 'from/to must be ISO dates (YYYY-MM-DD)'}), 400
+    return jsonify({
+        'scope': scope,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'groups': rollups.summary(user_id, scope, start, end)
+    })
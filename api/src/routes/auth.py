@@ -1,8 +1,27 @@
+import logging
+
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
+from src import replicas
 from src.models.user import User, db
+from src.services import media, passwords
 
 auth_bp = Blueprint('auth', __name__)
+# GET routes may read from a replica (see src/replicas.py)
+replicas.route_reads(auth_bp)
+logger = logging.getLogger(__name__)
+
+@auth_bp.errorhandler(passwords.HashingBusy)
+def hashing_busy(error):
+    """Shed password work instead of queueing it behind a login burst"""
+    response = jsonify({'message': 'Too many logins in progress, please retry shortly'})
+    response.headers['Retry-After'] = str(passwords.RETRY_AFTER_SECONDS)
+    return response, 503
+
+@auth_bp.errorhandler(RequestEntityTooLarge)
+def body_too_large(error):
+    return jsonify({'message': f'Request body exceeds {media.MAX_REQUEST_BYTES // (1024 * 1024)} MB'}), 413
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -16,6 +35,13 @@ def login():
     user = User.query.filter_by(username=username).first()
 
     if user and user.check_password(password):
+        if passwords.needs_rehash(user.password_hash):
+            # Move the stored hash to the current BCRYPT_ROUNDS; logging in does not depend on it
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except passwords.HashingBusy:
+                logger.info('password rehash skipped', extra={'user_id': user.id})
         access_token = create_access_token(identity=str(user.id))
         return jsonify({
             'access_token': access_token,
@@ -72,10 +98,20 @@ def get_current_user():
 def update_current_user():
     user_id = int(get_jwt_identity())
     user = User.query.get_or_404(user_id)
+    # May carry a data-URL profile picture; bounded like the upload route
+    request.max_content_length = media.MAX_REQUEST_BYTES
     data = request.get_json() or {}
     
     if 'profile_picture' in data:
-        user.profile_picture = data['profile_picture']
+        # The SPA still sends a data URL; store it and keep only the media key
+        if data['profile_picture']:
+            try:
+                image = media.decode_data_url(data['profile_picture'])
+                user.profile_picture = media.store_image(image)
+            except media.MediaError as e:
+                return jsonify({'message': str(e)}), 400
+        else:
+            user.profile_picture = None
     if 'email' in data:
         raw = (data.get('email') or '').strip()
         new_email = raw if raw else None
@@ -1,37 +1,149 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
+from src import compression, replicas
 from src.models.user import db
 from src.models.exercise import Exercise, WorkoutSession, WorkoutExercise, ExerciseSet, PersonalRecord
+from src.services import catalog, facets, fieldsets, ordering, progress, records, rollups
+from src.services import search as search_index
+from src.serializers.workouts import serialize_workout, serialize_workouts, serialize_workout_exercises
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 exercise_bp = Blueprint('exercise', __name__)
+# GET routes may read from a replica (see src/replicas.py)
+replicas.route_reads(exercise_bp)
+
+def _cacheable(response, etag):
+    """Attach validator headers shared by full, filtered and 304 catalog responses"""
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def _catalog_response(snapshot, key, build_rows):
+    """Serve a (possibly filtered) view of the catalog snapshot with ETag and br/gzip"""
+    encoded = snapshot.encoded(key, build_rows)
+    if catalog.etag_matches(request.headers.get('If-None-Match'), encoded.etag):
+        return _cacheable(Response(status=304), encoded.etag)
+    coding = compression.negotiate(request.headers.get('Accept-Encoding'))
+    body = encoded.compressed(coding) if coding else None
+    if body is not None:
+        response = Response(body, mimetype='application/json')
+        response.headers['Content-Encoding'] = coding
+        return _cacheable(response, f'{encoded.etag}-{coding}')
+    return _cacheable(Response(encoded.body, mimetype='application/json'), encoded.etag)
+
+def _filter_exercises(snapshot, muscle_group, equipment, search, difficulty=None):
+    """Case-insensitive muscle/equipment filtering; ranked index search when a term is given"""
+    muscle_group = muscle_group.lower() if muscle_group else None
+    equipment = equipment.lower() if equipment else None
+    difficulty = difficulty.lower() if difficulty else None
+    rows = search_index.get_index(snapshot).search(search) if search else snapshot.rows
+    return [
+        row for row in rows
+        if (not muscle_group or muscle_group in (row['muscle_group'] or '').lower())
+        and (not equipment or equipment in (row['equipment'] or '').lower())
+        and (not difficulty or difficulty == (row['difficulty'] or '').lower())
+    ]
 
 @exercise_bp.route('/exercises', methods=['GET'])
 def get_exercises():
-    """Get all exercises with optional filtering"""
+    """Get all exercises with optional filtering (served from the catalog snapshot).
+
+    With ``search`` the results are ordered by relevance and tolerate typos.
+    ``fields=name,muscle_group`` trims the rows (see services/fieldsets.py).
+    """
     muscle_group = request.args.get('muscle_group')
     equipment = request.args.get('equipment')
     search = request.args.get('search')
-    
-    query = Exercise.query
-    
-    if muscle_group:
-        query = query.filter(Exercise.muscle_group.ilike(f'%{muscle_group}%'))
-    
-    if equipment:
-        query = query.filter(Exercise.equipment.ilike(f'%{equipment}%'))
-    
-    if search:
-        query = query.filter(Exercise.name.ilike(f'%{search}%'))
-    
-    exercises = query.all()
-    return jsonify([exercise.to_dict() for exercise in exercises])
+    difficulty = request.args.get('difficulty')
+    try:
+        fieldset = fieldsets.parse(request.args, 'exercise')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    key = tuple((value or '').lower() for value in (muscle_group, equipment, search, difficulty))
+    if not any(key) and fieldset.is_default:
+        key = None
+    elif not fieldset.is_default:
+        key += fieldset.key()
+
+    # Revalidation against a still-fresh snapshot never reaches the database
+    snapshot = catalog.peek_snapshot()
+    if snapshot is not None and catalog.etag_matches(request.headers.get('If-None-Match'), snapshot.etag_for(key)):
+        return _cacheable(Response(status=304), snapshot.etag_for(key))
+
+    snapshot = catalog.get_snapshot()
+    return _catalog_response(
+        snapshot, key,
+        lambda: fieldsets.shape('exercise', _filter_exercises(snapshot, muscle_group, equipment, search, difficulty), fieldset)
+    )
+
+@exercise_bp.route('/exercises/facets', methods=['GET'])
+def get_exercise_facets():
+    """Muscle group, equipment and difficulty values with counts.
+
+    Accepts the same ``muscle_group``/``equipment``/``difficulty``/``search``
+    filters as /exercises (facet values match exactly, case-insensitively).
+    """
+    filters = {
+        field: (request.args.get(field) or '').lower() or None
+        for field in ('muscle_group', 'equipment', 'difficulty')
+    }
+    search = request.args.get('search') or None
+    key = ('facets', search.lower() if search else '') + tuple(filters[field] or '' for field in sorted(filters))
+
+    snapshot = catalog.peek_snapshot()
+    if snapshot is not None and catalog.etag_matches(request.headers.get('If-None-Match'), snapshot.etag_for(key)):
+        return _cacheable(Response(status=304), snapshot.etag_for(key))
+
+    snapshot = catalog.get_snapshot()
+    return _catalog_response(snapshot, key, lambda: facets.compute_facets(snapshot, filters, search))
+
+@exercise_bp.route('/exercises/suggest', methods=['GET'])
+def suggest_exercises():
+    """Type-ahead: exercises whose name or a word in it starts with ``q``"""
+    prefix = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+
+    snapshot = catalog.get_snapshot()
+    rows = search_index.get_index(snapshot).suggest(prefix, limit=limit)
+    return jsonify([
+        {'id': row['id'], 'name': row['name'], 'muscle_group': row['muscle_group'], 'equipment': row['equipment']}
+        for row in rows
+    ])
 
 @exercise_bp.route('/exercises/<int:exercise_id>', methods=['GET'])
 def get_exercise(exercise_id):
-    """Get a specific exercise by ID"""
-    exercise = Exercise.query.get_or_404(exercise_id)
-    return jsonify(exercise.to_dict())
+    """Get a specific exercise by ID (``fields`` as for /exercises)"""
+    try:
+        fieldset = fieldsets.parse(request.args, 'exercise')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    row = catalog.get_snapshot().by_id.get(exercise_id)
+    if row is None:
+        # Not in this worker's snapshot yet (e.g. created elsewhere moments ago)
+        row = Exercise.query.get_or_404(exercise_id).to_dict()
+    return jsonify(fieldsets.shape('exercise', row, fieldset))
+
+@exercise_bp.route('/exercises/<int:exercise_id>/progress', methods=['GET'])
+@jwt_required()
+def get_exercise_progress(exercise_id):
+    """Current user's per-session 1RM / top set / volume for one exercise.
+
+    Query: points (max points returned, LTTB-downsampled; default 200) and
+    metric (series that drives downsampling; default estimated_1rm).
+    """
+    user_id = int(get_jwt_identity())
+    metric = request.args.get('metric', 'estimated_1rm')
+    if metric not in progress.METRICS:
+        return jsonify({'message': f'metric must be one of {list(progress.METRICS)}'}), 400
+    points = request.args.get('points', progress.DEFAULT_POINTS, type=int)
+    points = max(2, min(points, progress.MAX_POINTS))
+    if exercise_id not in catalog.get_snapshot().by_id and db.session.get(Exercise, exercise_id) is None:
+        return jsonify({'message': 'Exercise not found'}), 404
+    return jsonify(progress.exercise_progress(user_id, exercise_id, metric=metric, points=points))
 
 @exercise_bp.route('/exercises', methods=['POST'])
 @jwt_required()
@@ -53,6 +165,7 @@ def create_exercise():
     
     db.session.add(exercise)
     db.session.commit()
+    catalog.invalidate()
     
     return jsonify(exercise.to_dict()), 201
 
@@ -71,7 +184,7 @@ def start_workout():
     db.session.add(workout)
     db.session.commit()
     
-    return jsonify(workout.to_dict()), 201
+    return jsonify(serialize_workout(workout)), 201
 
 @exercise_bp.route('/_deprecated/workouts/<int:workout_id>', methods=['PUT'])
 def end_workout(workout_id):
@@ -84,7 +197,7 @@ def end_workout(workout_id):
         workout.notes = data['notes']
     
     db.session.commit()
-    return jsonify(workout.to_dict())
+    return jsonify(serialize_workout(workout))
 
 @exercise_bp.route('/_deprecated/workouts/<int:workout_id>', methods=['PATCH'])
 def update_workout(workout_id):
@@ -94,32 +207,36 @@ def update_workout(workout_id):
     if 'notes' in data:
         workout.notes = data['notes']
     db.session.commit()
-    return jsonify(workout.to_dict())
+    return jsonify(serialize_workout(workout))
 
 @exercise_bp.route('/_deprecated/workouts/<int:workout_id>/exercises', methods=['POST'])
 def add_exercise_to_workout(workout_id):
     """Add an exercise to a workout session"""
     data = request.get_json()
     
+    sort_key, _ = ordering.append_position(WorkoutExercise, WorkoutExercise.session_id, workout_id)
     workout_exercise = WorkoutExercise(
         session_id=workout_id,
         exercise_id=data['exercise_id'],
-        order_in_workout=data.get('order_in_workout', 1)
+        order_in_workout=data.get('order_in_workout', 1),
+        sort_key=sort_key
     )
     
     db.session.add(workout_exercise)
     db.session.commit()
     
-    return jsonify(workout_exercise.to_dict()), 201
+    return jsonify(serialize_workout_exercises([workout_exercise])[0]), 201
 
 @exercise_bp.route('/_deprecated/workout-exercises/<int:workout_exercise_id>/sets', methods=['POST'])
 def add_set_to_exercise(workout_exercise_id):
     """Add a set to a workout exercise"""
     data = request.get_json()
     
+    sort_key, _ = ordering.append_position(ExerciseSet, ExerciseSet.workout_exercise_id, workout_exercise_id)
     exercise_set = ExerciseSet(
         workout_exercise_id=workout_exercise_id,
         set_number=data['set_number'],
+        sort_key=sort_key,
         reps=data.get('reps'),
         weight=data.get('weight'),
         duration=data.get('duration'),
@@ -130,37 +247,39 @@ def add_set_to_exercise(workout_exercise_id):
     )
     
     db.session.add(exercise_set)
+    db.session.flush()
+    records.on_set_written(exercise_set)
+    rollups.mark_workout(exercise_set.workout_exercise.session)
+    set_number = ordering.position(ExerciseSet, ExerciseSet.workout_exercise_id, exercise_set)
     db.session.commit()
     
-    return jsonify(exercise_set.to_dict()), 201
+    return jsonify(exercise_set.to_dict(set_number=set_number)), 201
 
 @exercise_bp.route('/_deprecated/workout-exercises/<int:workout_exercise_id>', methods=['DELETE'])
 def delete_workout_exercise(workout_exercise_id):
     """Delete a workout exercise (and cascade delete its sets)"""
     we = WorkoutExercise.query.get_or_404(workout_exercise_id)
+    workout = we.session
+    user_id = workout.user_id
+    set_ids = [set_id for (set_id,) in db.session.query(ExerciseSet.id).filter_by(workout_exercise_id=we.id)]
     db.session.delete(we)
+    db.session.flush()
+    records.on_sets_deleted(user_id, we.exercise_id, set_ids)
+    rollups.mark_workout(workout)
     db.session.commit()
     return '', 204
 
 @exercise_bp.route('/_deprecated/sets/<int:set_id>', methods=['DELETE'])
 def delete_set(set_id):
-    """Delete a single set and renumber remaining sets for that workout exercise"""
+    """Delete a single set (display numbers of the rest are derived on read)"""
     set_obj = ExerciseSet.query.get_or_404(set_id)
-    we_id = set_obj.workout_exercise_id
+    workout = set_obj.workout_exercise.session
+    user_id = workout.user_id
+    exercise_id = set_obj.workout_exercise.exercise_id
     db.session.delete(set_obj)
-    # Flush so the deletion is visible when we fetch remaining sets before committing
     db.session.flush()
-
-    # Renumber remaining sets to keep set_number consecutive starting at 1
-    remaining = (
-        ExerciseSet.query
-        .filter_by(workout_exercise_id=we_id)
-        .order_by(ExerciseSet.set_number.asc())
-        .all()
-    )
-    for idx, s in enumerate(remaining, start=1):
-        s.set_number = idx
-
+    records.on_sets_deleted(user_id, exercise_id, [set_id])
+    rollups.mark_workout(workout)
     db.session.commit()
     return '', 204
 
@@ -172,29 +291,34 @@ def update_set(set_id):
     for field in ['reps', 'weight', 'duration', 'distance', 'rest_time', 'set_type', 'notes']:
         if field in data:
             setattr(set_obj, field, data[field])
+    db.session.flush()
+    records.on_set_written(set_obj)
+    rollups.mark_workout(set_obj.workout_exercise.session)
+    set_number = ordering.position(ExerciseSet, ExerciseSet.workout_exercise_id, set_obj)
     db.session.commit()
-    return jsonify(set_obj.to_dict())
+    return jsonify(set_obj.to_dict(set_number=set_number))
 
 @exercise_bp.route('/_deprecated/users/<int:user_id>/workouts', methods=['GET'])
 def get_user_workouts(user_id):
     """Get all workouts for a user"""
     workouts = WorkoutSession.query.filter_by(user_id=user_id).order_by(WorkoutSession.start_time.desc()).all()
-    return jsonify([workout.to_dict() for workout in workouts])
+    return jsonify(serialize_workouts(workouts))
 
 @exercise_bp.route('/_deprecated/users/<int:user_id>/personal-records', methods=['GET'])
 def get_personal_records(user_id):
     """Get personal records for a user"""
-    records = PersonalRecord.query.filter_by(user_id=user_id).all()
+    # Load each record's exercise in the same query (to_dict embeds it)
+    records = PersonalRecord.query.options(db.joinedload(PersonalRecord.exercise)).filter_by(user_id=user_id).all()
     return jsonify([record.to_dict() for record in records])
 
 @exercise_bp.route('/muscle-groups', methods=['GET'])
 def get_muscle_groups():
-    """Get all available muscle groups"""
-    muscle_groups = db.session.query(Exercise.muscle_group).distinct().all()
-    return jsonify([group[0] for group in muscle_groups if group[0]])
+    """Get all available muscle groups (see /exercises/facets for counts)"""
+    snapshot = catalog.get_snapshot()
+    return _catalog_response(snapshot, ('muscle-groups',), lambda: facets.facet_values(snapshot, 'muscle_groups'))
 
 @exercise_bp.route('/equipment', methods=['GET'])
 def get_equipment():
-    """Get all available equipment types"""
-    equipment = db.session.query(Exercise.equipment).distinct().all()
-    return jsonify([eq[0] for eq in equipment if eq[0]])
+    """Get all available equipment types (see /exercises/facets for counts)"""
+    snapshot = catalog.get_snapshot()
+    return _catalog_response(snapshot, ('equipment',), lambda: facets.facet_values(snapshot, 'equipment'))
@@ -0,0 +1,56 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.models.user import User, db
+from src.services import media
+
+media_bp = Blueprint('media', __name__)
+
+# Keys are content hashes, so a given URL can never change
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+@media_bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    return jsonify({'message': f'Image exceeds {media.MAX_UPLOAD_BYTES // (1024 * 1024)} MB'}), 413
+
+@media_bp.route('/media/<key>', methods=['GET'])
+def get_media(key):
+    """Serve a stored image or thumbnail by content key"""
+    if not media.KEY_PATTERN.match(key):
+        return jsonify({'message': 'Not found'}), 404
+    etag = f'"{key}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = Response(status=304)
+    else:
+        data = media.get_backend().get(key)
+        if data is None:
+            return jsonify({'message': 'Not found'}), 404
+        response = Response(data, mimetype=media.content_type_for(key))
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.headers['ETag'] = etag
+    return response
+
+@media_bp.route('/me/profile-picture', methods=['PUT', 'POST'])
+@jwt_required()
+def upload_profile_picture():
+    """Upload an avatar as multipart 'file' or as the raw request body"""
+    user = User.query.get_or_404(int(get_jwt_identity()))
+    # Refuse oversized bodies before buffering them (also chunked ones without Content-Length)
+    request.max_content_length = media.MAX_REQUEST_BYTES
+    upload = request.files.get('file')
+    data = upload.read(media.MAX_UPLOAD_BYTES + 1) if upload else request.get_data()
+    try:
+        user.profile_picture = media.store_image(data)
+    except media.MediaError as e:
+        return jsonify({'message': str(e)}), 400
+    db.session.commit()
+    return jsonify(user.to_dict())
+
+@media_bp.route('/me/profile-picture', methods=['DELETE'])
+@jwt_required()
+def delete_profile_picture():
+    """Clear the avatar (stored blobs are shared by hash and left in place)"""
+    user = User.query.get_or_404(int(get_jwt_identity()))
+    user.profile_picture = None
+    db.session.commit()
+    return jsonify(user.to_dict())
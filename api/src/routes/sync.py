@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.services import sync
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def get_changes():
+    """Delta feed of the current user's sessions, workout exercises, sets and custom exercises.
+
+    Pass the previous response's ``cursor`` as ``since``. Without ``since`` (or
+    when it is older than the tombstone retention window) the full state is
+    returned with ``reset: true`` and the client should replace its local copy.
+    """
+    user_id = int(get_jwt_identity())
+    since = request.args.get('since')
+    if since:
+        try:
+            since = sync.decode_cursor(since)
+        except ValueError:
+            return jsonify({'message': f'Invalid cursor: {since}'}), 400
+    return jsonify(sync.changes_since(user_id, since or None))
@@ -1,10 +1,88 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from src import replicas
+from src.json_provider import json_array_response
 from src.models.user import User, db
-from src.models.exercise import WorkoutSession, WorkoutExercise, ExerciseSet, PersonalRecord
-from datetime import datetime
+from src.models.exercise import Exercise, WorkoutSession, WorkoutExercise, ExerciseSet, PersonalRecord
+from src.services import fieldsets, history, ordering, records, rollups
+from src.serializers.workouts import (
+    assemble_workout, serialize_workout, serialize_workouts, serialize_workouts_batches, serialize_workout_exercises
+)
+from datetime import datetime, timezone
+import logging
 
 user_bp = Blueprint('user', __name__)
+# GET routes may read from a replica (see src/replicas.py)
+replicas.route_reads(user_bp)
+logger = logging.getLogger(__name__)
+
+# Upper bounds for bulk submissions
+MAX_BATCH_SETS = 200
+MAX_BULK_EXERCISES = 50
+
+def _set_row(workout_exercise_id, set_number, sort_key, data):
+    """Column values for a multi-row ExerciseSet insert"""
+    return {
+        'workout_exercise_id': workout_exercise_id,
+        'set_number': set_number,
+        'sort_key': sort_key,
+        'reps': data.get('reps'),
+        'weight': data.get('weight'),
+        'duration': data.get('duration'),
+        'distance': data.get('distance'),
+        'rest_time': data.get('rest_time'),
+        'set_type': data.get('set_type') or 'normal',
+        'notes': data.get('notes', '')
+    }
+
+def _validate_sets(sets):
+    """Return an error message if ``sets`` is not a list of set objects"""
+    if not isinstance(sets, list) or not all(isinstance(item, dict) for item in sets):
+        return 'sets must be a list of objects'
+    if len(sets) > MAX_BATCH_SETS:
+        return f'At most {MAX_BATCH_SETS} sets per request'
+    return None
+
+def _parse_time(value):
+    if not value:
+        return None
+    # Accept trailing 'Z' from JS Date.toISOString(); stored as naive UTC like utcnow()
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _new_sort_key(model, parent_column, parent_id, row):
+    """Sort key for a drag-and-drop move described by the request body.
+
+    ``{"after_id": X}`` places the row right after sibling X (null: first);
+    ``{"before_id": Y}`` right before sibling Y (null: last).
+    Returns ``(sort_key, error_message)``.
+    """
+    data = request.get_json(silent=True) or {}
+    if 'after_id' in data:
+        ref_id, side = data['after_id'], 'after'
+    elif 'before_id' in data:
+        ref_id, side = data['before_id'], 'before'
+    else:
+        return None, 'after_id or before_id is required'
+
+    if ref_id is None:
+        if side == 'before':
+            return ordering.move_key(model, parent_column, parent_id, row), None
+        first = model.query.filter(parent_column == parent_id, model.id != row.id).order_by(model.sort_key, model.id).first()
+        if first is None:
+            return row.sort_key, None
+        return ordering.move_key(model, parent_column, parent_id, row, before=first), None
+
+    if ref_id == row.id:
+        return None, f'{side}_id must differ from the moved row'
+    ref = model.query.filter(model.id == ref_id, parent_column == parent_id).first()
+    if ref is None:
+        return None, f'{side}_id must reference a sibling in the same list'
+    if side == 'after':
+        return ordering.move_key(model, parent_column, parent_id, row, after=ref), None
+    return ordering.move_key(model, parent_column, parent_id, row, before=ref), None
 
 @user_bp.route('/_deprecated/users', methods=['GET'])
 def get_users():
@@ -33,8 +111,33 @@ def get_user_workouts(user_id):
     if current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
     
-    workouts = WorkoutSession.query.filter_by(user_id=user_id).order_by(WorkoutSession.start_time.desc()).all()
-    return jsonify([workout.to_dict() for workout in workouts])
+    try:
+        view, limit, before = history.parse_params(request.args)
+        fieldset = fieldsets.parse(request.args, 'workout')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    workouts = db.session.execute(history.page_statement(user_id, limit, before)).scalars().all()
+    workouts, next_cursor = history.split_page(workouts, limit)
+
+    if view == 'summary':
+        count_rows = db.session.execute(history.counts_statement([workout.id for workout in workouts])).all() if workouts else []
+        payload = history.summaries(workouts, count_rows)
+    elif not fieldset.wants('workout', 'exercises'):
+        # Session headers only; the exercise/set tree is never loaded
+        payload = [assemble_workout(workout, [], {}, {}) for workout in workouts]
+    elif fieldset.include != fieldsets.SIDELOAD and len(workouts) > history.STREAM_MIN_WORKOUTS:
+        # Unpaginated full history: stream it batch by batch instead of
+        # holding every tree and the whole body in memory
+        batches = serialize_workouts_batches(workouts, embed_exercise=fieldset.embed_exercise)
+        return json_array_response(fieldsets.shape('workout', batch, fieldset) for batch in batches)
+    else:
+        payload = serialize_workouts(workouts, fieldset.embed_exercise)
+
+    response = jsonify(fieldsets.body('workout', payload, fieldset))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @user_bp.route('/workouts', methods=['POST'])
 @jwt_required()
@@ -52,7 +155,91 @@ def create_workout():
     db.session.add(workout)
     db.session.commit()
     
-    return jsonify(workout.to_dict()), 201
+    return jsonify(serialize_workout(workout)), 201
+
+@user_bp.route('/workouts:bulk', methods=['POST'])
+@jwt_required()
+def create_workout_bulk():
+    """Persist a complete workout (exercises + sets) in one transaction.
+
+    Body: {name, notes, start_time, end_time, exercises: [{exercise_id, sets: [...]}]}.
+    Returns the same shape as WorkoutSession.to_dict().
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+
+    exercises = data.get('exercises') or []
+    if not isinstance(exercises, list) or not all(isinstance(item, dict) for item in exercises):
+        return jsonify({'message': 'exercises must be a list of objects'}), 400
+    if len(exercises) > MAX_BULK_EXERCISES:
+        return jsonify({'message': f'At most {MAX_BULK_EXERCISES} exercises per workout'}), 400
+    for item in exercises:
+        if 'exercise_id' not in item:
+            return jsonify({'message': 'Each exercise requires exercise_id'}), 400
+        error = _validate_sets(item.get('sets') or [])
+        if error:
+            return jsonify({'message': error}), 400
+    if sum(len(item.get('sets') or []) for item in exercises) > MAX_BATCH_SETS:
+        return jsonify({'message': f'At most {MAX_BATCH_SETS} sets per request'}), 400
+
+    exercise_ids = {item['exercise_id'] for item in exercises}
+    if exercise_ids:
+        known = {exercise_id for (exercise_id,) in db.session.query(Exercise.id).filter(Exercise.id.in_(exercise_ids))}
+        missing = sorted(exercise_ids - known, key=str)
+        if missing:
+            return jsonify({'message': f'Unknown exercise ids: {missing}'}), 400
+
+    try:
+        start_time = _parse_time(data.get('start_time')) or datetime.utcnow()
+        end_time = _parse_time(data.get('end_time')) or datetime.utcnow()
+    except ValueError:
+        return jsonify({'message': 'start_time/end_time must be ISO 8601'}), 400
+
+    workout = WorkoutSession(
+        user_id=user_id,
+        name=data.get('name', 'Workout'),
+        start_time=start_time,
+        end_time=end_time,
+        notes=data.get('notes', '')
+    )
+    db.session.add(workout)
+    db.session.flush()
+
+    workout_exercises = []
+    if exercises:
+        # RETURNING order is not guaranteed for multi-row inserts (SQLite); re-sort by the ordinal
+        # rather than asking for parameter order, which would degrade to one INSERT per row there
+        workout_exercises = sorted(db.session.scalars(
+            db.insert(WorkoutExercise).returning(WorkoutExercise).execution_options(render_nulls=True),
+            [
+                {'session_id': workout.id, 'exercise_id': item['exercise_id'], 'order_in_workout': order,
+                 'sort_key': sort_key}
+                for order, (item, sort_key) in enumerate(
+                    zip(exercises, ordering.keys_between(None, None, len(exercises))), start=1
+                )
+            ]
+        ).all(), key=lambda we: we.order_in_workout)
+
+    set_rows = [
+        _set_row(we.id, set_number, sort_key, set_data)
+        for we, item in zip(workout_exercises, exercises)
+        for set_number, (set_data, sort_key) in enumerate(
+            zip(item.get('sets') or [], ordering.keys_between(None, None, len(item.get('sets') or []))), start=1
+        )
+    ]
+    sets_by_exercise = {}
+    if set_rows:
+        exercise_by_we = {we.id: we.exercise_id for we in workout_exercises}
+        inserted = db.session.scalars(
+            db.insert(ExerciseSet).returning(ExerciseSet).execution_options(render_nulls=True), set_rows
+        )
+        for exercise_set in inserted:
+            sets_by_exercise.setdefault(exercise_by_we[exercise_set.workout_exercise_id], []).append(exercise_set)
+    records.on_sets_added(user_id, workout, sets_by_exercise)
+    rollups.mark_workout(workout)
+
+    db.session.commit()
+    return jsonify(serialize_workout(workout)), 201
 
 @user_bp.route('/workouts/<int:workout_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
@@ -74,30 +261,23 @@ def update_workout(workout_id):
         workout.end_time = datetime.utcnow()
     
     db.session.commit()
-    return jsonify(workout.to_dict())
+    return jsonify(serialize_workout(workout))
 
 @user_bp.route('/workouts/active', methods=['GET'])
 @jwt_required()
 def get_active_workout():
     """Return the current user's most recent in-progress workout, or 204 if none."""
-    print(f"DEBUG: get_active_workout called")
+    user_id = int(get_jwt_identity())
     try:
-        user_id = int(get_jwt_identity())
-        print(f"DEBUG: JWT user_id = {user_id}")
-        workout = (
-            WorkoutSession.query
-            .filter_by(user_id=user_id, end_time=None)
-            .order_by(WorkoutSession.start_time.desc())
-            .first()
-        )
-        if not workout:
-            print(f"DEBUG: No active workout found for user {user_id}")
-            return '', 204
-        print(f"DEBUG: Found active workout {workout.id} for user {user_id}")
-        return jsonify(workout.to_dict())
-    except Exception as e:
-        print(f"DEBUG: Exception in get_active_workout: {e}")
-        raise
+        fieldset = fieldsets.parse(request.args, 'workout')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    workout = db.session.execute(history.active_statement(user_id)).scalars().first()
+    if not workout:
+        logger.debug('no active workout', extra={'user_id': user_id})
+        return '', 204
+    logger.debug('active workout found', extra={'user_id': user_id, 'workout_id': workout.id})
+    return jsonify(fieldsets.body('workout', serialize_workouts([workout], fieldset.embed_exercise)[0], fieldset))
 
 @user_bp.route('/workouts/<int:workout_id>/exercises', methods=['POST'])
 @jwt_required()
@@ -108,20 +288,19 @@ def add_exercise_to_workout(workout_id):
     data = request.get_json()
     exercise_id = data['exercise_id']
     
-    # Get the next order number
-    max_order = db.session.query(db.func.max(WorkoutExercise.order_in_workout)).filter_by(session_id=workout_id).scalar()
-    next_order = (max_order or 0) + 1
+    sort_key, next_order = ordering.append_position(WorkoutExercise, WorkoutExercise.session_id, workout_id)
     
     workout_exercise = WorkoutExercise(
         session_id=workout_id,
         exercise_id=exercise_id,
-        order_in_workout=next_order
+        order_in_workout=next_order,
+        sort_key=sort_key
     )
     
     db.session.add(workout_exercise)
     db.session.commit()
     
-    return jsonify(workout_exercise.to_dict()), 201
+    return jsonify(serialize_workout_exercises([workout_exercise])[0]), 201
 
 @user_bp.route('/workout-exercises/<int:workout_exercise_id>', methods=['DELETE'])
 @jwt_required()
@@ -132,7 +311,12 @@ def delete_workout_exercise(workout_exercise_id):
         WorkoutExercise.id == workout_exercise_id,
         WorkoutSession.user_id == user_id
     ).first_or_404()
+    workout = we.session
+    set_ids = [set_id for (set_id,) in db.session.query(ExerciseSet.id).filter_by(workout_exercise_id=we.id)]
     db.session.delete(we)
+    db.session.flush()
+    records.on_sets_deleted(user_id, we.exercise_id, set_ids)
+    rollups.mark_workout(workout)
     db.session.commit()
     return '', 204
 
@@ -149,13 +333,14 @@ def add_set_to_exercise(workout_exercise_id):
     
     data = request.get_json()
     
-    # Get the next set number
-    max_set = db.session.query(db.func.max(ExerciseSet.set_number)).filter_by(workout_exercise_id=workout_exercise_id).scalar()
-    next_set_number = (max_set or 0) + 1
+    sort_key, next_set_number = ordering.append_position(
+        ExerciseSet, ExerciseSet.workout_exercise_id, workout_exercise_id
+    )
     
     exercise_set = ExerciseSet(
         workout_exercise_id=workout_exercise_id,
         set_number=next_set_number,
+        sort_key=sort_key,
         reps=data.get('reps'),
         weight=data.get('weight'),
         duration=data.get('duration'),
@@ -166,10 +351,46 @@ def add_set_to_exercise(workout_exercise_id):
     )
     
     db.session.add(exercise_set)
+    db.session.flush()
+    records.on_set_written(exercise_set)
+    rollups.mark_workout(exercise_set.workout_exercise.session)
     db.session.commit()
     
     return jsonify(exercise_set.to_dict()), 201
 
+@user_bp.route('/workout-exercises/<int:workout_exercise_id>/sets:batch', methods=['POST'])
+@jwt_required()
+def add_sets_to_exercise(workout_exercise_id):
+    """Append several sets in one request; body is {sets: [...]} or a bare list"""
+    user_id = int(get_jwt_identity())
+    workout_exercise = WorkoutExercise.query.join(WorkoutSession).filter(
+        WorkoutExercise.id == workout_exercise_id,
+        WorkoutSession.user_id == user_id
+    ).first_or_404()
+
+    data = request.get_json(silent=True)
+    sets = data.get('sets') if isinstance(data, dict) else data
+    error = _validate_sets(sets)
+    if error:
+        return jsonify({'message': error}), 400
+    if not sets:
+        return jsonify([]), 201
+
+    keys, first = ordering.append_positions(
+        ExerciseSet, ExerciseSet.workout_exercise_id, workout_exercise_id, len(sets)
+    )
+    created = sorted(db.session.scalars(
+        db.insert(ExerciseSet).returning(ExerciseSet).execution_options(render_nulls=True),
+        [_set_row(workout_exercise_id, first + i, key, set_data) for i, (set_data, key) in enumerate(zip(sets, keys))]
+    ).all(), key=lambda exercise_set: exercise_set.sort_key)
+    records.on_sets_added(user_id, workout_exercise.session, {workout_exercise.exercise_id: created})
+    rollups.mark_workout(workout_exercise.session)
+
+    # Serialize before commit expires the freshly returned rows
+    payload = [exercise_set.to_dict() for exercise_set in created]
+    db.session.commit()
+    return jsonify(payload), 201
+
 @user_bp.route('/sets/<int:set_id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_set(set_id):
@@ -196,34 +417,63 @@ def update_set(set_id):
     if 'notes' in data:
         exercise_set.notes = data['notes']
     
+    db.session.flush()
+    records.on_set_written(exercise_set)
+    rollups.mark_workout(exercise_set.workout_exercise.session)
+    # The stored set_number goes stale once earlier sets are deleted; respond with the rank, as history does
+    set_number = ordering.position(ExerciseSet, ExerciseSet.workout_exercise_id, exercise_set)
     db.session.commit()
-    return jsonify(exercise_set.to_dict())
+    return jsonify(exercise_set.to_dict(set_number=set_number))
 
 @user_bp.route('/sets/<int:set_id>', methods=['DELETE'])
 @jwt_required()
 def delete_set(set_id):
-    """Delete a set owned by the current user and renumber remaining sets."""
+    """Delete a set owned by the current user (display numbers of the rest are derived on read)"""
     user_id = int(get_jwt_identity())
     set_obj = ExerciseSet.query.join(WorkoutExercise).join(WorkoutSession).filter(
         ExerciseSet.id == set_id,
         WorkoutSession.user_id == user_id
     ).first_or_404()
-    we_id = set_obj.workout_exercise_id
+    exercise_id = set_obj.workout_exercise.exercise_id
+    workout = set_obj.workout_exercise.session
     db.session.delete(set_obj)
-    # Flush so deletion is visible when we fetch remaining sets before commit
     db.session.flush()
+    records.on_sets_deleted(user_id, exercise_id, [set_id])
+    rollups.mark_workout(workout)
+    db.session.commit()
+    return '', 204
 
-    remaining = (
-        ExerciseSet.query
-        .filter_by(workout_exercise_id=we_id)
-        .order_by(ExerciseSet.set_number.asc())
-        .all()
-    )
-    for idx, s in enumerate(remaining, start=1):
-        s.set_number = idx
+@user_bp.route('/sets/<int:set_id>/reorder', methods=['PATCH'])
+@jwt_required()
+def reorder_set(set_id):
+    """Move a set within its exercise; body {after_id} or {before_id} (see _new_sort_key)"""
+    user_id = int(get_jwt_identity())
+    set_obj = ExerciseSet.query.join(WorkoutExercise).join(WorkoutSession).filter(
+        ExerciseSet.id == set_id,
+        WorkoutSession.user_id == user_id
+    ).first_or_404()
+    sort_key, error = _new_sort_key(ExerciseSet, ExerciseSet.workout_exercise_id, set_obj.workout_exercise_id, set_obj)
+    if error:
+        return jsonify({'message': error}), 400
+    set_obj.sort_key = sort_key
+    db.session.commit()
+    return jsonify({'id': set_obj.id, 'sort_key': set_obj.sort_key})
 
+@user_bp.route('/workout-exercises/<int:workout_exercise_id>/reorder', methods=['PATCH'])
+@jwt_required()
+def reorder_workout_exercise(workout_exercise_id):
+    """Move an exercise within its workout; body {after_id} or {before_id} (see _new_sort_key)"""
+    user_id = int(get_jwt_identity())
+    we = WorkoutExercise.query.join(WorkoutSession).filter(
+        WorkoutExercise.id == workout_exercise_id,
+        WorkoutSession.user_id == user_id
+    ).first_or_404()
+    sort_key, error = _new_sort_key(WorkoutExercise, WorkoutExercise.session_id, we.session_id, we)
+    if error:
+        return jsonify({'message': error}), 400
+    we.sort_key = sort_key
     db.session.commit()
-    return '', 204
+    return jsonify({'id': we.id, 'sort_key': we.sort_key})
 
 @user_bp.route('/users/<int:user_id>/personal-records', methods=['GET'])
 @jwt_required()
@@ -232,5 +482,14 @@ def get_personal_records(user_id):
     if current_user_id != user_id:
         return jsonify({'message': 'Access denied'}), 403
     
-    records = PersonalRecord.query.filter_by(user_id=user_id).all()
-    return jsonify([record.to_dict() for record in records])
+    try:
+        fieldset = fieldsets.parse(request.args, 'personal_record')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    query = PersonalRecord.query.filter_by(user_id=user_id)
+    if fieldset.embed_exercise:
+        # Load each record's exercise in the same query (to_dict embeds it)
+        query = query.options(db.joinedload(PersonalRecord.exercise))
+    records = [record.to_dict(fieldset.embed_exercise) for record in query.all()]
+    return jsonify(fieldsets.body('personal_record', records, fieldset))
@@ -0,0 +1,20 @@
+import os
+import sys
+
+# Ensure project root is on sys.path when executed directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+# Build the app without auto-bootstrapping, then bootstrap explicitly
+os.environ.setdefault("BOOTSTRAP_MODE", "off")
+
+from src.main import app
+from src import bootstrap
+
+
+def main():
+    bootstrap.run(app)
+    print("Bootstrap finished.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import argparse
+import tempfile
+
+# Ensure project root is on sys.path when executed directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+# 2x2 RGB image Pillow can decode, so the upload also stores its thumbnails
+PNG_2PX = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000002000000020802000000fdd49a73"
+    "000000164944415478da633c2117c5c0c0c0c4c0c0c0c0c000000f980144e09588110000000049454e44ae426082"
+)
+
+
+def run_scenario(app, check):
+    """Drive every budgeted route once over a realistic small dataset.
+
+    ``check(method, path, **kwargs)`` issues the request under its route
+    budget and returns the response.
+    """
+    from src.services import catalog
+
+    token = check("POST", "/api/login", json={"username": "melanie", "password": "1234"}).get_json()["access_token"]
+    auth = {"Authorization": f"Bearer {token}"}
+    user_id = check("GET", "/api/me", headers=auth).get_json()["id"]
+    check("POST", "/api/register", json={"username": "budget-check", "password": "secret", "email": "b@example.com"})
+    check("PUT", "/api/me", headers=auth, json={"email": "melanie@example.com"})
+    picture = check("PUT", "/api/me/profile-picture", headers=auth, data=PNG_2PX).get_json()["profile_picture"]
+    check("GET", picture[picture.index("/api/"):])
+    check("DELETE", "/api/me/profile-picture", headers=auth)
+
+    # Catalog routes are measured with a cold snapshot (their worst case)
+    for path in ("/api/exercises", "/api/exercises/facets", "/api/exercises/suggest?q=pre",
+                 "/api/muscle-groups", "/api/equipment", "/api/exercises/1"):
+        catalog.invalidate()
+        check("GET", path)
+    check("POST", "/api/exercises", headers=auth, json={"name": "Budget Curl", "muscle_group": "Arms"})
+
+    # History: several workouts x exercises x sets so per-row lazy loads show up
+    for day in range(1, 4):
+        check("POST", "/api/workouts:bulk", headers=auth, json={
+            "name": f"Day {day}",
+            "start_time": f"2026-01-0{day}T10:00:00",
+            "end_time": f"2026-01-0{day}T11:00:00",
+            "exercises": [
+                {"exercise_id": exercise_id, "sets": [{"reps": 5 + i, "weight": 40 + 10 * i} for i in range(3)]}
+                for exercise_id in (1, 2, 3)
+            ],
+        })
+
+    workout = check("POST", "/api/workouts", headers=auth, json={"name": "Live"}).get_json()
+    exercises = [
+        check("POST", f"/api/workouts/{workout['id']}/exercises", headers=auth, json={"exercise_id": exercise_id}).get_json()
+        for exercise_id in (1, 2, 3)
+    ]
+    we_id = exercises[0]["id"]
+    sets = [check("POST", f"/api/workout-exercises/{we_id}/sets", headers=auth, json={"reps": 5, "weight": 60}).get_json()]
+    sets += check("POST", f"/api/workout-exercises/{we_id}/sets:batch", headers=auth,
+                  json={"sets": [{"reps": 8, "weight": 50}, {"reps": 10, "weight": 40}]}).get_json()
+    check("PATCH", f"/api/sets/{sets[0]['id']}", headers=auth, json={"reps": 6})
+    check("PATCH", f"/api/sets/{sets[2]['id']}/reorder", headers=auth, json={"after_id": None})
+    check("PATCH", f"/api/workout-exercises/{exercises[2]['id']}/reorder", headers=auth, json={"before_id": we_id})
+    check("GET", "/api/workouts/active", headers=auth)
+    check("DELETE", f"/api/sets/{sets[1]['id']}", headers=auth)
+    check("DELETE", f"/api/workout-exercises/{exercises[1]['id']}", headers=auth)
+    check("PATCH", f"/api/workouts/{workout['id']}", headers=auth, json={"notes": "budget"})
+    check("PUT", f"/api/workouts/{workout['id']}", headers=auth, json={})
+
+    check("GET", f"/api/users/{user_id}/workouts", headers=auth)
+    check("GET", f"/api/users/{user_id}/workouts?limit=2", headers=auth)
+    check("GET", f"/api/users/{user_id}/workouts?limit=20&view=summary", headers=auth)
+    check("GET", f"/api/users/{user_id}/personal-records", headers=auth)
+    check("GET", "/api/exercises/1/progress", headers=auth)
+    check("GET", "/api/sync", headers=auth)
+    check("GET", "/api/analytics/volume?from=2026-01-01&to=2026-12-31", headers=auth)
+    check("GET", "/api/analytics/summary?from=2026-01-01&to=2026-12-31", headers=auth)
+
+
+def collect(app):
+    """Run the scenario on ``app``; returns ``(label, count, max_queries, error)`` per request.
+
+    ``error`` is None for requests that stayed within budget and succeeded.
+    Also run by ``tests/test_query_budgets.py``.
+    """
+    from src.query_budget import QueryBudgetExceeded, route_budget
+
+    client = app.test_client()
+    results = []
+
+    def check(method, path, **kwargs):
+        budget = route_budget(app, method, path)
+        try:
+            with budget:
+                response = client.open(path, method=method, **kwargs)
+            error = None
+        except QueryBudgetExceeded as e:
+            error = str(e)
+        if response.status_code >= 400:
+            error = error or f"unexpected status {response.status_code}: {response.get_data(as_text=True)[:200]}"
+        results.append((budget.label, budget.count, budget.max_queries, error))
+        return response
+
+    with app.app_context():
+        run_scenario(app, check)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exercise every API route against its SQL statement budget (src/query_budget.py)."
+    )
+    parser.add_argument("--database-url", default=None,
+                        help="Database to run against (default: a throwaway SQLite file). Data is added to it.")
+    parser.add_argument("--verbose", action="store_true", help="Print the statements of routes over budget")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="query-budgets-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    os.environ["MEDIA_ROOT"] = os.path.join(workdir, "media")
+    os.environ["BOOTSTRAP_MODE"] = "eager"
+    # Replicas would not see the scenario's writes
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+    # The scenario logs in and writes in quick succession from one address
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+    from src.main import app
+
+    results = collect(app)
+    failures = [row for row in results if row[3]]
+    width = max(len(label) for label, *_ in results)
+    for label, count, max_queries, error in results:
+        status = "FAIL" if error else "ok"
+        print(f"{status:4}  {label:{width}}  {count:3d} / {max_queries}")
+        if error and args.verbose:
+            print(error)
+    print(f"\n{len(results) - len(failures)} of {len(results)} requests within budget")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import os
+import io
+import csv
 import sys
 import json
 import argparse
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
 
 # Ensure project root is on sys.path when executed directly
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -12,15 +15,25 @@ try:
 except Exception as e:
     requests = None  # Download mode will error if requests is unavailable
 
-from src.main import app  # creates app and initializes DB on import
+from src.main import app  # creates the app; DB setup follows BOOTSTRAP_MODE
+from src import bootstrap
+from sqlalchemy import insert, update
+
 from src.models.user import db
 from src.models.exercise import Exercise
+from src.services import catalog
 
 REMOTE_URL = "https://raw.githubusercontent.com/yuhonas/free-exercise-db/main/dist/exercises.json"
 DEFAULT_LOCAL_PATH = os.path.normpath(
     os.path.join(os.path.dirname(__file__), "..", "data", "free-exercise-db", "exercises.json")
 )
 
+LEVELS = {"beginner", "intermediate", "advanced"}
+COPY_COLUMNS = (
+    "name", "description", "muscle_group", "equipment", "difficulty",
+    "instructions", "is_custom", "created_by", "updated_at",
+)
+
 MUSCLE_MAP = {
     # Upper body
     "biceps": "Biceps",
@@ -84,16 +97,49 @@ def stringify_instructions(entry: Dict[str, Any]) -> str | None:
     return None
 
 
-def load_dataset(local_path: str | None, download: bool) -> List[Dict[str, Any]]:
+def iter_json_array(path: str, chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        started = False
+        eof = False
+        while True:
+            # Skip separators between elements
+            pos = 0
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == "," or (not started and buf[pos] == "[")):
+                if buf[pos] == "[":
+                    started = True
+                pos += 1
+            buf = buf[pos:]
+            if buf.startswith("]"):
+                return
+            if buf:
+                try:
+                    item, end = decoder.raw_decode(buf)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield item
+                    buf = buf[end:]
+                    continue
+            elif eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+
+
+def _resolve_dataset(local_path: str | None, download: bool) -> str:
+    """Return a local path to the dataset, downloading it once if allowed."""
     # Prefer explicit local path
     if local_path and os.path.exists(local_path):
-        with open(local_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return local_path
 
     # Fallback to default vendored location
     if os.path.exists(DEFAULT_LOCAL_PATH):
-        with open(DEFAULT_LOCAL_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return DEFAULT_LOCAL_PATH
 
     # Optionally download if allowed
     if download:
@@ -102,66 +148,135 @@ def load_dataset(local_path: str | None, download: bool) -> List[Dict[str, Any]]
         print(f"Downloading dataset from {REMOTE_URL} ...")
         resp = requests.get(REMOTE_URL, timeout=30)
         resp.raise_for_status()
-        data = resp.json()
         # Persist to default location for offline reuse
         os.makedirs(os.path.dirname(DEFAULT_LOCAL_PATH), exist_ok=True)
-        with open(DEFAULT_LOCAL_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        with open(DEFAULT_LOCAL_PATH, "wb") as f:
+            f.write(resp.content)
         print(f"Saved dataset to {DEFAULT_LOCAL_PATH}")
-        return data
+        return DEFAULT_LOCAL_PATH
 
     raise FileNotFoundError(
         "Free Exercise DB not found locally. Provide --local path or use --download to fetch once."
     )
 
 
-def import_exercises(data: List[Dict[str, Any]], commit_every: int = 200) -> dict:
-    inserted_count = 0
-    skipped_dupe = 0
-    updated_difficulty = 0
-    for i, entry in enumerate(data, start=1):
+def iter_dataset(local_path: str | None, download: bool) -> Iterator[Dict[str, Any]]:
+    """Stream dataset entries (see load_dataset for path resolution)."""
+    return iter_json_array(_resolve_dataset(local_path, download))
+
+
+def load_dataset(local_path: str | None, download: bool) -> List[Dict[str, Any]]:
+    return list(iter_dataset(local_path, download))
+
+
+def _level(entry: Dict[str, Any]) -> str | None:
+    lvl = (entry.get("level") or "").strip().lower()
+    return lvl if lvl in LEVELS else None
+
+
+def _exercise_row(entry: Dict[str, Any], name: str, now: datetime) -> Dict[str, Any]:
+    primary = None
+    prim_list = entry.get("primaryMuscles")
+    if isinstance(prim_list, list) and prim_list:
+        primary = prim_list[0]
+
+    return {
+        "name": name,
+        "description": stringify_instructions(entry),
+        "muscle_group": norm_muscle(primary),
+        "equipment": (entry.get("equipment") or None),
+        "difficulty": _level(entry),
+        "instructions": json.dumps({
+            "source": "free-exercise-db",
+            "allowed_fields": guess_allowed_fields(entry),
+        }),
+        "is_custom": False,
+        "created_by": None,
+        "updated_at": now,
+    }
+
+
+def _copy_insert(rows: List[Dict[str, Any]]) -> bool:
+    """Insert rows with Postgres COPY in the session's transaction; False if unsupported."""
+    cursor = db.session.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        return False
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([
+            ("t" if row[col] else "f") if col == "is_custom" else ("" if row[col] is None else row[col])
+            for col in COPY_COLUMNS
+        ])
+    buf.seek(0)
+    # In CSV format an unquoted empty field is NULL
+    cursor.copy_expert(f"COPY exercise ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    return True
+
+
+def import_exercises(data: Iterable[Dict[str, Any]], commit_every: int = 200, dry_run: bool = False) -> dict:
+    """Set-based import: one preload query, one bulk insert, one bulk update, one commit.
+
+    ``data`` may be any iterable (e.g. iter_dataset) and is consumed once.
+    ``commit_every`` is accepted for backward compatibility; the import now
+    runs as a single transaction. With ``dry_run`` nothing is written and the
+    summary lists the affected names.
+    """
+    # Existing names (custom or not) are never duplicated; matches the old per-row lookup.
+    # Names are not unique in the schema (users may name custom exercises freely), so
+    # there is no constraint for INSERT ... ON CONFLICT; this preload is the dedupe.
+    existing = {}
+    for ex_id, ex_name, ex_difficulty in db.session.query(Exercise.id, Exercise.name, Exercise.difficulty):
+        existing.setdefault(ex_name, (ex_id, ex_difficulty))
+
+    now = datetime.utcnow()
+    to_insert: List[Dict[str, Any]] = []
+    to_update: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    updated_names: List[str] = []
+    seen = set()
+    for entry in data:
         name = (entry.get("name") or "").strip()
         if not name:
             continue
 
-        # Update difficulty for existing by exact name match, then skip insert
-        existing = Exercise.query.filter_by(name=name).first()
-        if existing:
-            _lvl = (entry.get("level") or "").strip().lower()
-            if _lvl in {"beginner", "intermediate", "advanced"} and not (existing.difficulty and existing.difficulty.strip()):
-                existing.difficulty = _lvl
-                updated_difficulty += 1
-            skipped_dupe += 1
+        if name in existing or name in seen:
+            # Fill in difficulty for existing rows that lack one; otherwise skip
+            if name in existing and name not in seen:
+                seen.add(name)
+                ex_id, ex_difficulty = existing[name]
+                lvl = _level(entry)
+                if lvl and not (ex_difficulty and ex_difficulty.strip()):
+                    to_update.append({"id": ex_id, "difficulty": lvl, "updated_at": now})
+                    updated_names.append(name)
+                    continue
+            skipped.append(name)
             continue
 
-        primary = None
-        prim_list = entry.get("primaryMuscles")
-        if isinstance(prim_list, list) and prim_list:
-            primary = prim_list[0]
-
-        exercise = Exercise(
-            name=name,
-            description=stringify_instructions(entry),
-            muscle_group=norm_muscle(primary),
-            equipment=(entry.get("equipment") or None),
-            difficulty=((entry.get("level") or "").strip().lower() if (entry.get("level") or "").strip().lower() in {"beginner","intermediate","advanced"} else None),
-            instructions=json.dumps({
-                "source": "free-exercise-db",
-                "allowed_fields": guess_allowed_fields(entry),
-            }),
-            is_custom=False,
-            created_by=None,
-        )
-        db.session.add(exercise)
-        inserted_count += 1
-
-        if i % commit_every == 0:
-            db.session.flush()
-            db.session.commit()
-            print(f"Committed batch at {i} records...")
+        seen.add(name)
+        to_insert.append(_exercise_row(entry, name, now))
+
+    summary = {"inserted": len(to_insert), "skipped_dupe": len(skipped), "updated_difficulty": len(to_update)}
+    if dry_run:
+        summary["dry_run"] = True
+        summary["inserted_names"] = [row["name"] for row in to_insert]
+        summary["updated_names"] = updated_names
+        summary["skipped_names"] = skipped
+        return summary
+
+    if to_insert:
+        is_postgres = db.session.get_bind().dialect.name == "postgresql"
+        if not (is_postgres and _copy_insert(to_insert)):
+            # Core (not ORM) insert so rows are not regrouped by which values are NULL:
+            # a single executemany / multi-row INSERT ... VALUES
+            db.session.execute(insert(Exercise.__table__), to_insert)
+    if to_update:
+        # ORM bulk UPDATE by primary key (single executemany)
+        db.session.execute(update(Exercise), to_update)
 
     db.session.commit()
-    return {"inserted": inserted_count, "skipped_dupe": skipped_dupe, "updated_difficulty": updated_difficulty}
+    catalog.invalidate()
+    return summary
 
 
 def main():
@@ -172,12 +287,26 @@ def main():
         action="store_true",
         help="Download dataset from upstream (saved locally for future runs)",
     )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print what would be inserted/updated/skipped without writing",
+    )
     args = parser.parse_args()
 
     with app.app_context():
-        data = load_dataset(args.local, args.download)
-        print(f"Loaded {len(data)} entries from dataset.")
-        summary = import_exercises(data)
+        bootstrap.ensure_bootstrapped(app)
+        summary = import_exercises(iter_dataset(args.local, args.download), dry_run=args.dry_run)
+        if args.dry_run:
+            for name in summary["inserted_names"]:
+                print(f"+ {name}")
+            for name in summary["updated_names"]:
+                print(f"~ {name} (difficulty)")
+            for name in summary["skipped_names"]:
+                print(f"= {name}")
+            print("Dry run finished (nothing written):")
+            print(json.dumps({key: summary[key] for key in ("inserted", "skipped_dupe", "updated_difficulty")}, indent=2))
+            return
         print("Import finished:")
         print(json.dumps(summary, indent=2))
 
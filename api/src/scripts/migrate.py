@@ -0,0 +1,42 @@
+import os
+import sys
+import argparse
+
+# Ensure project root is on sys.path when executed directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.main import app
+from src.models.user import db
+from src.migrations import runner, plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations, then exit")
+    parser.add_argument("--check-plans", action="store_true", help="EXPLAIN the hot queries and verify index usage")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.status:
+            applied = runner.applied_versions(db.engine)
+            for module in runner.discover():
+                state = "applied" if module.VERSION in applied else "pending"
+                print(f"{module.VERSION:04d} [{state}] {module.DESCRIPTION}")
+            return
+
+        db.create_all()
+        runner.upgrade(db.engine)
+
+        if args.check_plans:
+            failed = 0
+            for name, (ok, plan) in plans.check_hot_queries(db.engine).items():
+                print(f"{'OK  ' if ok else 'FAIL'} {name}")
+                if not ok:
+                    failed += 1
+                    for line in plan:
+                        print(f"       {line}")
+            sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import argparse
+from datetime import timedelta
+
+# Ensure project root is on sys.path when executed directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.main import app
+from src import bootstrap
+from src.models.user import db
+from src.services import sync
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete sync tombstones older than the retention window.")
+    parser.add_argument("--days", type=int, default=None, help="Override SYNC_TOMBSTONE_RETENTION_DAYS")
+    args = parser.parse_args()
+
+    with app.app_context():
+        bootstrap.ensure_bootstrapped(app)
+        removed = sync.prune_tombstones(timedelta(days=args.days) if args.days is not None else None)
+        db.session.commit()
+        print(f"Pruned {removed} sync tombstones.")
+
+
+if __name__ == "__main__":
+    main()
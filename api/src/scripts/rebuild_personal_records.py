@@ -0,0 +1,28 @@
+import os
+import sys
+import argparse
+
+# Ensure project root is on sys.path when executed directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.main import app
+from src import bootstrap
+from src.models.user import db
+from src.services import records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute personal records from all logged sets.")
+    parser.add_argument("--user", dest="user_id", type=int, default=None, help="Only rebuild records for this user id")
+    args = parser.parse_args()
+
+    with app.app_context():
+        bootstrap.ensure_bootstrapped(app)
+        written = records.rebuild_all(user_id=args.user_id)
+        db.session.commit()
+        scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+        print(f"Rebuilt personal records for {scope}: {written} records written.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs in a fresh interpreter so nothing is already imported or connected
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from src.main import app
+t1 = time.perf_counter()
+client = app.test_client()
+first = client.get(sys.argv[1])
+t2 = time.perf_counter()
+client.get(sys.argv[1])
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "first_request_s": t2 - t1,
+    "second_request_s": t3 - t2,
+    "status": first.status_code,
+}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us) tuples."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time and time to first request.")
+    parser.add_argument("--path", default="/api/exercises", help="Request path for the first-request timing")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest imports to list")
+    parser.add_argument("--mode", default=None, help="BOOTSTRAP_MODE for the probe (eager/lazy/off)")
+    parser.add_argument("--json", action="store_true", help="Emit a machine-readable report")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.mode:
+        env["BOOTSTRAP_MODE"] = args.mode
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, args.path],
+        cwd=API_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-4000:], file=sys.stderr)
+        sys.exit(proc.returncode)
+
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(proc.stderr)
+    # All imports at any nesting level, by cumulative time: a slow package and the
+    # slow module inside it both show up (the text report keeps -X importtime's
+    # indentation, two spaces per level; the JSON report gives it as depth)
+    slowest = sorted(imports, key=lambda row: row[2], reverse=True)[:args.top]
+
+    if args.json:
+        timings["imports"] = [
+            {"module": m.strip(), "depth": (len(m) - len(m.lstrip())) // 2, "self_us": s, "cumulative_us": c}
+            for m, s, c in slowest
+        ]
+        print(json.dumps(timings, indent=2))
+        return
+
+    print(f"import src.main:      {timings['import_s'] * 1000:8.1f} ms")
+    print(f"first request ({timings['status']}): {timings['first_request_s'] * 1000:8.1f} ms  {args.path}")
+    print(f"second request:       {timings['second_request_s'] * 1000:8.1f} ms")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for name, self_us, cumulative_us in slowest:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
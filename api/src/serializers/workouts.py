@@ -0,0 +1,176 @@
+"""Batch serialization of workout trees.
+
+``WorkoutSession.to_dict()`` walks ``exercises -> exercise / sets`` through
+lazy relationships, which costs one query per workout exercise and per set
+list. The helpers here load a whole page of sessions in a fixed number of
+queries (one per level of the tree) and assemble the same JSON shape.
+
+Loading and assembling are separate so the async path (``src/asgi.py``) can
+run the same statements on an ``AsyncSession``: the ``*_async`` variants
+take the session and produce identical output.
+"""
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.exercise import Exercise, WorkoutExercise, ExerciseSet
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+
+def _chunked(values, size=IN_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _select_in(model, column, ids, order_by):
+    """SELECT model rows WHERE column IN ids, one statement per chunk, ordered within each chunk"""
+    for chunk in _chunked(ids):
+        yield select(model).where(column.in_(chunk)).order_by(*order_by)
+
+
+def _fetch_in(model, column, ids, order_by):
+    rows = []
+    for statement in _select_in(model, column, ids, order_by):
+        rows.extend(db.session.execute(statement).scalars().all())
+    return rows
+
+
+async def _fetch_in_async(session, model, column, ids, order_by):
+    rows = []
+    for statement in _select_in(model, column, ids, order_by):
+        rows.extend((await session.execute(statement)).scalars().all())
+    return rows
+
+
+def _set_query_args(workout_exercises):
+    return ExerciseSet, ExerciseSet.workout_exercise_id, [we.id for we in workout_exercises], (ExerciseSet.sort_key, ExerciseSet.id)
+
+
+def _exercise_query_args(workout_exercises):
+    return Exercise, Exercise.id, {we.exercise_id for we in workout_exercises}, (Exercise.id,)
+
+
+def _index_children(sets, exercises):
+    sets_by_we = defaultdict(list)
+    for set_obj in sets:
+        sets_by_we[set_obj.workout_exercise_id].append(set_obj)
+    return sets_by_we, {exercise.id: exercise for exercise in exercises}
+
+
+def load_workout_exercises(workout_exercises, embed_exercise=True):
+    """Load sets and catalog entries for the given WorkoutExercise rows.
+
+    Returns ``(sets_by_workout_exercise, exercises_by_id)``; catalog entries
+    are skipped (empty mapping) unless ``embed_exercise``.
+    """
+    return _index_children(
+        _fetch_in(*_set_query_args(workout_exercises)),
+        _fetch_in(*_exercise_query_args(workout_exercises)) if embed_exercise else [],
+    )
+
+
+async def load_workout_exercises_async(session, workout_exercises, embed_exercise=True):
+    return _index_children(
+        await _fetch_in_async(session, *_set_query_args(workout_exercises)),
+        await _fetch_in_async(session, *_exercise_query_args(workout_exercises)) if embed_exercise else [],
+    )
+
+
+def assemble_workout_exercise(workout_exercise, sets, exercise, order_in_workout=None, embed_exercise=True):
+    """Same shape as WorkoutExercise.to_dict() built from preloaded rows (sets in display order).
+
+    Without ``embed_exercise`` the ``exercise`` key is left out (see services/fieldsets.py).
+    """
+    row = {
+        'id': workout_exercise.id,
+        'session_id': workout_exercise.session_id,
+        'exercise_id': workout_exercise.exercise_id,
+    }
+    if embed_exercise:
+        row['exercise'] = exercise.to_dict() if exercise else None
+    row.update(
+        order_in_workout=order_in_workout or workout_exercise.order_in_workout,
+        sort_key=workout_exercise.sort_key,
+        sets=[set_obj.to_dict(set_number=number) for number, set_obj in enumerate(sets, start=1)],
+    )
+    return row
+
+
+def assemble_workout(workout, workout_exercises, sets_by_we, exercises_by_id, embed_exercise=True):
+    """Same shape as WorkoutSession.to_dict() built from preloaded rows"""
+    return {
+        'id': workout.id,
+        'user_id': workout.user_id,
+        'name': workout.name,
+        'start_time': workout.start_time.isoformat() if workout.start_time else None,
+        'end_time': workout.end_time.isoformat() if workout.end_time else None,
+        'notes': workout.notes,
+        'exercises': [
+            assemble_workout_exercise(
+                we, sets_by_we.get(we.id, []), exercises_by_id.get(we.exercise_id), position, embed_exercise
+            )
+            for position, we in enumerate(workout_exercises, start=1)
+        ]
+    }
+
+
+def serialize_workout_exercises(workout_exercises):
+    """Serialize WorkoutExercise rows with their sets and exercises in two queries"""
+    sets_by_we, exercises_by_id = load_workout_exercises(workout_exercises)
+    return [
+        assemble_workout_exercise(we, sets_by_we.get(we.id, []), exercises_by_id.get(we.exercise_id))
+        for we in workout_exercises
+    ]
+
+
+def _workout_exercise_query_args(workouts):
+    return (
+        WorkoutExercise, WorkoutExercise.session_id, [w.id for w in workouts], (WorkoutExercise.sort_key, WorkoutExercise.id)
+    )
+
+
+def _assemble_workouts(workouts, workout_exercises, sets_by_we, exercises_by_id, embed_exercise=True):
+    exercises_by_session = defaultdict(list)
+    for we in workout_exercises:
+        exercises_by_session[we.session_id].append(we)
+    return [
+        assemble_workout(workout, exercises_by_session.get(workout.id, []), sets_by_we, exercises_by_id, embed_exercise)
+        for workout in workouts
+    ]
+
+
+def serialize_workouts(workouts, embed_exercise=True):
+    """Serialize WorkoutSession rows with the full exercise/set tree in three queries (two without ``embed_exercise``)"""
+    workouts = list(workouts)
+    if not workouts:
+        return []
+    workout_exercises = _fetch_in(*_workout_exercise_query_args(workouts))
+    return _assemble_workouts(
+        workouts, workout_exercises, *load_workout_exercises(workout_exercises, embed_exercise), embed_exercise
+    )
+
+
+def serialize_workouts_batches(workouts, batch_size=IN_CHUNK_SIZE, embed_exercise=True):
+    """serialize_workouts one batch at a time, for streaming long histories"""
+    for batch in _chunked(workouts, batch_size):
+        yield serialize_workouts(batch, embed_exercise)
+
+
+async def serialize_workouts_async(session, workouts, embed_exercise=True):
+    workouts = list(workouts)
+    if not workouts:
+        return []
+    workout_exercises = await _fetch_in_async(session, *_workout_exercise_query_args(workouts))
+    return _assemble_workouts(
+        workouts, workout_exercises,
+        *await load_workout_exercises_async(session, workout_exercises, embed_exercise), embed_exercise
+    )
+
+
+def serialize_workout(workout):
+    """Serialize a single WorkoutSession (see serialize_workouts)"""
+    return serialize_workouts([workout])[0]
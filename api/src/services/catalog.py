@@ -0,0 +1,207 @@
+"""In-process snapshot of the exercise catalog.
+
+The catalog (~870 Free Exercise DB rows plus custom exercises) changes rarely
+but is fetched on every SPA load. The snapshot keeps the serialized rows and a
+pre-encoded JSON body (compressed once per coding) with a strong ETag, so
+``GET /api/exercises`` can be answered - or short-circuited with 304 - without
+touching the database.
+
+Writers call ``invalidate()`` after committing catalog changes. Other worker
+processes (and the CLI importer) are picked up by a cheap fingerprint check
+(row count, max id and max ``updated_at``, so edits to existing rows count
+too) at most every ``CATALOG_REVALIDATE_SECONDS``. The snapshot and the
+fingerprint are always read from the primary: a lagging read replica would
+otherwise pin stale rows in the process until the next catalog change.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from src import compression
+from src.models.user import db
+from src.models.exercise import Exercise
+
+REVALIDATE_SECONDS = float(os.environ.get('CATALOG_REVALIDATE_SECONDS') or 60)
+# Number of distinct filter combinations kept per snapshot
+FILTERED_CACHE_SIZE = 128
+
+
+class EncodedBody:
+    """A JSON response body, compressed once per coding on first use"""
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self._compressed = {}
+
+    def compressed(self, coding):
+        """Body in ``coding`` (see ``compression.CODINGS``), or None if too small to bother"""
+        if len(self.body) < compression.MIN_BYTES:
+            return None
+        if coding not in self._compressed:
+            # Racing threads produce identical bytes; the last one wins
+            self._compressed[coding] = compression.compress_bytes(self.body, coding, static=True)
+        return self._compressed[coding]
+
+
+class CatalogSnapshot:
+    def __init__(self, version, rows, fingerprint):
+        self.version = version
+        self.rows = rows
+        self.by_id = {row['id']: row for row in rows}
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+        body = current_app.json.dumps(rows).encode('utf-8')
+        self.digest = hashlib.sha256(body).hexdigest()[:20]
+        self.full = EncodedBody(body, self.digest)
+        self._filtered = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encoded(self, key, build_rows):
+        """Encoded body for a derived view of the catalog, memoized per key"""
+        if not key:
+            return self.full
+        with self._lock:
+            cached = self._filtered.get(key)
+            if cached is not None:
+                self._filtered.move_to_end(key)
+                return cached
+        body = current_app.json.dumps(build_rows()).encode('utf-8')
+        key_digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:12]
+        encoded = EncodedBody(body, f'{self.digest}-{key_digest}')
+        with self._lock:
+            self._filtered[key] = encoded
+            while len(self._filtered) > FILTERED_CACHE_SIZE:
+                self._filtered.popitem(last=False)
+        return encoded
+
+    def etag_for(self, key):
+        """ETag of a derived view without building it (for If-None-Match checks)"""
+        if not key:
+            return self.digest
+        key_digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:12]
+        return f'{self.digest}-{key_digest}'
+
+
+_lock = threading.Lock()
+_version = 0
+_snapshot = None
+
+
+def invalidate():
+    """Bump the catalog version; the next read rebuilds the snapshot"""
+    global _version
+    with _lock:
+        _version += 1
+
+
+def _fingerprint_statement():
+    return select(func.count(Exercise.id), func.max(Exercise.id), func.max(Exercise.updated_at))
+
+
+def _on_primary(statement):
+    # An explicit bind bypasses replica routing (src/replicas.py)
+    return db.session.execute(statement, bind_arguments={'bind': db.engine})
+
+
+def _fingerprint():
+    return tuple(_on_primary(_fingerprint_statement()).one())
+
+
+def _fresh(snapshot):
+    """The snapshot if it is current and recently checked, else None"""
+    if snapshot is not None and snapshot.version == _version:
+        if time.monotonic() - snapshot.checked_at < REVALIDATE_SECONDS:
+            return snapshot
+    return None
+
+
+def _revalidated(snapshot, fingerprint):
+    """After a periodic cross-process check: another worker or the importer may have written"""
+    if fingerprint == snapshot.fingerprint:
+        snapshot.checked_at = time.monotonic()
+        return snapshot
+    invalidate()
+    return None
+
+
+def _replaced(previous):
+    """A current snapshot some other thread built since ``previous`` was read (call under _lock)"""
+    if _snapshot is not None and _snapshot.version == _version and _snapshot is not previous:
+        return _snapshot
+    return None
+
+
+def _publish(version, exercises):
+    """Build the snapshot from loaded Exercise rows and make it current (call under _lock)"""
+    global _snapshot
+    rows = [exercise.to_dict() for exercise in exercises]
+    updated = [exercise.updated_at for exercise in exercises if exercise.updated_at is not None]
+    fingerprint = (len(rows), rows[-1]['id'] if rows else None, max(updated, default=None))
+    _snapshot = CatalogSnapshot(version, rows, fingerprint)
+    return _snapshot
+
+
+def get_snapshot():
+    """Return the current catalog snapshot, rebuilding it if invalidated or stale"""
+    snapshot = _snapshot
+    if _fresh(snapshot):
+        return snapshot
+    if snapshot is not None and snapshot.version == _version and _revalidated(snapshot, _fingerprint()):
+        return snapshot
+    with _lock:
+        replaced = _replaced(snapshot)
+        if replaced is not None:
+            return replaced
+        version = _version
+        return _publish(version, _on_primary(select(Exercise).order_by(Exercise.id)).scalars().all())
+
+
+async def get_snapshot_async(session):
+    """get_snapshot on an AsyncSession (``src/asgi.py``); call inside an app context"""
+    snapshot = _snapshot
+    if _fresh(snapshot):
+        return snapshot
+    if snapshot is not None and snapshot.version == _version:
+        fingerprint = tuple((await session.execute(_fingerprint_statement())).one())
+        if _revalidated(snapshot, fingerprint):
+            return snapshot
+    version = _version
+    # The lock cannot be held across awaits, so only publishing is serialized
+    exercises = (await session.execute(select(Exercise).order_by(Exercise.id))).scalars().all()
+    with _lock:
+        return _replaced(snapshot) or _publish(version, exercises)
+
+
+def peek_snapshot():
+    """Current snapshot if it is still valid, without any database access"""
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != _version:
+        return None
+    if time.monotonic() - snapshot.checked_at >= REVALIDATE_SECONDS:
+        return None
+    return snapshot
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value covers the given ETag (any coding)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for coding in compression.CODINGS:
+            if candidate.endswith(f'-{coding}'):
+                candidate = candidate[:-len(coding) - 1]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,49 @@
+"""Facet counts (muscle group, equipment, difficulty) over the catalog snapshot.
+
+Counts are computed from the in-memory snapshot and memoized alongside its
+encoded bodies, so they are invalidated together with the catalog. When
+filters are applied, each facet's counts honour every *other* active filter
+(disjunctive drill-down): selecting "Chest" still shows the other muscle
+groups, but narrows the equipment and difficulty counts to chest exercises.
+"""
+from src.services import search as search_index
+
+# Response key -> catalog row field
+FACETS = (('muscle_groups', 'muscle_group'), ('equipment', 'equipment'), ('difficulty', 'difficulty'))
+
+
+def _matches(row, field, value):
+    return value is None or (row[field] or '').lower() == value
+
+
+def compute_facets(snapshot, filters, search=None):
+    """Facet counts for the snapshot.
+
+    ``filters`` maps row field -> lower-cased selected value (or None).
+    """
+    rows = search_index.get_index(snapshot).search(search) if search else snapshot.rows
+    result = {}
+    for facet, field in FACETS:
+        counts = {}
+        labels = {}
+        for row in rows:
+            if not all(_matches(row, other, value) for other, value in filters.items() if other != field):
+                continue
+            value = row[field]
+            if not value:
+                continue
+            # Group spellings like "Beginner"/"beginner" under the first one seen
+            key = value.lower()
+            labels.setdefault(key, value)
+            counts[key] = counts.get(key, 0) + 1
+        result[facet] = [
+            {'value': labels[key], 'count': count}
+            for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        ]
+    result['total'] = sum(1 for row in rows if all(_matches(row, field, value) for field, value in filters.items()))
+    return result
+
+
+def facet_values(snapshot, facet):
+    """Distinct values for one facet over the whole catalog, alphabetically"""
+    return sorted((entry['value'] for entry in compute_facets(snapshot, {})[facet]), key=str.lower)
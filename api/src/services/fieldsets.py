@@ -0,0 +1,177 @@
+"""Sparse fieldsets and exercise side-loading for workout, record and catalog payloads.
+
+Query parameters (JSON:API style):
+
+- ``fields[<type>]=a,b`` keeps only those keys of every ``<type>`` object in
+  the response; ``fields=a,b`` applies to the endpoint's own type. ``id`` is
+  always kept. Types: ``workout``, ``workout_exercise``, ``set``,
+  ``exercise``, ``personal_record``.
+- ``include`` controls the catalog entry each workout exercise / personal
+  record points to. Absent: embedded as ``exercise`` (the original shape).
+  ``include=exercises``: not embedded; the response becomes
+  ``{"data": ..., "included": {"exercises": {"<id>": {...}}}}`` with each
+  referenced exercise once. ``include=`` (empty): ``exercise_id`` only.
+
+Without these parameters responses are unchanged. Everything here works on
+serialized dicts, so the Flask routes and the async path share it.
+"""
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.exercise import Exercise
+from src.services import catalog
+
+FIELDS = {
+    'workout': frozenset((
+        'id', 'user_id', 'name', 'start_time', 'end_time', 'notes', 'exercises', 'exercise_count', 'set_count',
+    )),
+    'workout_exercise': frozenset(('id', 'session_id', 'exercise_id', 'exercise', 'order_in_workout', 'sort_key', 'sets')),
+    'set': frozenset((
+        'id', 'workout_exercise_id', 'set_number', 'sort_key', 'reps', 'weight', 'duration', 'distance',
+        'rest_time', 'set_type', 'notes',
+    )),
+    'exercise': frozenset((
+        'id', 'name', 'description', 'muscle_group', 'equipment', 'difficulty', 'instructions', 'is_custom', 'created_by',
+    )),
+    'personal_record': frozenset((
+        'id', 'user_id', 'exercise_id', 'exercise', 'record_type', 'value', 'achieved_date', 'workout_session_id',
+        'exercise_set_id',
+    )),
+}
+# Nested keys and the type of the objects they hold
+NESTED = {
+    'workout': {'exercises': 'workout_exercise'},
+    'workout_exercise': {'exercise': 'exercise', 'sets': 'set'},
+    'personal_record': {'exercise': 'exercise'},
+}
+
+EMBED, SIDELOAD, IDS = 'embed', 'sideload', 'ids'
+
+
+def _types_under(primary):
+    types = [primary]
+    for type_ in types:
+        types.extend(child for child in NESTED.get(type_, {}).values() if child not in types)
+    return types
+
+
+class Fieldset:
+    """Requested keys per type (absent = all) and how related exercises are returned"""
+
+    def __init__(self, fields=None, include=EMBED):
+        self.fields = fields or {}
+        self.include = include
+
+    @property
+    def is_default(self):
+        return not self.fields and self.include == EMBED
+
+    @property
+    def embed_exercise(self):
+        return self.include == EMBED
+
+    def wants(self, type_, key):
+        fields = self.fields.get(type_)
+        return fields is None or key in fields
+
+    def key(self):
+        """Hashable form, for caches keyed by request parameters"""
+        return tuple(sorted((type_, tuple(sorted(fields))) for type_, fields in self.fields.items())) + (self.include,)
+
+
+def parse(args, primary):
+    """Fieldset for an endpoint returning ``primary`` objects; ValueError carries the client message"""
+    types = _types_under(primary)
+    fields = {}
+    for name, value in args.items():
+        if name == 'fields':
+            type_ = primary
+        elif name.startswith('fields[') and name.endswith(']'):
+            type_ = name[len('fields['):-1]
+        else:
+            continue
+        if type_ not in types:
+            raise ValueError(f"Unknown type in {name}; expected one of {', '.join(types)}")
+        keys = {key.strip() for key in value.split(',') if key.strip()}
+        unknown = keys - FIELDS[type_]
+        if unknown:
+            raise ValueError(f"Unknown {type_} field(s): {', '.join(sorted(unknown))}")
+        fields[type_] = frozenset(keys | {'id'})
+
+    include = args.get('include')
+    if include is None:
+        include = EMBED
+    elif 'exercise' not in types[1:]:
+        raise ValueError(f'include is not supported for {primary}')
+    elif include == 'exercises':
+        include = SIDELOAD
+    elif include == '':
+        include = IDS
+    else:
+        raise ValueError("include must be 'exercises' or empty")
+    return Fieldset(fields, include)
+
+
+def shape(type_, value, fieldset):
+    """Apply the fieldset to a serialized object (or list of them) of ``type_`` and everything nested in it"""
+    if isinstance(value, list):
+        return [shape(type_, item, fieldset) for item in value]
+    if value is None or not fieldset.fields:
+        return value
+    fields = fieldset.fields.get(type_)
+    row = {key: item for key, item in value.items() if key in fields} if fields is not None else dict(value)
+    for key, child_type in NESTED.get(type_, {}).items():
+        if key in row:
+            row[key] = shape(child_type, row[key], fieldset)
+    return row
+
+
+def exercise_ids(type_, value):
+    """Exercise ids referenced by serialized ``type_`` objects (before shaping)"""
+    if isinstance(value, list):
+        return {exercise_id for item in value for exercise_id in exercise_ids(type_, item)}
+    if type_ in ('workout_exercise', 'personal_record'):
+        return {value['exercise_id']}
+    if type_ == 'workout':
+        return exercise_ids('workout_exercise', value.get('exercises', []))
+    return set()
+
+
+def side_loaded(snapshot, ids):
+    """``(rows_by_id, missing_ids)``: catalog rows for ``ids`` from the snapshot"""
+    rows = {exercise_id: snapshot.by_id[exercise_id] for exercise_id in ids if exercise_id in snapshot.by_id}
+    return rows, set(ids) - rows.keys()
+
+
+def missing_statement(ids):
+    """Exercises not in this worker's snapshot yet (e.g. created elsewhere moments ago)"""
+    return select(Exercise).where(Exercise.id.in_(sorted(ids)))
+
+
+def load_exercises(ids):
+    """Catalog rows for ``ids``, from the snapshot with a database fallback"""
+    rows, missing = side_loaded(catalog.get_snapshot(), ids)
+    if missing:
+        rows.update((exercise.id, exercise.to_dict()) for exercise in db.session.execute(missing_statement(missing)).scalars())
+    return rows
+
+
+def document(data, fieldset, exercises=None):
+    """Response body for shaped ``data``; a compound document when exercises are side-loaded.
+
+    ``exercises`` maps id -> catalog row for every exercise ``data`` references.
+    """
+    if fieldset.include != SIDELOAD:
+        return data
+    return {
+        'data': data,
+        'included': {'exercises': {
+            str(exercise_id): shape('exercise', row, fieldset) for exercise_id, row in sorted((exercises or {}).items())
+        }},
+    }
+
+
+def body(type_, data, fieldset):
+    """Shaped response body for serialized ``type_`` objects, side-loading exercises if asked"""
+    exercises = load_exercises(exercise_ids(type_, data)) if fieldset.include == SIDELOAD else None
+    return document(shape(type_, data, fieldset), fieldset, exercises)
@@ -0,0 +1,104 @@
+"""Workout history queries shared by the Flask routes and the async path.
+
+Everything here builds statements or parses input; callers execute them on
+``db.session`` or an ``AsyncSession`` (``src/asgi.py``) and get the same rows.
+"""
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, distinct, func, or_, select
+
+from src.models.exercise import WorkoutSession, WorkoutExercise, ExerciseSet
+
+# Upper bound for a single page of workout history
+MAX_WORKOUT_PAGE_SIZE = 100
+# Full-view responses with more workouts than this are streamed
+STREAM_MIN_WORKOUTS = 500
+
+
+def encode_cursor(workout):
+    """Opaque keyset cursor pointing at (start_time, id) of the last returned workout"""
+    raw = f"{workout.start_time.isoformat()}|{workout.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        start_time, workout_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start_time), int(workout_id)
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def parse_params(args):
+    """``(view, limit, before)`` from the query string; ValueError carries the client message"""
+    view = args.get('view', 'full')
+    if view not in ('full', 'summary'):
+        raise ValueError("view must be 'full' or 'summary'")
+
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer') from None
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        limit = min(limit, MAX_WORKOUT_PAGE_SIZE)
+
+    before = args.get('before')
+    return view, limit, decode_cursor(before) if before else None
+
+
+def page_statement(user_id, limit, before):
+    """Keyset pagination on (start_time, id), newest first; one extra row tells if more exist"""
+    statement = select(WorkoutSession).where(WorkoutSession.user_id == user_id)
+    if before is not None:
+        before_time, before_id = before
+        statement = statement.where(or_(
+            WorkoutSession.start_time < before_time,
+            and_(WorkoutSession.start_time == before_time, WorkoutSession.id < before_id)
+        ))
+    statement = statement.order_by(WorkoutSession.start_time.desc(), WorkoutSession.id.desc())
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    return statement
+
+
+def split_page(workouts, limit):
+    """``(workouts, next_cursor)`` from the rows of page_statement"""
+    if limit is None or len(workouts) <= limit:
+        return workouts, None
+    workouts = workouts[:limit]
+    return workouts, encode_cursor(workouts[-1])
+
+
+def counts_statement(session_ids):
+    """Exercise and set counts per session in a single grouped query"""
+    return (
+        select(
+            WorkoutExercise.session_id,
+            func.count(distinct(WorkoutExercise.id)),
+            func.count(ExerciseSet.id)
+        )
+        .outerjoin(ExerciseSet, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .where(WorkoutExercise.session_id.in_(session_ids))
+        .group_by(WorkoutExercise.session_id)
+    )
+
+
+def summaries(workouts, count_rows):
+    counts = {session_id: (exercise_count, set_count) for session_id, exercise_count, set_count in count_rows}
+    return [workout.to_summary_dict(*counts.get(workout.id, (0, 0))) for workout in workouts]
+
+
+def active_statement(user_id):
+    """The user's most recent in-progress workout"""
+    return (
+        select(WorkoutSession)
+        .where(WorkoutSession.user_id == user_id, WorkoutSession.end_time.is_(None))
+        .order_by(WorkoutSession.start_time.desc())
+        .limit(1)
+    )
@@ -0,0 +1,190 @@
+"""Content-addressed image storage for profile pictures.
+
+Uploads are stored once under the SHA-256 of their bytes, so re-uploading the
+same photo stores nothing new and every stored object is immutable (served with a
+one-year ``immutable`` cache lifetime). Square thumbnails are generated at
+upload time with Pillow, a required dependency: the app refuses to start
+without it rather than silently serving full-size originals.
+
+Backends (``MEDIA_BACKEND``):
+    local    - files under ``MEDIA_ROOT`` (default for local SQLite dev)
+    database - the ``media_blob`` table (default with DATABASE_URL, since
+               serverless filesystems are ephemeral)
+    pkg.module:Class - any object with put/get/exists
+"""
+import base64
+import hashlib
+import importlib
+import importlib.util
+import os
+import re
+
+from sqlalchemy import text
+
+from src.models.user import db
+
+# Checked here, imported on first upload (keeps cold start lean)
+if importlib.util.find_spec('PIL') is None:
+    raise ImportError('Pillow is required for profile picture thumbnails (pip install -r requirements.txt)')
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+# Largest request body read for an upload: a base64 data URL is 4/3 of the
+# image, multipart adds some framing
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES * 4 // 3 + 64 * 1024
+THUMBNAIL_SIZES = (64, 256)
+# Size referenced by User.profile_picture (what the avatar displays)
+DISPLAY_SIZE = 256
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}(_\d+)?\.(jpg|png|gif|webp)$')
+
+CONTENT_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+_DATA_URL = re.compile(r'^data:(?P<mime>[\w/+.-]+)?(;[\w=-]+)*;base64,(?P<data>.*)$', re.DOTALL)
+
+
+class MediaError(ValueError):
+    """Upload rejected (bad encoding, unsupported type, too large)"""
+
+
+def sniff_extension(data):
+    """File extension from magic bytes, or None if not a supported image"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def decode_data_url(value):
+    """Bytes of a base64 data URL (what the SPA sends); raises MediaError"""
+    match = _DATA_URL.match(value or '')
+    if not match:
+        raise MediaError('profile_picture must be a base64 data URL')
+    try:
+        return base64.b64decode(match.group('data'), validate=False)
+    except Exception as e:
+        raise MediaError('Invalid base64 image data') from e
+
+
+class LocalBackend:
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('MEDIA_ROOT') or os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'database', 'media'
+        )
+
+    def _path(self, key):
+        # Fan out by hash prefix to keep directories small
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key, conn=None):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, data, content_type, conn=None):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class DatabaseBackend:
+    """Stores blobs in media_blob; ``conn`` lets migrations write in their own transaction"""
+
+    def exists(self, key, conn=None):
+        executor = conn if conn is not None else db.session
+        return executor.execute(text('SELECT 1 FROM media_blob WHERE key = :key'), {'key': key}).first() is not None
+
+    def put(self, key, data, content_type, conn=None):
+        executor = conn if conn is not None else db.session
+        # A no-op when the key is already stored, also when a concurrent upload of
+        # the same bytes commits first (Postgres, SQLite 3.24+)
+        executor.execute(
+            text('INSERT INTO media_blob (key, content_type, data, created_at) '
+                 'VALUES (:key, :ct, :data, CURRENT_TIMESTAMP) ON CONFLICT (key) DO NOTHING'),
+            {'key': key, 'ct': content_type, 'data': data}
+        )
+
+    def get(self, key):
+        row = db.session.execute(text('SELECT data FROM media_blob WHERE key = :key'), {'key': key}).first()
+        return bytes(row[0]) if row else None
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = os.environ.get('MEDIA_BACKEND')
+        if not name:
+            using_postgres = bool(os.environ.get('DATABASE_URL') or os.environ.get('POSTGRES_URL'))
+            name = 'database' if using_postgres else 'local'
+        if name == 'local':
+            _backend = LocalBackend()
+        elif name == 'database':
+            _backend = DatabaseBackend()
+        else:
+            module_name, _, class_name = name.partition(':')
+            _backend = getattr(importlib.import_module(module_name), class_name)()
+    return _backend
+
+
+def _thumbnail(data, size):
+    """Center-cropped square JPEG thumbnail"""
+    import io
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img = ImageOps.fit(img.convert('RGB'), (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=85, optimize=True)
+        return out.getvalue()
+
+
+def store_image(data, conn=None):
+    """Store an uploaded image and its thumbnails; returns the key to display.
+
+    The returned key names the DISPLAY_SIZE thumbnail, or the original if
+    Pillow cannot decode the image.
+    """
+    if not data:
+        raise MediaError('Empty image')
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise MediaError(f'Image exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB')
+    ext = sniff_extension(data)
+    if ext is None:
+        raise MediaError('Unsupported image type (use JPEG, PNG, GIF or WebP)')
+
+    digest = hashlib.sha256(data).hexdigest()
+    backend = get_backend()
+    original_key = f'{digest}.{ext}'
+    backend.put(original_key, data, CONTENT_TYPES[ext], conn=conn)
+
+    display_key = original_key
+    for size in THUMBNAIL_SIZES:
+        key = f'{digest}_{size}.jpg'
+        try:
+            thumbnail = _thumbnail(data, size)
+        except Exception:
+            # Undecodable despite valid magic bytes: keep serving the original
+            return original_key
+        backend.put(key, thumbnail, 'image/jpeg', conn=conn)
+        if size == DISPLAY_SIZE:
+            display_key = key
+    return display_key
+
+
+def content_type_for(key):
+    return CONTENT_TYPES.get(key.rsplit('.', 1)[-1], 'application/octet-stream')
@@ -0,0 +1,145 @@
+"""Fractional ordering keys for workout exercises and sets.
+
+Each row carries a ``sort_key`` string; siblings are ordered by
+``(sort_key, id)``. A key can always be generated strictly between two
+neighbours, so inserting or moving a row updates only that row and deleting
+never renumbers. Display numbers (``order_in_workout`` / ``set_number`` in API
+responses) are the 1-based rank, derived when serializing.
+
+Keys use base-36 digits (0-9a-z), which sort the same under byte-wise and
+locale collations, and never end in '0' so there is always room between two
+keys. Appends step the leading digit, so a list grows one character per ~35
+appended rows.
+"""
+from src.models.user import db
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+# Keys longer than this trigger a rebalance of the siblings (column is String(64))
+MAX_KEY_LENGTH = 48
+
+
+def _midpoint(a, b):
+    """Key strictly between digit strings ``a`` < ``b`` (``b`` None means unbounded)"""
+    if b is not None:
+        # Shared prefix (a padded with '0') is copied verbatim
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    if b is None and digit_a + 1 < BASE:
+        # Appending: step by one digit so repeated appends stay short
+        return DIGITS[digit_a + 1]
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a, b):
+    """Key sorting after ``a`` and before ``b``; either may be None for open ends"""
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f'{a!r} must sort before {b!r}')
+    return _midpoint(a or '', b)
+
+
+def _evenly_spaced(n):
+    """``n`` keys spread over the whole key space at the smallest common width"""
+    width = 1
+    while BASE ** width <= n + 1:
+        width += 1
+    keys = []
+    for i in range(1, n + 1):
+        value, digits = i * BASE ** width // (n + 1), []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def keys_between(a, b, n):
+    """``n`` ascending keys between ``a`` and ``b`` (either may be None).
+
+    Bounded gaps are split in halves, keeping key length logarithmic in ``n``.
+    """
+    if n <= 0:
+        return []
+    if a is None and b is None:
+        return _evenly_spaced(n)
+    if b is None:
+        keys = []
+        for _ in range(n):
+            a = key_between(a, None)
+            keys.append(a)
+        return keys
+    middle = key_between(a, b)
+    left = n // 2
+    return keys_between(a, middle, left) + [middle] + keys_between(middle, b, n - left - 1)
+
+
+def append_positions(model, parent_column, parent_id, n):
+    """(n keys, first display number) for appending under a parent, in one query"""
+    last_key, count = (
+        db.session.query(db.func.max(model.sort_key), db.func.count())
+        .filter(parent_column == parent_id)
+        .one()
+    )
+    keys = keys_between(last_key, None, n)
+    if keys and len(keys[-1]) > MAX_KEY_LENGTH:
+        rebalance(model, parent_column, parent_id)
+        return append_positions(model, parent_column, parent_id, n)
+    return keys, (count or 0) + 1
+
+
+def append_position(model, parent_column, parent_id):
+    """(key, display number) for appending one row under a parent"""
+    keys, number = append_positions(model, parent_column, parent_id, 1)
+    return keys[0], number
+
+
+def position(model, parent_column, row):
+    """1-based display number of ``row`` among its siblings ordered by ``(sort_key, id)``"""
+    before = db.session.query(db.func.count()).select_from(model).filter(
+        parent_column == getattr(row, parent_column.key),
+        db.or_(model.sort_key < row.sort_key, db.and_(model.sort_key == row.sort_key, model.id < row.id)),
+    ).scalar()
+    return before + 1
+
+
+def move_key(model, parent_column, parent_id, row, after=None, before=None):
+    """New sort_key placing ``row`` directly after ``after`` or before ``before`` (siblings or None).
+
+    With neither given the row moves to the end. Only the neighbour on the
+    other side is looked up; ``row`` itself is skipped.
+    """
+    siblings = db.session.query(model.sort_key).filter(parent_column == parent_id, model.id != row.id)
+    if after is not None:
+        upper = siblings.filter(model.sort_key > after.sort_key).order_by(model.sort_key).limit(1).scalar()
+        lower = after.sort_key
+    elif before is not None:
+        lower = siblings.filter(model.sort_key < before.sort_key).order_by(model.sort_key.desc()).limit(1).scalar()
+        upper = before.sort_key
+    else:
+        lower, upper = siblings.order_by(model.sort_key.desc()).limit(1).scalar(), None
+    if lower is not None and upper is not None and lower >= upper:
+        # Duplicate keys (two concurrent appends); spread the siblings out again
+        rebalance(model, parent_column, parent_id)
+        return move_key(model, parent_column, parent_id, row, after=after, before=before)
+    key = key_between(lower, upper)
+    if len(key) > MAX_KEY_LENGTH:
+        rebalance(model, parent_column, parent_id)
+        return move_key(model, parent_column, parent_id, row, after=after, before=before)
+    return key
+
+
+def rebalance(model, parent_column, parent_id):
+    """Reassign evenly spaced keys to all children of a parent, keeping their order"""
+    rows = model.query.filter(parent_column == parent_id).order_by(model.sort_key, model.id).all()
+    for row, key in zip(rows, keys_between(None, None, len(rows))):
+        row.sort_key = key
+    db.session.flush()
@@ -0,0 +1,116 @@
+"""Password hashing with bounded concurrency.
+
+bcrypt is deliberately slow (~250 ms at cost 12). A burst of logins - every
+client re-authenticating after a deploy - would otherwise start as many
+concurrent hashes as there are request threads and saturate every core.
+Hashes run on ``PASSWORD_HASH_WORKERS`` dedicated threads (default: half the
+CPUs, at least one), which caps the CPU bcrypt can take; bcrypt releases the
+GIL, so the remaining cores keep serving other requests.
+
+This bounds concurrency, it does not free request threads: the calling
+thread still blocks on ``future.result()`` for the queue wait plus the hash.
+What keeps a burst from holding every request thread is the admission limit:
+at most ``PASSWORD_HASH_MAX_PENDING`` hashes (running + queued, default 32)
+are accepted; beyond that ``HashingBusy`` is raised at once and the caller
+answers 503 with ``Retry-After`` instead of queueing without bound.
+
+``BCRYPT_ROUNDS`` (default 12, bcrypt's own default) is the work factor for
+new hashes. Hashes with a different cost still verify, and ``needs_rehash``
+tells the login route to re-hash them with the new cost.
+
+Metrics: ``password_hash_pending`` (gauge), ``password_hash_wait_seconds``
+(time queued), ``password_hash_duration_seconds{operation}`` and
+``password_hash_rejected_total``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.instrumentation import registry
+
+ROUNDS = int(os.environ.get('BCRYPT_ROUNDS') or 12)
+WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 32)
+# Suggested client back-off when saturated
+RETRY_AFTER_SECONDS = 1
+
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PENDING = registry.gauge('password_hash_pending', 'Password hashes running or queued')
+WAIT = registry.histogram('password_hash_wait_seconds', 'Time a password hash waited for an executor thread',
+                          buckets=HASH_BUCKETS)
+DURATION = registry.histogram('password_hash_duration_seconds', 'bcrypt time per operation', ('operation',),
+                              HASH_BUCKETS)
+REJECTED = registry.counter('password_hash_rejected_total', 'Password hashes refused because the executor was saturated')
+
+
+class HashingBusy(Exception):
+    """Too many password hashes in flight; retry after RETRY_AFTER_SECONDS"""
+
+
+_executor = None
+_pending = 0
+_lock = threading.Lock()
+
+
+def _get_executor():
+    # Created on first use, so processes that never hash (most serverless invocations) start no threads
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='password-hash')
+    return _executor
+
+
+def _run(operation, fn, *args):
+    global _pending
+    with _lock:
+        if _pending >= MAX_PENDING:
+            REJECTED.inc(())
+            raise HashingBusy(f'{_pending} password hashes in flight')
+        _pending += 1
+    PENDING.inc(())
+    submitted = time.perf_counter()
+
+    def timed():
+        started = time.perf_counter()
+        WAIT.observe((), started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            DURATION.observe((operation,), time.perf_counter() - started)
+
+    try:
+        return _get_executor().submit(timed).result()
+    finally:
+        with _lock:
+            _pending -= 1
+        PENDING.dec(())
+
+
+def hash_password(password):
+    """bcrypt hash (str) of ``password`` with ROUNDS; may raise HashingBusy"""
+    import bcrypt  # deferred: only needed on register/login, keeps cold start lean
+    salt = bcrypt.gensalt(rounds=ROUNDS)
+    return _run('hash', bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password, password_hash):
+    """True if ``password`` matches the stored hash; may raise HashingBusy"""
+    import bcrypt
+    return _run('verify', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def cost(password_hash):
+    """Work factor of a stored ``$2b$<cost>$...`` hash, or None if unrecognised"""
+    parts = password_hash.split('$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash):
+    return cost(password_hash) != ROUNDS
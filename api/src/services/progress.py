@@ -0,0 +1,107 @@
+"""Per-exercise progression series for charts.
+
+``exercise_progress`` computes one point per workout session with a single
+grouped query (warm-up sets excluded, 1RM estimated with the same Epley
+formula as personal records). Long histories are reduced server-side with
+Largest-Triangle-Three-Buckets, which keeps the visual shape of the curve -
+peaks and drops survive - at a fixed point budget.
+"""
+from sqlalchemy import and_, case, func
+
+from src.models.user import db
+from src.models.exercise import WorkoutSession, WorkoutExercise, ExerciseSet
+from src.services.records import EXCLUDED_SET_TYPES
+
+METRICS = ('estimated_1rm', 'top_weight', 'max_reps', 'volume')
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+
+
+def _session_rows(user_id, exercise_id):
+    working = func.coalesce(ExerciseSet.set_type, 'normal').notin_(EXCLUDED_SET_TYPES)
+    loaded = and_(working, ExerciseSet.reps > 0, ExerciseSet.weight > 0)
+    e1rm = case(
+        (ExerciseSet.reps == 1, ExerciseSet.weight),
+        else_=ExerciseSet.weight * (1 + ExerciseSet.reps / 30.0)
+    )
+    return (
+        db.session.query(
+            WorkoutSession.id,
+            WorkoutSession.start_time,
+            func.max(case((loaded, e1rm))),
+            func.max(case((working, ExerciseSet.weight))),
+            func.max(case((working, ExerciseSet.reps))),
+            func.sum(case((loaded, ExerciseSet.weight * ExerciseSet.reps), else_=0)),
+            func.sum(case((working, 1), else_=0)),
+        )
+        .join(WorkoutExercise, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .join(WorkoutSession, WorkoutExercise.session_id == WorkoutSession.id)
+        .filter(WorkoutSession.user_id == user_id, WorkoutExercise.exercise_id == exercise_id)
+        .group_by(WorkoutSession.id, WorkoutSession.start_time)
+        .having(func.sum(case((working, 1), else_=0)) > 0)
+        .order_by(WorkoutSession.start_time, WorkoutSession.id)
+        .all()
+    )
+
+
+def lttb(xs, ys, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    ``xs`` must be ascending. The first and last points are always kept.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 1)]
+
+    kept = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(max(int((i + 2) * bucket_size) + 1, next_start + 1), n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def exercise_progress(user_id, exercise_id, metric='estimated_1rm', points=DEFAULT_POINTS):
+    """Per-session progression, downsampled to at most ``points`` using ``metric`` as the shape"""
+    rows = _session_rows(user_id, exercise_id)
+    series = [
+        {
+            'session_id': session_id,
+            'date': start_time.isoformat() if start_time else None,
+            'estimated_1rm': round(float(e1rm), 2) if e1rm is not None else None,
+            'top_weight': float(top_weight) if top_weight is not None else None,
+            'max_reps': int(max_reps) if max_reps is not None else None,
+            'volume': float(volume or 0),
+            'sets': int(sets or 0),
+        }
+        for session_id, start_time, e1rm, top_weight, max_reps, volume, sets in rows
+    ]
+    if len(series) > points:
+        xs = [row[1].timestamp() for row in rows]
+        ys = [point[metric] or 0 for point in series]
+        series = [series[i] for i in lttb(xs, ys, points)]
+    return {
+        'exercise_id': exercise_id,
+        'metric': metric,
+        'total_sessions': len(rows),
+        'points': series
+    }
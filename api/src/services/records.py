@@ -0,0 +1,210 @@
+"""Incremental personal-record maintenance.
+
+For every (user, exercise) we keep one PersonalRecord row per record type.
+Writes are handled incrementally:
+
+- a new or edited set that does not currently hold a record only needs to be
+  compared with the existing rows (one indexed query, O(1) work);
+- editing or deleting a set that *does* hold a record may lower the maximum,
+  so only that (user, exercise) pair is recomputed from its sets.
+
+Ties go to the earliest achievement (workout start, then set id) on every
+path, so incremental updates and rebuilds agree on the holder.
+
+``rebuild_all`` recomputes everything in one pass
+(``src/scripts/rebuild_personal_records.py``). Migration v0002 keeps a
+frozen copy of these rules for its backfill; change both together only if
+old databases should be backfilled differently.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.exercise import WorkoutSession, WorkoutExercise, ExerciseSet, PersonalRecord
+
+RECORD_TYPES = ('max_weight', 'max_reps', 'max_volume', 'estimated_1rm')
+# Warm-up sets never count towards records
+EXCLUDED_SET_TYPES = ('warmup',)
+
+
+def estimated_1rm(reps, weight):
+    """Epley estimate; a single rep is its own 1RM"""
+    if not reps or not weight:
+        return None
+    if reps == 1:
+        return float(weight)
+    return float(weight) * (1 + reps / 30.0)
+
+
+def set_metrics(reps, weight, set_type=None):
+    """Record-type -> value for a single set (only the metrics it qualifies for)"""
+    if set_type in EXCLUDED_SET_TYPES:
+        return {}
+    metrics = {}
+    if weight and weight > 0:
+        metrics['max_weight'] = float(weight)
+    if reps and reps > 0:
+        metrics['max_reps'] = float(reps)
+    if weight and weight > 0 and reps and reps > 0:
+        metrics['max_volume'] = float(weight) * reps
+        metrics['estimated_1rm'] = estimated_1rm(reps, weight)
+    return metrics
+
+
+def _load_records(user_id, exercise_id):
+    records = PersonalRecord.query.filter_by(user_id=user_id, exercise_id=exercise_id).all()
+    return {record.record_type: record for record in records}
+
+
+def _apply(records, user_id, exercise_id, record_type, value, set_id, session_id, achieved):
+    record = records.get(record_type)
+    if record is None:
+        record = PersonalRecord(user_id=user_id, exercise_id=exercise_id, record_type=record_type)
+        db.session.add(record)
+        records[record_type] = record
+    record.value = value
+    record.exercise_set_id = set_id
+    record.workout_session_id = session_id
+    record.achieved_date = achieved or datetime.utcnow()
+
+
+def on_set_written(exercise_set):
+    """Update records after a set was inserted or edited (set must be flushed)"""
+    workout_exercise = exercise_set.workout_exercise
+    session = workout_exercise.session
+    user_id, exercise_id = session.user_id, workout_exercise.exercise_id
+    records = _load_records(user_id, exercise_id)
+
+    if any(record.exercise_set_id == exercise_set.id for record in records.values()):
+        # The edited set holds a record; its value may have dropped below another set
+        rebuild_exercise(user_id, exercise_id)
+        return
+
+    _consider(records, user_id, exercise_id, exercise_set, session)
+
+
+def _beats(value, achieved, set_id, current_value, current_achieved, current_set_id):
+    """True if a set's value takes the record from the current holder (ties: earliest wins)"""
+    if value != current_value:
+        return value > current_value
+    if achieved is None or current_achieved is None:
+        return False
+    return (achieved, set_id) < (current_achieved, current_set_id or 0)
+
+
+def _consider(records, user_id, exercise_id, exercise_set, session):
+    """Promote a set to record holder for every metric it beats"""
+    metrics = set_metrics(exercise_set.reps, exercise_set.weight, exercise_set.set_type)
+    for record_type, value in metrics.items():
+        current = records.get(record_type)
+        if current is None or _beats(value, session.start_time, exercise_set.id,
+                                     current.value, current.achieved_date, current.exercise_set_id):
+            _apply(records, user_id, exercise_id, record_type, value,
+                   exercise_set.id, session.id, session.start_time)
+
+
+def on_sets_added(user_id, session, sets_by_exercise):
+    """Update records for newly inserted sets of one session.
+
+    ``sets_by_exercise`` maps exercise_id -> list of flushed ExerciseSet rows.
+    Existing records for all touched exercises are loaded in one query.
+    """
+    if not sets_by_exercise:
+        return
+    records_by_exercise = {exercise_id: {} for exercise_id in sets_by_exercise}
+    existing = PersonalRecord.query.filter(
+        PersonalRecord.user_id == user_id,
+        PersonalRecord.exercise_id.in_(list(sets_by_exercise))
+    ).all()
+    for record in existing:
+        records_by_exercise[record.exercise_id][record.record_type] = record
+    for exercise_id, sets in sets_by_exercise.items():
+        for exercise_set in sets:
+            _consider(records_by_exercise[exercise_id], user_id, exercise_id, exercise_set, session)
+
+
+def on_sets_deleted(user_id, exercise_id, set_ids):
+    """Recompute the exercise's records if any deleted set held one (call after flushing the delete)"""
+    set_ids = list(set_ids)
+    if not set_ids:
+        return
+    holds_record = db.session.query(PersonalRecord.id).filter(
+        PersonalRecord.user_id == user_id,
+        PersonalRecord.exercise_id == exercise_id,
+        PersonalRecord.exercise_set_id.in_(set_ids)
+    ).first()
+    if holds_record:
+        rebuild_exercise(user_id, exercise_id)
+
+
+def _fold(best, set_id, reps, weight, set_type, session_id, start_time):
+    """Fold one set into a record-type -> (value, set_id, session_id, start_time) map"""
+    for record_type, value in set_metrics(reps, weight, set_type).items():
+        current = best.get(record_type)
+        if current is None or _beats(value, start_time, set_id, current[0], current[3], current[1]):
+            best[record_type] = (value, set_id, session_id, start_time)
+
+
+def _set_rows_select():
+    return (
+        select(
+            ExerciseSet.id, ExerciseSet.reps, ExerciseSet.weight, ExerciseSet.set_type,
+            WorkoutSession.id, WorkoutSession.start_time
+        )
+        .join(WorkoutExercise, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .join(WorkoutSession, WorkoutExercise.session_id == WorkoutSession.id)
+        .order_by(WorkoutSession.start_time, ExerciseSet.id)
+    )
+
+
+def rebuild_exercise(user_id, exercise_id):
+    """Recompute all record types for one (user, exercise) from its sets"""
+    rows = db.session.execute(
+        _set_rows_select().where(WorkoutSession.user_id == user_id, WorkoutExercise.exercise_id == exercise_id)
+    )
+    best = {}
+    for row in rows:
+        _fold(best, *row)
+    records = _load_records(user_id, exercise_id)
+    for record_type, record in list(records.items()):
+        if record_type not in best:
+            db.session.delete(record)
+            del records[record_type]
+    for record_type, (value, set_id, session_id, start_time) in best.items():
+        _apply(records, user_id, exercise_id, record_type, value, set_id, session_id, start_time)
+
+
+def rebuild_all(user_id=None, batch_size=5000):
+    """Recompute every personal record (optionally for one user) in a single streamed pass.
+
+    Returns the number of record rows written. The caller commits.
+    """
+    stmt = (
+        _set_rows_select()
+        .add_columns(WorkoutSession.user_id, WorkoutExercise.exercise_id)
+        .execution_options(yield_per=batch_size)
+    )
+    if user_id is not None:
+        stmt = stmt.where(WorkoutSession.user_id == user_id)
+
+    best_by_key = {}
+    for row in db.session.execute(stmt):
+        _fold(best_by_key.setdefault((row[6], row[7]), {}), *row[:6])
+
+    delete = db.delete(PersonalRecord)
+    if user_id is not None:
+        delete = delete.where(PersonalRecord.user_id == user_id)
+    db.session.execute(delete)
+
+    values = []
+    for (uid, exercise_id), best in best_by_key.items():
+        for record_type, (value, set_id, session_id, start_time) in best.items():
+            values.append({
+                'user_id': uid, 'exercise_id': exercise_id, 'record_type': record_type,
+                'value': value, 'achieved_date': start_time, 'workout_session_id': session_id,
+                'exercise_set_id': set_id,
+            })
+    if values:
+        db.session.execute(db.insert(PersonalRecord), values)
+    return len(values)
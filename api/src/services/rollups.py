@@ -0,0 +1,240 @@
+"""Daily and weekly training-volume rollups.
+
+``TrainingRollup`` holds one row per (user, period bucket, scope key) so
+analytics read a handful of pre-aggregated rows instead of scanning a user's
+whole set history.
+
+Maintenance is incremental at week granularity: write paths call ``mark``
+with the workout's start time, and a ``before_commit`` hook recomputes only
+the marked (user, week) buckets - one grouped query over that week's sets,
+then delete + insert of its day/week rows. A workout never changes its
+start_time, so a set only ever affects the week it was logged in.
+
+``rebuild_all`` recomputes everything for backfills
+(see ``src/scripts/rebuild_training_rollups.py``).
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, event, func, select
+
+from src.models.user import db
+from src.models.exercise import Exercise, WorkoutSession, WorkoutExercise, ExerciseSet, TrainingRollup
+
+PERIODS = ('day', 'week')
+SCOPES = ('total', 'muscle_group', 'exercise')
+EXCLUDED_SET_TYPES = ('warmup',)
+
+_PENDING = 'rollup_weeks'
+
+
+def week_start(day):
+    """Monday of the ISO week containing ``day``"""
+    return day - timedelta(days=day.weekday())
+
+
+def mark(user_id, start_time):
+    """Schedule the bucket of a workout starting at ``start_time`` for recompute on commit"""
+    if user_id is None or start_time is None:
+        return
+    db.session.info.setdefault(_PENDING, set()).add((user_id, week_start(start_time.date())))
+
+
+def mark_workout(session):
+    """``mark`` for a WorkoutSession whose sets were written or deleted"""
+    mark(session.user_id, session.start_time)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _apply_pending(session):
+    pending = session.info.pop(_PENDING, None)
+    for user_id, week in sorted(pending or ()):
+        recompute_week(user_id, week)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def _grouped_select():
+    """Per (session, exercise) sums; finer than any bucket so all levels can be derived"""
+    working = func.coalesce(ExerciseSet.set_type, 'normal').notin_(EXCLUDED_SET_TYPES)
+    load = func.coalesce(ExerciseSet.weight, 0) * func.coalesce(ExerciseSet.reps, 0)
+    return (
+        select(
+            WorkoutSession.user_id,
+            WorkoutSession.id,
+            WorkoutSession.start_time,
+            WorkoutExercise.exercise_id,
+            Exercise.muscle_group,
+            func.sum(case((working, load), else_=0)),
+            func.sum(load),
+            func.sum(case((working, 1), else_=0)),
+            func.sum(case((working, func.coalesce(ExerciseSet.reps, 0)), else_=0)),
+        )
+        .select_from(ExerciseSet)
+        .join(WorkoutExercise, ExerciseSet.workout_exercise_id == WorkoutExercise.id)
+        .join(WorkoutSession, WorkoutExercise.session_id == WorkoutSession.id)
+        .join(Exercise, WorkoutExercise.exercise_id == Exercise.id)
+        .group_by(
+            WorkoutSession.user_id, WorkoutSession.id, WorkoutSession.start_time,
+            WorkoutExercise.exercise_id, Exercise.muscle_group
+        )
+    )
+
+
+def _aggregate(rows):
+    """Fold grouped rows into rollup buckets.
+
+    Returns {(user_id, period, period_start, scope, exercise_id, muscle_group):
+    [volume, tonnage, sets, reps, session_ids]}.
+    """
+    buckets = {}
+    for user_id, session_id, start_time, exercise_id, muscle_group, volume, tonnage, sets, reps in rows:
+        day = start_time.date()
+        muscle_group = (muscle_group or 'other').strip().lower()
+        for period, period_start in (('day', day), ('week', week_start(day))):
+            for scope, key_exercise, key_group in (
+                ('exercise', exercise_id, muscle_group),
+                ('muscle_group', None, muscle_group),
+                ('total', None, None),
+            ):
+                bucket = buckets.get((user_id, period, period_start, scope, key_exercise, key_group))
+                if bucket is None:
+                    bucket = buckets[(user_id, period, period_start, scope, key_exercise, key_group)] = [0.0, 0.0, 0, 0, set()]
+                bucket[0] += float(volume or 0)
+                bucket[1] += float(tonnage or 0)
+                bucket[2] += int(sets or 0)
+                bucket[3] += int(reps or 0)
+                bucket[4].add(session_id)
+    return buckets
+
+
+def _insert(buckets, conn=None):
+    values = [
+        {
+            'user_id': user_id, 'period': period, 'period_start': period_start, 'scope': scope,
+            'exercise_id': exercise_id, 'muscle_group': muscle_group,
+            'volume': volume, 'tonnage': tonnage, 'sets': sets, 'reps': reps,
+            'session_count': len(session_ids),
+        }
+        for (user_id, period, period_start, scope, exercise_id, muscle_group), (volume, tonnage, sets, reps, session_ids)
+        in buckets.items()
+    ]
+    if values:
+        # render_nulls keeps rows with and without exercise_id in one executemany
+        insert = db.insert(TrainingRollup).execution_options(render_nulls=True)
+        (conn if conn is not None else db.session).execute(insert, values)
+    return len(values)
+
+
+def recompute_week(user_id, week):
+    """Rebuild all day/week rows of one user's week from its sets"""
+    start = datetime.combine(week, datetime.min.time())
+    rows = db.session.execute(
+        _grouped_select().where(
+            WorkoutSession.user_id == user_id,
+            WorkoutSession.start_time >= start,
+            WorkoutSession.start_time < start + timedelta(days=7)
+        )
+    ).all()
+    db.session.execute(
+        db.delete(TrainingRollup).where(
+            TrainingRollup.user_id == user_id,
+            TrainingRollup.period_start >= week,
+            TrainingRollup.period_start < week + timedelta(days=7)
+        )
+    )
+    _insert(_aggregate(rows))
+
+
+def rebuild_all(user_id=None, batch_size=5000, conn=None):
+    """Recompute every rollup (optionally for one user). Returns rows written; the caller commits.
+
+    ``conn`` lets migrations run the backfill inside their own transaction.
+    """
+    executor = conn if conn is not None else db.session
+    stmt = _grouped_select().execution_options(yield_per=batch_size)
+    if user_id is not None:
+        stmt = stmt.where(WorkoutSession.user_id == user_id)
+    buckets = _aggregate(executor.execute(stmt))
+
+    delete = db.delete(TrainingRollup)
+    if user_id is not None:
+        delete = delete.where(TrainingRollup.user_id == user_id)
+    executor.execute(delete)
+    return _insert(buckets, conn)
+
+
+def _key_columns(scope):
+    if scope == 'exercise':
+        return [TrainingRollup.exercise_id, TrainingRollup.muscle_group]
+    if scope == 'muscle_group':
+        return [TrainingRollup.muscle_group]
+    return []
+
+
+def series(user_id, period, scope, start, end, exercise_id=None, muscle_group=None):
+    """Rollup rows for [start, end] in period order"""
+    query = TrainingRollup.query.filter(
+        TrainingRollup.user_id == user_id,
+        TrainingRollup.period == period,
+        TrainingRollup.scope == scope,
+        TrainingRollup.period_start >= start,
+        TrainingRollup.period_start <= end
+    )
+    if exercise_id is not None:
+        query = query.filter(TrainingRollup.exercise_id == exercise_id)
+    if muscle_group:
+        query = query.filter(TrainingRollup.muscle_group == muscle_group.strip().lower())
+    return query.order_by(TrainingRollup.period_start, *_key_columns(scope)).all()
+
+
+def summary(user_id, scope, start, end):
+    """Totals over [start, end] per scope key, aggregated in SQL from the daily rows"""
+    keys = _key_columns(scope)
+    rows = (
+        db.session.query(
+            *keys,
+            func.sum(TrainingRollup.volume),
+            func.sum(TrainingRollup.tonnage),
+            func.sum(TrainingRollup.sets),
+            func.sum(TrainingRollup.reps),
+            func.sum(TrainingRollup.session_count),
+            func.count(TrainingRollup.id),
+        )
+        .filter(
+            TrainingRollup.user_id == user_id,
+            TrainingRollup.period == 'day',
+            TrainingRollup.scope == scope,
+            TrainingRollup.period_start >= start,
+            TrainingRollup.period_start <= end
+        )
+        .group_by(*keys)
+        .order_by(func.sum(TrainingRollup.volume).desc())
+        .all()
+    )
+    result = []
+    for row in rows:
+        if not row[-1]:
+            continue  # 'total' has no GROUP BY keys, so an empty range still yields one row
+        key = dict(zip([column.key for column in keys], row[:len(keys)]))
+        volume, tonnage, sets, reps, sessions, active_days = row[len(keys):]
+        key.update({
+            'volume': float(volume or 0),
+            'tonnage': float(tonnage or 0),
+            'sets': int(sets or 0),
+            'reps': int(reps or 0),
+            # Every session falls on exactly one day, so daily counts add up
+            'session_count': int(sessions or 0),
+            'active_days': int(active_days or 0),
+        })
+        result.append(key)
+    return result
+
+
+def parse_date(value, default):
+    """ISO date query parameter; raises ValueError if malformed"""
+    if not value:
+        return default
+    return date.fromisoformat(value[:10])
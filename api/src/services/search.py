@@ -0,0 +1,148 @@
+"""Ranked, typo-tolerant exercise search over the catalog snapshot.
+
+A trigram inverted index is built once per catalog snapshot version over the
+exercise name, muscle group and description. Queries score documents by the
+fraction of query trigrams found in each field (so "bnech press" still finds
+"Bench Press"), with boosts for exact and prefix name matches. A sorted token
+list backs the prefix ``suggest`` lookup used by the exercise picker.
+
+The index is backend-agnostic on purpose: the catalog is already held in
+memory (see ``src.services.catalog``), so SQLite and Postgres deployments get
+identical ranking without FTS5 / pg_trgm schema differences.
+"""
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+# Field weights: a hit in the name matters far more than one in the description
+FIELDS = (('name', 3.0), ('muscle_group', 1.5), ('description', 0.5))
+# Minimum fraction of query trigrams a field must contain to make a row a candidate
+MIN_CONTAINMENT = {'name': 0.3, 'muscle_group': 0.5, 'description': 0.85}
+# Drop candidates scoring below this fraction of the best match
+RELATIVE_CUTOFF = 0.3
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_build_lock = threading.Lock()
+
+
+def normalize(text):
+    return _NON_ALNUM.sub(' ', (text or '').lower()).strip()
+
+
+def trigrams(text):
+    grams = set()
+    for token in normalize(text).split():
+        padded = f'  {token} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    def __init__(self, rows):
+        self.rows = rows
+        self.names = [normalize(row['name']) for row in rows]
+        self.name_tokens = [set(name.split()) for name in self.names]
+        self.field_sizes = []
+        # trigram -> list of (doc index, field index)
+        self.postings = defaultdict(list)
+        for doc, row in enumerate(rows):
+            sizes = []
+            for field_idx, (field, _) in enumerate(FIELDS):
+                grams = trigrams(row.get(field))
+                sizes.append(len(grams))
+                for gram in grams:
+                    self.postings[gram].append((doc, field_idx))
+            self.field_sizes.append(sizes)
+        # Sorted (token, doc) pairs for prefix lookups, plus whole names
+        prefixes = set()
+        for doc, name in enumerate(self.names):
+            prefixes.add((name, doc))
+            prefixes.update((token, doc) for token in self.name_tokens[doc])
+        self.prefixes = sorted(prefixes)
+
+    def search(self, query, limit=None):
+        """Return catalog rows ranked by relevance to ``query``"""
+        query_norm = normalize(query)
+        query_grams = trigrams(query_norm)
+        if not query_grams:
+            return []
+
+        hits = defaultdict(lambda: [0] * len(FIELDS))
+        for gram in query_grams:
+            for doc, field_idx in self.postings.get(gram, ()):
+                hits[doc][field_idx] += 1
+
+        query_tokens = query_norm.split()
+        scored = []
+        for doc, field_hits in hits.items():
+            score = 0.0
+            candidate = False
+            for field_idx, (field, weight) in enumerate(FIELDS):
+                containment = field_hits[field_idx] / len(query_grams)
+                if containment >= MIN_CONTAINMENT[field]:
+                    candidate = True
+                elif field != 'name':
+                    # Weak partial overlap with long text is noise, not signal
+                    continue
+                if field == 'name':
+                    # Blend in Dice similarity so closer-length names rank first
+                    size = self.field_sizes[doc][field_idx]
+                    dice = 2 * field_hits[field_idx] / (len(query_grams) + size) if size else 0.0
+                    score += weight * (0.7 * containment + 0.3 * dice)
+                else:
+                    score += weight * containment
+            if not candidate:
+                continue
+            name = self.names[doc]
+            if name == query_norm:
+                score += 5.0
+            elif name.startswith(query_norm):
+                score += 2.0
+            score += sum(1 for token in query_tokens if token in name) / len(query_tokens)
+            scored.append((-score, name, doc))
+
+        scored.sort()
+        if scored:
+            floor = -scored[0][0] * RELATIVE_CUTOFF
+            scored = [entry for entry in scored if -entry[0] >= floor]
+        if limit is not None:
+            scored = scored[:limit]
+        return [self.rows[doc] for _, _, doc in scored]
+
+    def suggest(self, prefix, limit=10):
+        """Return rows whose name (or a word in it) starts with ``prefix``.
+
+        Earlier words in a multi-word prefix must appear as whole words in the
+        name, e.g. "bench pr" matches "Incline Bench Press".
+        """
+        tokens = normalize(prefix).split()
+        if not tokens:
+            return []
+        head, last = tokens[:-1], tokens[-1]
+        whole = ' '.join(tokens)
+
+        matches = {}
+        for key in (whole, last):
+            start = bisect.bisect_left(self.prefixes, (key, -1))
+            for token, doc in self.prefixes[start:]:
+                if not token.startswith(key):
+                    break
+                if doc in matches or not all(t in self.name_tokens[doc] for t in head):
+                    continue
+                # Names that start with the typed text rank before inner-word matches
+                matches[doc] = (0 if self.names[doc].startswith(whole) else 1, len(self.names[doc]), self.names[doc])
+        ranked = sorted(matches, key=matches.get)[:limit]
+        return [self.rows[doc] for doc in ranked]
+
+
+def get_index(snapshot):
+    """Search index for a catalog snapshot, built lazily once per snapshot"""
+    index = getattr(snapshot, 'search_index', None)
+    if index is None:
+        with _build_lock:
+            index = getattr(snapshot, 'search_index', None)
+            if index is None:
+                index = SearchIndex(snapshot.rows)
+                snapshot.search_index = index
+    return index
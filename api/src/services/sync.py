@@ -0,0 +1,141 @@
+"""Change feed for offline-first clients.
+
+Every synced row carries ``updated_at`` (set on insert and on every ORM
+update). Deletions of synced rows are captured by a ``before_flush`` hook as
+``SyncTombstone`` rows. ``changes_since`` returns only what changed after a
+cursor, so a reconnecting client pays for the delta rather than its history.
+
+Cursors are server timestamps. Each query re-reads ``OVERLAP`` before the
+cursor so rows committed slightly out of timestamp order (concurrent
+transactions, small clock differences between workers) are not missed;
+clients apply the feed idempotently by id.
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from src.models.user import db
+from src.models.exercise import Exercise, WorkoutSession, WorkoutExercise, ExerciseSet, SyncTombstone
+
+OVERLAP = timedelta(seconds=float(os.environ.get('SYNC_OVERLAP_SECONDS') or 5))
+# Tombstones older than this may be pruned; older cursors get a full reset
+TOMBSTONE_RETENTION = timedelta(days=int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS') or 90))
+
+ENTITY_TYPES = {
+    WorkoutSession: 'workout_session',
+    WorkoutExercise: 'workout_exercise',
+    ExerciseSet: 'exercise_set',
+    Exercise: 'exercise',
+}
+
+
+def _owner(obj):
+    """User id owning a synced row (None for catalog exercises)"""
+    if isinstance(obj, WorkoutSession):
+        return obj.user_id
+    if isinstance(obj, WorkoutExercise):
+        return obj.session.user_id if obj.session else None
+    if isinstance(obj, ExerciseSet):
+        we = obj.workout_exercise
+        return we.session.user_id if we is not None and we.session else None
+    if isinstance(obj, Exercise):
+        return obj.created_by
+    return None
+
+
+@event.listens_for(db.session, 'before_flush')
+def _record_tombstones(session, flush_context, instances):
+    with session.no_autoflush:
+        for obj in list(session.deleted):
+            entity_type = ENTITY_TYPES.get(type(obj))
+            if entity_type is None or obj.id is None:
+                continue
+            user_id = _owner(obj)
+            if user_id is None:
+                continue
+            session.add(SyncTombstone(user_id=user_id, entity_type=entity_type, entity_id=obj.id))
+
+
+def encode_cursor(moment):
+    return moment.isoformat()
+
+
+def decode_cursor(cursor):
+    """Parse a cursor; raises ValueError if malformed"""
+    return datetime.fromisoformat(cursor)
+
+
+def _session_row(session):
+    return {
+        'id': session.id,
+        'user_id': session.user_id,
+        'name': session.name,
+        'start_time': session.start_time.isoformat() if session.start_time else None,
+        'end_time': session.end_time.isoformat() if session.end_time else None,
+        'notes': session.notes,
+        'updated_at': session.updated_at.isoformat() if session.updated_at else None
+    }
+
+
+def _workout_exercise_row(we):
+    return {
+        'id': we.id,
+        'session_id': we.session_id,
+        'exercise_id': we.exercise_id,
+        'order_in_workout': we.order_in_workout,
+        'sort_key': we.sort_key,
+        'updated_at': we.updated_at.isoformat() if we.updated_at else None
+    }
+
+
+def _with_updated_at(obj):
+    row = obj.to_dict()
+    row['updated_at'] = obj.updated_at.isoformat() if obj.updated_at else None
+    return row
+
+
+def changes_since(user_id, since=None):
+    """Rows changed (and ids deleted) for ``user_id`` after ``since``; None means everything"""
+    now = datetime.utcnow()
+    reset = since is not None and since < now - TOMBSTONE_RETENTION
+    if reset:
+        since = None
+    floor = since - OVERLAP if since is not None else None
+
+    def changed(query, column):
+        return query.filter(column > floor) if floor is not None else query
+
+    sessions = changed(WorkoutSession.query.filter(WorkoutSession.user_id == user_id), WorkoutSession.updated_at)
+    workout_exercises = changed(
+        WorkoutExercise.query.join(WorkoutSession).filter(WorkoutSession.user_id == user_id),
+        WorkoutExercise.updated_at
+    )
+    sets = changed(
+        ExerciseSet.query.join(WorkoutExercise).join(WorkoutSession).filter(WorkoutSession.user_id == user_id),
+        ExerciseSet.updated_at
+    )
+    exercises = changed(Exercise.query.filter(Exercise.created_by == user_id), Exercise.updated_at)
+
+    deleted = {entity_type: [] for entity_type in ENTITY_TYPES.values()}
+    if floor is not None:
+        tombstones = SyncTombstone.query.filter(SyncTombstone.user_id == user_id, SyncTombstone.deleted_at > floor)
+        for tombstone in tombstones:
+            deleted[tombstone.entity_type].append(tombstone.entity_id)
+
+    return {
+        'cursor': encode_cursor(now),
+        'reset': since is None,
+        'workout_sessions': [_session_row(s) for s in sessions.order_by(WorkoutSession.id)],
+        'workout_exercises': [_workout_exercise_row(we) for we in workout_exercises.order_by(WorkoutExercise.id)],
+        'exercise_sets': [_with_updated_at(s) for s in sets.order_by(ExerciseSet.id)],
+        'exercises': [_with_updated_at(e) for e in exercises.order_by(Exercise.id)],
+        'deleted': deleted
+    }
+
+
+def prune_tombstones(older_than=None):
+    """Delete tombstones past the retention window; returns the number removed. Caller commits."""
+    cutoff = datetime.utcnow() - (older_than or TOMBSTONE_RETENTION)
+    result = db.session.execute(db.delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff))
+    return result.rowcount
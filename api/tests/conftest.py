@@ -0,0 +1,62 @@
+"""Shared fixtures: one app per test session on a throwaway SQLite database.
+
+``src.main`` builds its app at import time from the environment, so the
+environment is prepared here before anything under ``src`` is imported.
+Set ``TEST_POSTGRES_URL`` to also run the Postgres variants of the tests
+that support them; they are skipped otherwise.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix='mgg-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'app.db')}"
+os.environ['MEDIA_ROOT'] = os.path.join(WORKDIR, 'media')
+os.environ['BOOTSTRAP_MODE'] = 'eager'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+# Tests log in and write in quick succession from one address
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+# Cheap hashes; the cost itself is not under test
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+os.environ.pop('POSTGRES_URL', None)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    token = client.post('/api/login', json={'username': 'melanie', 'password': '1234'}).get_json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture(scope='session')
+def postgres_engine(app):
+    """Engine on TEST_POSTGRES_URL with the app's schema and migrations applied"""
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL not set')
+    from sqlalchemy import create_engine
+    from src.migrations import runner
+    from src.models.user import db
+    import src.models.exercise  # noqa: F401
+    import src.models.media  # noqa: F401
+
+    engine = create_engine(url.replace('postgres://', 'postgresql://', 1))
+    db.metadata.create_all(engine)
+    runner.upgrade(engine)
+    yield engine
+    engine.dispose()
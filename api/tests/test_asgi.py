@@ -0,0 +1,44 @@
+"""ASGI mode (src/asgi.py) serves requests and exits cleanly once its lifespan ends."""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('a2wsgi')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('httpx')
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = textwrap.dedent('''
+    import asyncio
+    import httpx
+    from src import asgi
+
+    async def main():
+        # httpx's transport sends no lifespan events; run the app's lifespan as the server would
+        async with asgi.lifespan(asgi.async_app):
+            transport = httpx.ASGITransport(app=asgi.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                assert (await client.get('/api/exercises')).status_code == 200
+                assert (await client.post('/api/login', json={'username': 'melanie', 'password': '1234'})).status_code == 200
+
+    asyncio.run(main())
+''')
+
+
+def test_exits_after_lifespan(tmp_path):
+    env = {
+        **os.environ,
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmp_path, 'app.db')}",
+        'MEDIA_ROOT': os.path.join(tmp_path, 'media'),
+        'PYTHONPATH': API_DIR,
+    }
+    # A pooled aiosqlite connection left open by the lifespan would block interpreter exit
+    result = subprocess.run([sys.executable, '-W', 'default', '-c', SCRIPT], cwd=API_DIR, env=env,
+                            capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    assert 'starlette.middleware.wsgi' not in result.stderr
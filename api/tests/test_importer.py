@@ -0,0 +1,28 @@
+"""Free Exercise DB importer: each entry counts as inserted, updated or skipped, once."""
+from src.models.exercise import Exercise
+from src.models.user import db
+
+
+def test_dry_run_counts_each_entry_once(app):
+    from src.scripts.import_free_exercise_db import import_exercises
+
+    with app.app_context():
+        db.session.add_all([
+            Exercise(name='Importer Probe Missing Level', muscle_group='Legs'),
+            Exercise(name='Importer Probe Has Level', muscle_group='Legs', difficulty='advanced'),
+        ])
+        db.session.flush()
+        try:
+            summary = import_exercises([
+                {'name': 'Importer Probe Missing Level', 'level': 'beginner'},
+                {'name': 'Importer Probe Missing Level', 'level': 'beginner'},
+                {'name': 'Importer Probe Has Level', 'level': 'beginner'},
+                {'name': 'Importer Probe New', 'level': 'beginner', 'primaryMuscles': ['quadriceps']},
+            ], dry_run=True)
+        finally:
+            db.session.rollback()
+
+    assert summary['inserted_names'] == ['Importer Probe New']
+    assert summary['updated_names'] == ['Importer Probe Missing Level']
+    assert summary['skipped_names'] == ['Importer Probe Missing Level', 'Importer Probe Has Level']
+    assert (summary['inserted'], summary['updated_difficulty'], summary['skipped_dupe']) == (1, 1, 2)
@@ -0,0 +1,41 @@
+"""Profile picture uploads: thumbnails at upload time and bounded request bodies."""
+import io
+
+from PIL import Image
+
+
+def _png(width=400, height=300):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(out, format='PNG')
+    return out.getvalue()
+
+
+def test_upload_displays_thumbnail(client, auth_headers):
+    response = client.put('/api/me/profile-picture', headers=auth_headers, data=_png())
+    assert response.status_code == 200
+    url = response.get_json()['profile_picture']
+    assert url.endswith('_256.jpg')
+
+    thumbnail = client.get(url[url.index('/api/'):])
+    with Image.open(io.BytesIO(thumbnail.data)) as image:
+        assert image.size == (256, 256)
+
+
+def test_oversized_upload_is_refused_before_reading(client, auth_headers):
+    body = b'\x89PNG\r\n\x1a\n' + bytes(8 * 1024 * 1024)
+    response = client.put('/api/me/profile-picture', headers=auth_headers, data=body)
+    assert response.status_code == 413
+    assert 'message' in response.get_json()
+
+
+def test_database_backend_put_ignores_an_existing_key(app):
+    from src.models.user import db
+    from src.services import media
+
+    backend = media.DatabaseBackend()
+    with app.app_context():
+        # Same content key twice, as two concurrent uploads of identical bytes would write it
+        backend.put('avatars/same.jpg', b'first', 'image/jpeg')
+        backend.put('avatars/same.jpg', b'first', 'image/jpeg')
+        db.session.commit()
+        assert backend.get('avatars/same.jpg') == b'first'
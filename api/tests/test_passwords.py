@@ -0,0 +1,22 @@
+"""Password hashing sheds load with 503 + Retry-After once the executor is saturated."""
+from src.services import passwords
+
+
+def test_saturated_hashing_returns_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(passwords, 'MAX_PENDING', 0)
+    rejected = passwords.REJECTED._values.get((), 0)
+
+    for path, body in (('/api/login', {'username': 'melanie', 'password': '1234'}),
+                       ('/api/register', {'username': 'busy-signup', 'password': 'secret', 'email': 'busy@example.com'})):
+        response = client.post(path, json=body)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(passwords.RETRY_AFTER_SECONDS)
+        assert 'message' in response.get_json()
+
+    assert passwords.REJECTED._values.get((), 0) == rejected + 2
+
+
+def test_login_succeeds_within_limit(client):
+    response = client.post('/api/login', json={'username': 'melanie', 'password': '1234'})
+    assert response.status_code == 200
+    assert passwords._pending == 0
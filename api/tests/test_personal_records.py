@@ -0,0 +1,89 @@
+"""Personal records: migration backfill and one tie rule for incremental writes and rebuilds."""
+import os
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select, text
+
+from src.migrations import runner
+from src.models.exercise import PersonalRecord, WorkoutSession, WorkoutExercise, ExerciseSet
+from src.models.user import User, db
+
+
+def _holders(rows):
+    return {row.record_type: (row.value, row.exercise_set_id) for row in rows}
+
+
+def test_migration_backfills_records(app, tmp_path, capsys):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'upgrade.db')}")
+    db.metadata.create_all(engine)
+    runner.upgrade(engine, log=lambda message: None)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': 1, 'username': 'lifter', 'password_hash': 'x'}])
+        conn.execute(text("INSERT INTO exercise (id, name, muscle_group) VALUES (1, 'Squats', 'Legs')"))
+        conn.execute(insert(WorkoutSession), [
+            {'id': 1, 'user_id': 1, 'start_time': datetime(2025, 1, 1, 10)},
+            {'id': 2, 'user_id': 1, 'start_time': datetime(2025, 2, 1, 10)},
+        ])
+        conn.execute(insert(WorkoutExercise), [
+            {'id': 1, 'session_id': 1, 'exercise_id': 1, 'order_in_workout': 1},
+            {'id': 2, 'session_id': 2, 'exercise_id': 1, 'order_in_workout': 1},
+        ])
+        conn.execute(insert(ExerciseSet), [
+            {'id': 1, 'workout_exercise_id': 1, 'set_number': 1, 'reps': 5, 'weight': 100, 'set_type': 'normal'},
+            {'id': 2, 'workout_exercise_id': 2, 'set_number': 1, 'reps': 8, 'weight': 100, 'set_type': 'normal'},
+            {'id': 3, 'workout_exercise_id': 2, 'set_number': 2, 'reps': 3, 'weight': 140, 'set_type': 'warmup'},
+        ])
+        # A database from before v0002: duplicate, holder-less rows and no unique index
+        conn.execute(text('DROP INDEX uq_personal_record_user_exercise_type'))
+        conn.execute(text('DELETE FROM schema_migrations WHERE version = 2'))
+        conn.execute(insert(PersonalRecord), [
+            {'user_id': 1, 'exercise_id': 1, 'record_type': 'max_weight', 'value': value,
+             'achieved_date': datetime(2024, 1, 1)} for value in (90, 95)
+        ])
+
+    capsys.readouterr()
+    messages = []
+    assert runner.upgrade(engine, log=messages.append) == [2]
+    # Progress goes to the runner's log, not stdout
+    assert messages[0] == '  backfilled 4 personal records'
+    assert capsys.readouterr().out == ''
+    with engine.connect() as conn:
+        records = _holders(conn.execute(select(PersonalRecord)))
+    engine.dispose()
+    assert records == {
+        'max_weight': (100.0, 1),  # tie with set 2: the earlier workout holds it; warm-ups never count
+        'max_reps': (8.0, 2),
+        'max_volume': (800.0, 2),
+        'estimated_1rm': (100.0 * (1 + 8 / 30.0), 2),
+    }
+
+
+def test_ties_go_to_earliest_on_incremental_and_rebuild(app, client):
+    from src.services import records
+
+    client.post('/api/register', json={'username': 'tie-breaker', 'password': 'secret', 'email': 'tie@example.com'})
+    token = client.post('/api/login', json={'username': 'tie-breaker', 'password': 'secret'}).get_json()['access_token']
+    auth = {'Authorization': f'Bearer {token}'}
+    user_id = client.get('/api/me', headers=auth).get_json()['id']
+
+    def log_workout(day):
+        response = client.post('/api/workouts:bulk', headers=auth, json={
+            'name': day, 'start_time': f'{day}T10:00:00', 'end_time': f'{day}T11:00:00',
+            'exercises': [{'exercise_id': 1, 'sets': [{'reps': 5, 'weight': 100}]}],
+        })
+        assert response.status_code == 201, response.get_data(as_text=True)
+        return response.get_json()['exercises'][0]['sets'][0]['id']
+
+    log_workout('2026-02-01')
+    # Logged later but performed earlier (e.g. an offline client catching up)
+    earliest_set = log_workout('2026-01-01')
+
+    with app.app_context():
+        query = PersonalRecord.query.filter_by(user_id=user_id, exercise_id=1)
+        incremental = _holders(query.all())
+        records.rebuild_all(user_id=user_id)
+        db.session.commit()
+        rebuilt = _holders(query.all())
+
+    assert incremental == rebuilt
+    assert {set_id for _, set_id in rebuilt.values()} == {earliest_set}
@@ -0,0 +1,11 @@
+"""Every API route stays within its SQL statement budget (src/query_budget.py).
+
+Runs the same scenario as ``python src/scripts/check_query_budgets.py``.
+"""
+from src.scripts.check_query_budgets import collect
+
+
+def test_routes_within_query_budgets(app):
+    results = collect(app)
+    failures = [f'{label}: {count} / {max_queries}\n{error}' for label, count, max_queries, error in results if error]
+    assert not failures, '\n\n'.join(failures)
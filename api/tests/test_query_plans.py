@@ -0,0 +1,100 @@
+"""The hot queries use the indexes added for them (src/migrations/plans.py).
+
+On SQLite the plans are taken on a small populated database after
+``ANALYZE``: on empty, unanalyzed tables the planner picks arbitrarily
+between indexes that look equally good (e.g. the two on workout_session).
+On Postgres ``plans.explain`` disables sequential scans instead.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+
+from src.migrations import plans
+from src.models.exercise import Exercise
+
+SINCE = datetime(2026, 1, 1)
+USERS = 5
+WORKOUTS_PER_USER = 60
+EXERCISES = 40
+
+
+def _statements():
+    """name -> (statement as the app builds it, index expected in its plan)"""
+    from src.services import history
+    return {
+        'history_first_page': (history.page_statement(1, 20, None), 'ix_workout_session_user_start'),
+        'history_keyset_page': (history.page_statement(1, 20, (SINCE, 42)), 'ix_workout_session_user_start'),
+        'history_summary_counts': (history.counts_statement([1, 2, 3]), 'ix_workout_exercise_session'),
+        'active_workout': (history.active_statement(1), 'ix_workout_session_active'),
+        'catalog_by_name': (select(Exercise).where(Exercise.name == 'Bench Press'), 'ix_exercise_name'),
+        'catalog_custom_since': (
+            select(Exercise).where(Exercise.created_by == 1, Exercise.updated_at > SINCE),
+            'ix_exercise_created_by_updated',
+        ),
+    }
+
+
+def _populate(conn):
+    from src.models.user import User
+    from src.models.exercise import WorkoutSession, WorkoutExercise, ExerciseSet
+
+    conn.execute(insert(User), [
+        {'id': user_id, 'username': f'plan{user_id}', 'password_hash': 'x'} for user_id in range(1, USERS + 1)
+    ])
+    conn.execute(insert(Exercise), [
+        {'id': exercise_id, 'name': f'Exercise {exercise_id}', 'muscle_group': 'Legs', 'updated_at': SINCE,
+         'created_by': 1 + exercise_id % USERS if exercise_id % 4 == 0 else None}
+        for exercise_id in range(1, EXERCISES + 1)
+    ])
+    sessions, workout_exercises, sets = [], [], []
+    for user_id in range(1, USERS + 1):
+        for day in range(WORKOUTS_PER_USER):
+            start = SINCE - timedelta(days=day)
+            session_id = len(sessions) + 1
+            # Only the newest workout of each user is still in progress
+            sessions.append({'id': session_id, 'user_id': user_id, 'start_time': start,
+                             'end_time': start + timedelta(hours=1) if day else None})
+            for order in range(3):
+                we_id = len(workout_exercises) + 1
+                workout_exercises.append({'id': we_id, 'session_id': session_id,
+                                          'exercise_id': 1 + (day + order) % EXERCISES, 'order_in_workout': order})
+                sets.extend({'workout_exercise_id': we_id, 'set_number': number, 'reps': 5} for number in range(3))
+    conn.execute(insert(WorkoutSession), sessions)
+    conn.execute(insert(WorkoutExercise), workout_exercises)
+    conn.execute(insert(ExerciseSet), sets)
+    conn.execute(text('ANALYZE'))
+
+
+@pytest.fixture(scope='module')
+def sqlite_engine(app, tmp_path_factory):
+    from src.migrations import runner
+    from src.models.user import db
+
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path_factory.mktemp('plans'), 'plans.db')}")
+    db.metadata.create_all(engine)
+    runner.upgrade(engine)
+    with engine.begin() as conn:
+        _populate(conn)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def engine(request):
+    return request.getfixturevalue(f'{request.param}_engine')
+
+
+@pytest.mark.parametrize('name', sorted(_statements()))
+def test_app_statement_uses_index(engine, name):
+    statement, index_name = _statements()[name]
+    with engine.begin() as conn:
+        plans.assert_uses_index(conn, statement, index_name)
+
+
+@pytest.mark.parametrize('name', sorted(plans.HOT_QUERIES))
+def test_hot_query_uses_index(engine, name):
+    sql, params, index_name = plans.HOT_QUERIES[name]
+    with engine.begin() as conn:
+        plans.assert_uses_index(conn, sql, index_name, params)
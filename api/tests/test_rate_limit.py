@@ -0,0 +1,77 @@
+"""Login limits: per IP and username, with the client IP taken from the deployment's proxy."""
+import pytest
+
+from src import rate_limit
+from src.engine_profiles import EngineProfile
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'ENABLED', True)
+    monkeypatch.setattr(rate_limit, '_backend', rate_limit.MemoryBackend())
+
+
+def _login(client, username, address='203.0.113.7'):
+    return client.post('/api/login', json={'username': username, 'password': 'wrong'},
+                       environ_base={'REMOTE_ADDR': address})
+
+
+def test_everyone_behind_one_address_can_log_in_again(client, limited):
+    # A deploy logs everyone out; a gym full of members shares one NAT address
+    statuses = {_login(client, f'member{number}').status_code for number in range(40)}
+    assert statuses == {401}
+
+
+def test_guessing_one_account_is_throttled(client, limited):
+    burst = int(rate_limit.ACCOUNT_LIMITS['auth.login'].burst)
+    assert all(_login(client, 'melanie').status_code == 401 for _ in range(burst))
+    throttled = _login(client, 'melanie')
+    assert throttled.status_code == 429
+    assert int(throttled.headers['Retry-After']) >= 1
+    # Other accounts and other addresses are unaffected
+    assert _login(client, 'someone-else').status_code == 401
+    assert _login(client, 'melanie', address='198.51.100.9').status_code == 401
+
+
+def test_proxy_hops_follow_the_deployment(monkeypatch):
+    monkeypatch.delenv('RENDER', raising=False)
+    assert rate_limit.default_proxy_hops(EngineProfile('serverless', pool='null')) == 1
+    assert rate_limit.default_proxy_hops(EngineProfile('server')) == 0
+    monkeypatch.setenv('RENDER', 'true')
+    assert rate_limit.default_proxy_hops(EngineProfile('server')) == 1
+
+
+def test_ignored_forwarded_for_is_logged_once(app, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(rate_limit.logger, 'warning', lambda message, *args, **kwargs: warnings.append(message))
+    monkeypatch.setattr(rate_limit, '_proxy_hops', 0)
+    monkeypatch.setattr(rate_limit, '_forwarded_for_warned', False)
+
+    assert rate_limit.client_key(None, '10.0.0.1', '203.0.113.7') == 'ip:10.0.0.1'
+    assert rate_limit.client_key(None, '10.0.0.1', '198.51.100.9') == 'ip:10.0.0.1'
+    assert len(warnings) == 1 and 'TRUSTED_PROXY_HOPS' in warnings[0]
+
+    monkeypatch.setattr(rate_limit, '_proxy_hops', 1)
+    assert rate_limit.client_key(None, '10.0.0.1', '203.0.113.7') == 'ip:203.0.113.7'
+
+
+def test_memory_buckets_are_bounded_and_evicted_oldest_first(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'MEMORY_BUCKETS', 100)
+    monkeypatch.setattr(rate_limit, 'MEMORY_EVICT_BATCH', 10)
+    backend = rate_limit.MemoryBackend()
+    limit = rate_limit.Limit(0.01, 1)
+
+    backend.take('victim', limit)
+    for number in range(150):
+        backend.take(f'flood{number}', limit)
+        backend.take('victim', limit)  # recently used, so never evicted
+    assert len(backend._buckets) <= 100
+    assert 'victim' in backend._buckets and 'flood0' not in backend._buckets
+    assert backend.take('victim', limit) > 0
+
+
+def test_account_keys_do_not_grow_with_the_username(monkeypatch):
+    backend = rate_limit.MemoryBackend()
+    monkeypatch.setattr(rate_limit, '_backend', backend)
+    rate_limit.check_account('auth.login', 'ip:203.0.113.7', 'x' * 10000)
+    assert max(len(key) for key in backend._buckets) < 80
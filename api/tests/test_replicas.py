@@ -0,0 +1,56 @@
+"""Read-your-writes holds across app instances: the marker travels with the client."""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from src import replicas
+
+
+@pytest.fixture
+def replica_apps(app, tmp_path, monkeypatch):
+    """Two app instances on the shared primary, each routing reads to a replica that lacks new rows"""
+    from src.main import create_app
+    from src.migrations import runner
+    from src.models.user import db
+
+    # A replica that has not replayed anything written during the test
+    replica_url = f"sqlite:///{os.path.join(tmp_path, 'replica.db')}"
+    engine = create_engine(replica_url)
+    db.metadata.create_all(engine)
+    runner.upgrade(engine, log=lambda message: None)
+    engine.dispose()
+
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', replica_url)
+    monkeypatch.setattr(replicas, '_replicas', [])
+    return create_app(), create_app()
+
+
+def test_register_then_read_on_another_instance(replica_apps):
+    writer, reader = (app.test_client() for app in replica_apps)
+    credentials = {'username': 'fresh-signup', 'password': 'secret'}
+
+    registered = writer.post('/api/register', json={**credentials, 'email': 'fresh@example.com'})
+    assert registered.status_code == 201
+    last_write = registered.headers[replicas.STICKY_HEADER]
+    assert writer.get_cookie(replicas.STICKY_COOKIE).value == last_write
+
+    token = writer.post('/api/login', json=credentials).get_json()['access_token']
+    auth = {'Authorization': f'Bearer {token}'}
+
+    # Without the marker the other instance reads the lagging replica
+    assert reader.get('/api/me', headers=auth).status_code == 404
+    # With it (echoed header, or the cookie a same-origin browser sends) the read goes to the primary
+    assert reader.get('/api/me', headers={**auth, replicas.STICKY_HEADER: last_write}).status_code == 200
+    reader.set_cookie(replicas.STICKY_COOKIE, last_write)
+    assert reader.get('/api/me', headers=auth).get_json()['username'] == 'fresh-signup'
+
+
+def test_stale_or_forged_marker_is_ignored():
+    import time
+
+    assert replicas.is_sticky(f'{time.time() - 1:.3f}')
+    assert not replicas.is_sticky(f'{time.time() - replicas.STICKY_SECONDS - 1:.3f}')
+    assert not replicas.is_sticky(f'{time.time() + 3600:.3f}')
+    assert not replicas.is_sticky('not-a-time')
+    assert not replicas.is_sticky(None)
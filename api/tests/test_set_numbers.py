@@ -0,0 +1,22 @@
+"""Single-set responses number sets by position, the same way history does."""
+
+
+def test_patch_after_delete_matches_history(client, auth_headers):
+    user_id = client.get('/api/me', headers=auth_headers).get_json()['id']
+    response = client.post('/api/workouts:bulk', headers=auth_headers, json={
+        'name': 'Renumbered', 'start_time': '2026-03-01T10:00:00', 'end_time': '2026-03-01T11:00:00',
+        'exercises': [{'exercise_id': 1, 'sets': [{'reps': 5, 'weight': 100} for _ in range(3)]}],
+    })
+    assert response.status_code == 201
+    workout = response.get_json()
+    first, _, last = (exercise_set['id'] for exercise_set in workout['exercises'][0]['sets'])
+
+    assert client.delete(f'/api/sets/{first}', headers=auth_headers).status_code == 204
+    patched = client.patch(f'/api/sets/{last}', headers=auth_headers, json={'reps': 6})
+    assert patched.status_code == 200
+
+    history = client.get(f'/api/users/{user_id}/workouts', headers=auth_headers).get_json()
+    workouts = history['workouts'] if isinstance(history, dict) else history
+    listed = next(item for item in workouts if item['id'] == workout['id'])
+    numbers = {exercise_set['id']: exercise_set['set_number'] for exercise_set in listed['exercises'][0]['sets']}
+    assert patched.get_json()['set_number'] == numbers[last] == 2
@@ -10,7 +10,7 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from src.main import app
 from src.models.user import db
-from src.scripts.import_free_exercise_db import load_dataset, import_exercises
+from src.scripts.import_free_exercise_db import iter_dataset, import_exercises
 
 def reset_and_import():
     """Reset database and import Free Exercise DB from local files"""
@@ -23,14 +23,11 @@ def reset_and_import():
         db.create_all()
         
         print("Loading Free Exercise DB from local files...")
-        # Use the existing importer's load_dataset function with local path
+        # Stream the dataset straight into the set-based importer
         local_path = "src/data/free-exercise-db/exercises.json"
-        data = load_dataset(local_path, download=False)
-        
-        print(f"Loaded {len(data)} exercises from Free Exercise DB")
         
         print("Importing exercises...")
-        summary = import_exercises(data, commit_every=100)
+        summary = import_exercises(iter_dataset(local_path, download=False))
         
         print("Import completed!")
         print(f"Inserted: {summary['inserted']}")